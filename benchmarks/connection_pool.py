@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+'''
+Connection pool benchmark
+=========================
+
+Downloads export chunks from the local mock export server (see
+``export_server.py``) over TLS using many threads, and reports the number of
+connections (and therefore TLS handshakes) the server had to accept, along with
+the number of "Connection pool is full" warnings raised by urllib3, for each of
+the following pool configurations:
+
+* ``default``: the default pool of 10 connections per host.
+* ``sized``: the pool grown to the number of threads using
+  ``ensure_pool_size``.
+* ``run_threaded``: an export driven through ``run_threaded``, which sizes the
+  pool from its download threads automatically.
+
+A self-signed certificate is generated using the ``openssl`` command line tool.
+If it isn't available, the benchmark falls back to plain HTTP, where the
+connection counts still reflect the connections that would have required a
+handshake.  Each mode is run within its own process so that the client doesn't
+contend with the server for the GIL.
+
+Usage::
+
+    python benchmarks/connection_pool.py --threads 32 --requests 2000
+'''
+import argparse
+import logging
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from export_server import MockExportServer, ServerConfig
+from tenable.io import TenableIO
+
+EXPORT_UUID = '01234567-89ab-cdef-0123-4567890abcde'
+
+
+class PoolWarnings(logging.Handler):
+    '''
+    Counts the "Connection pool is full" warnings raised by urllib3.
+    '''
+
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def emit(self, record):
+        if 'Connection pool is full' in record.getMessage():
+            self.count += 1
+
+
+def make_certificate(path: str):
+    '''
+    Generates a self-signed certificate and key within the path.
+    '''
+    if not shutil.which('openssl'):
+        return None, None
+    cert = os.path.join(path, 'cert.pem')
+    key = os.path.join(path, 'key.pem')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048',
+                    '-nodes', '-keyout', key, '-out', cert, '-days', '1',
+                    '-subj', '/CN=127.0.0.1'
+                    ], check=True,
+                   stdout=subprocess.PIPE,
+                   stderr=subprocess.PIPE
+                   )
+    return cert, key
+
+
+def run_mode(url: str, mode: str, threads: int, requests: int, results):
+    '''
+    Runs the workload for the mode and reports the metrics.
+    '''
+    # urllib3 logs the pool warnings, which we count instead of printing.
+    pool_log = logging.getLogger('urllib3.connectionpool')
+    pool_log.propagate = False
+    pool_log.setLevel(logging.WARNING)
+    warnings = PoolWarnings()
+    pool_log.addHandler(warnings)
+    logging.getLogger('tenable').setLevel(logging.CRITICAL)
+
+    tio = TenableIO('a' * 64, 'b' * 64, url=url, ssl_verify=False)
+    start = time.perf_counter()
+    if mode == 'run_threaded':
+        tio.exports.vulns().run_threaded(lambda data, **kw: None,
+                                         num_threads=threads
+                                         )
+    else:
+        if mode == 'sized':
+            tio.ensure_pool_size(threads)
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(
+                lambda i: tio.exports.download_chunk('vulns',
+                                                     EXPORT_UUID,
+                                                     i + 1
+                                                     ),
+                range(requests)
+            ))
+    results.put({
+        'warnings': warnings.count,
+        'elapsed': time.perf_counter() - start,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--records', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--modes', nargs='+',
+                        default=['default', 'sized', 'run_threaded'])
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as path:
+        cert, key = make_certificate(path)
+        config = ServerConfig(chunks=args.requests,
+                              records=args.records,
+                              latency=args.latency
+                              )
+        with MockExportServer(config, certfile=cert, keyfile=key) as server:
+            print(f'{args.requests} requests using {args.threads} threads '
+                  f'over {server.scheme.upper()}')
+            print(f'{"mode":>14} {"handshakes":>11} {"pool full":>10} '
+                  f'{"total (s)":>10}')
+            for mode in args.modes:
+                before = config.stats['connections']
+                results = ctx.Queue()
+                proc = ctx.Process(target=run_mode,
+                                   args=(server.url, mode, args.threads,
+                                         args.requests, results)
+                                   )
+                proc.start()
+                result = results.get()
+                proc.join()
+                connections = config.stats['connections'] - before
+                print(f'{mode:>14} {connections:>11} '
+                      f'{result["warnings"]:>10} {result["elapsed"]:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
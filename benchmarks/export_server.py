@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+'''
+Mock Tenable.io export server
+=============================
+
+A local HTTP stand-in for the Tenable.io export endpoints, used by the export
+benchmarks to exercise the export iterators without a real container.  The
+following endpoints are served for the ``vulns``, ``assets``, and
+``compliance`` datatypes:
+
+* ``POST /{type}/export``
+* ``GET /{type}/export/{uuid}/status``
+* ``GET /{type}/export/{uuid}/chunks/{chunk_id}``
+* ``POST /{type}/export/{uuid}/cancel``
+
+Every export contains the same synthetic chunks.  The chunk size, the latency
+of each chunk download, the rate of injected errors and truncated chunks, and
+how quickly the chunks become available can all be configured.  The server
+can also be run over TLS, and counts every connection (and therefore every TLS
+handshake) that it accepts.
+
+Usage::
+
+    python benchmarks/export_server.py --port 8080 --chunks 50 --records 1000
+
+Then point a TenableIO object at it:
+
+    >>> tio = TenableIO('a' * 64, 'b' * 64, url='http://127.0.0.1:8080')
+'''
+import argparse
+import json
+import random
+import re
+import ssl
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import Dict, Optional
+from exports_memory import synthetic_chunk
+
+try:
+    from http.server import ThreadingHTTPServer
+except ImportError:
+    # ThreadingHTTPServer was only added in Python 3.7.
+    class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+        '''
+        A threaded HTTP server for Python 3.6.
+        '''
+        daemon_threads = True
+
+RE_EXPORT = re.compile(r'^/(vulns|assets|compliance)/export$')
+RE_ACTION = re.compile(r'^/(vulns|assets|compliance)/export/([0-9a-f\-]+)/'
+                       r'(status|cancel|chunks/(\d+))$'
+                       )
+
+
+@dataclass
+class ServerConfig:
+    '''
+    The mock export server settings.
+
+    Attributes:
+        chunks (int):
+            The number of chunks within each export.
+        records (int):
+            The number of records within each chunk.
+        latency (float):
+            The number of seconds to wait before responding to a chunk
+            download.
+        error_rate (float):
+            The proportion of chunk downloads that fail with a 503.
+        truncate_rate (float):
+            The proportion of chunk downloads that return a truncated body.
+        chunk_interval (float):
+            The number of seconds between each chunk becoming available after
+            the export has been requested.
+        retry_after (float):
+            The Retry-After value returned with the injected errors.
+    '''
+    chunks: int = 20
+    records: int = 1000
+    latency: float = 0.0
+    error_rate: float = 0.0
+    truncate_rate: float = 0.0
+    chunk_interval: float = 0.0
+    retry_after: float = 0.0
+    exports: Dict[str, float] = field(default_factory=dict)
+    stats: Dict[str, int] = field(default_factory=lambda: {
+        'exports': 0, 'status': 0, 'chunks': 0, 'errors': 0, 'truncated': 0,
+        'cancelled': 0, 'connections': 0,
+    })
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    payload: Optional[bytes] = None
+
+
+class ExportHandler(BaseHTTPRequestHandler):
+    '''
+    Request handler for the mock export endpoints.
+    '''
+    protocol_version = 'HTTP/1.1'
+    # The headers and body are written separately, so Nagle's algorithm would
+    # otherwise hold the body back until the client's delayed ACK.
+    disable_nagle_algorithm = True
+    config: ServerConfig
+
+    def log_message(self, *args):  # noqa: PLW0221
+        pass
+
+    def setup(self):
+        super().setup()
+        self._count('connections')
+
+    def _send(self, status: int, body: bytes, headers: Optional[Dict] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, data, status: int = 200):
+        self._send(status, json.dumps(data).encode())
+
+    def _count(self, key: str):
+        with self.config.lock:
+            self.config.stats[key] += 1
+
+    def do_POST(self):  # noqa: PLC0103
+        length = int(self.headers.get('Content-Length', 0))
+        if length:
+            self.rfile.read(length)
+        if RE_EXPORT.match(self.path):
+            export_uuid = str(uuid.uuid4())
+            with self.config.lock:
+                self.config.exports[export_uuid] = time.monotonic()
+            self._count('exports')
+            return self._json({'export_uuid': export_uuid})
+        match = RE_ACTION.match(self.path)
+        if match and match.group(3) == 'cancel':
+            self._count('cancelled')
+            return self._json({'status': 'CANCELLED'})
+        return self._json({'error': 'not found'}, 404)
+
+    def do_GET(self):  # noqa: PLC0103
+        match = RE_ACTION.match(self.path)
+        if not match:
+            return self._json({'error': 'not found'}, 404)
+        config = self.config
+        started = config.exports.setdefault(match.group(2), time.monotonic())
+        if match.group(3) == 'status':
+            self._count('status')
+            return self._json(self._status(started))
+
+        self._count('chunks')
+        if config.latency:
+            time.sleep(config.latency)
+        roll = random.random()  # noqa: S311
+        if roll < config.error_rate:
+            self._count('errors')
+            return self._send(503, b'{"error": "unavailable"}',
+                              {'Retry-After': str(config.retry_after)}
+                              )
+        if roll < config.error_rate + config.truncate_rate:
+            self._count('truncated')
+            return self._send(200, config.payload[:len(config.payload) // 2])
+        return self._send(200, config.payload)
+
+    def _status(self, started: float) -> Dict:
+        config = self.config
+        if config.chunk_interval:
+            elapsed = time.monotonic() - started
+            available = min(int(elapsed / config.chunk_interval),
+                            config.chunks
+                            )
+        else:
+            available = config.chunks
+        return {
+            'status': 'FINISHED' if available >= config.chunks
+                      else 'PROCESSING',
+            'chunks_available': list(range(1, available + 1)),
+            'finished_chunks': available,
+            'total_chunks': config.chunks,
+        }
+
+
+class MockExportServer:
+    '''
+    Runs the mock export server within a background thread.
+
+    Examples:
+
+        >>> with MockExportServer(ServerConfig(chunks=10)) as server:
+        ...     tio = TenableIO('a' * 64, 'b' * 64, url=server.url)
+        ...     records = list(tio.exports.vulns())
+    '''
+
+    def __init__(self,
+                 config: Optional[ServerConfig] = None,
+                 host: str = '127.0.0.1',
+                 port: int = 0,
+                 certfile: Optional[str] = None,
+                 keyfile: Optional[str] = None
+                 ):
+        self.config = config or ServerConfig()
+        self.config.payload = synthetic_chunk(0, self.config.records).encode()
+        handler = type('Handler', (ExportHandler,), {'config': self.config})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.scheme = 'http'
+        if certfile:
+            # The handshake is deferred to the handler threads so that the
+            # handshakes don't serialize on the accepting thread.
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            self.httpd.socket = context.wrap_socket(
+                self.httpd.socket,
+                server_side=True,
+                do_handshake_on_connect=False
+            )
+            self.scheme = 'https'
+        self.thread = threading.Thread(target=self.httpd.serve_forever,
+                                       daemon=True
+                                       )
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'{self.scheme}://{host}:{port}'
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--chunks', type=int, default=20)
+    parser.add_argument('--records', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--truncate-rate', type=float, default=0.0)
+    parser.add_argument('--chunk-interval', type=float, default=0.0)
+    args = parser.parse_args()
+    config = ServerConfig(chunks=args.chunks,
+                          records=args.records,
+                          latency=args.latency,
+                          error_rate=args.error_rate,
+                          truncate_rate=args.truncate_rate,
+                          chunk_interval=args.chunk_interval,
+                          )
+    server = MockExportServer(config, host=args.host, port=args.port)
+    print(f'serving mock exports on {server.url}')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+'''
+Export record memory benchmark
+==============================
+
+Measures the memory needed to hold a synthetic vulnerability export in memory
+as plain dictionaries, as ``Box`` objects, and as compact slotted records.
+Each record is decoded from JSON, just as it would be when downloaded, so that
+the strings within each record are distinct objects as they would be in a real
+export.
+
+Usage::
+
+    python benchmarks/exports_memory.py [--records 1000000]
+'''
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from box import Box
+from tenable.io.exports.records import compact_records
+
+SEVERITIES = ['info', 'low', 'medium', 'high', 'critical']
+STATES = ['OPEN', 'REOPENED', 'FIXED']
+
+
+def synthetic_chunk(start: int, size: int) -> str:
+    '''
+    Returns a JSON encoded chunk of synthetic vulnerability records.
+    '''
+    records = []
+    for idx in range(start, start + size):
+        plugin_id = 10000 + idx % 2000
+        records.append({
+            'asset': {
+                'uuid': f'{idx % 50000:08d}-0000-0000-0000-000000000000',
+                'hostname': f'host{idx % 50000}.example.com',
+                'fqdn': f'host{idx % 50000}.example.com',
+                'ipv4': f'10.{idx % 250}.{idx % 200}.{idx % 100}',
+                'network_id': '00000000-0000-0000-0000-000000000000',
+                'operating_system': ['Linux Kernel 5.4'],
+                'device_type': 'general-purpose',
+                'tracked': True,
+            },
+            'plugin': {
+                'id': plugin_id,
+                'name': f'Plugin {plugin_id}',
+                'family': 'General',
+                'type': 'remote',
+                'risk_factor': 'Medium',
+                'cvss3_base_score': 6.5,
+                'cve': [f'CVE-2021-{plugin_id}'],
+                'has_patch': True,
+                'vpr': {'score': 5.9},
+            },
+            'port': {'port': 443, 'protocol': 'TCP', 'service': 'www'},
+            'scan': {'uuid': '11111111-1111-1111-1111-111111111111',
+                     'started_at': '2021-05-04T12:00:00.000Z',
+                     },
+            'severity': SEVERITIES[idx % 5],
+            'severity_id': idx % 5,
+            'state': STATES[idx % 3],
+            'first_found': '2021-05-04T12:01:02.123Z',
+            'last_found': '2021-06-04T12:01:02.123Z',
+            'output': f'Plugin output for finding {idx}',
+        })
+    return json.dumps(records)
+
+
+def measure(name: str, records: int, chunk_size: int, convert):
+    '''
+    Decodes the synthetic export, converting each chunk, and reports the
+    memory held by the converted records.
+    '''
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    held = []
+    for offset in range(0, records, chunk_size):
+        chunk = json.loads(synthetic_chunk(offset,
+                                           min(chunk_size, records - offset)
+                                           ))
+        held.extend(convert(chunk))
+        del chunk
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{name:>8} {current / 1024 / 1024:>10.1f} '
+          f'{current / len(held):>10.0f} {elapsed:>9.1f}'
+          )
+    del held
+    gc.collect()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--records', type=int, default=1000000)
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    parser.add_argument('--formats', nargs='+',
+                        default=['dict', 'box', 'compact'],
+                        choices=['dict', 'box', 'compact'],
+                        )
+    args = parser.parse_args()
+
+    converters = {
+        'dict': lambda chunk: chunk,
+        'box': lambda chunk: [Box(r) for r in chunk],
+        'compact': lambda chunk: compact_records(chunk, 'vulns'),
+    }
+    print(f'{args.records} records')
+    print(f'{"format":>8} {"MiB":>10} {"B/record":>10} {"seconds":>9}')
+    for name in args.formats:
+        measure(name, args.records, args.chunk_size, converters[name])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+'''
+Export status polling benchmark
+===============================
+
+Measures the cost of a single ``ExportsIterator`` status poll as the number of
+chunks within the export grows.  Each poll reports every chunk as available
+with half of them already processed, which is the worst realistic case for the
+chunk bookkeeping.  The per-chunk cost should stay flat as the chunk count
+grows.  The same measurement is taken for the legacy list-based bookkeeping
+for comparison.
+
+Usage::
+
+    python benchmarks/exports_status.py [--sizes 1000 10000 50000]
+'''
+import argparse
+import timeit
+from box import Box
+from tenable.io.exports.iterator import ExportsIterator
+
+
+def legacy_poll(avail, processed):
+    '''
+    The list-based bookkeeping that the iterator previously used.
+    '''
+    chunks = [c for c in avail if c not in processed]
+    while chunks:
+        processed.append(chunks.pop(0))
+
+
+def iterator_poll(iterator, avail):
+    '''
+    A status poll followed by draining the chunk queue.
+    '''
+    iterator._parse_status(Box({'status': 'PROCESSING',
+                                'chunks_available': avail
+                                }))
+    while iterator.chunks:
+        iterator._next_chunk()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', nargs='+', type=int,
+                        default=[1000, 5000, 10000, 25000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f'{"chunks":>8} {"iterator (us/chunk)":>20} '
+          f'{"legacy (us/chunk)":>18}')
+    for size in args.sizes:
+        avail = list(range(1, size + 1))
+
+        def run_iterator():
+            iterator = ExportsIterator(None, type='vulns', uuid=None)
+            iterator.processed.update(avail[::2])
+            iterator_poll(iterator, avail)
+
+        def run_legacy():
+            legacy_poll(avail, list(avail[::2]))
+
+        new = min(timeit.repeat(run_iterator, number=1, repeat=args.repeat))
+        old = min(timeit.repeat(run_legacy, number=1, repeat=args.repeat))
+        print(f'{size:>8} {new / size * 1e6:>20.3f} {old / size * 1e6:>18.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+'''
+Export throughput benchmark
+===========================
+
+Runs vulnerability exports against the local mock export server (see
+``export_server.py``) and reports, for each execution mode:
+
+* the number of records received (which will fall short of the expected count
+  if chunks were lost),
+* the records processed per second,
+* the time until the first record was handed to the caller, and
+* the peak RSS of the process running the export.
+
+Each mode is run within its own process so that the peak RSS of one mode
+doesn't bleed into the next.  The available modes are ``iter`` (serial
+iteration), ``stream`` (serial iteration of streamed chunks), and
+``threaded:N`` (``run_threaded`` using N threads).
+
+Usage::
+
+    python benchmarks/exports_throughput.py --chunks 50 --records 2000 \\
+        --latency 0.2 --error-rate 0.05 --modes iter stream threaded:4
+'''
+import argparse
+import logging
+import multiprocessing
+import resource
+import time
+from threading import Lock
+from export_server import MockExportServer, ServerConfig
+from tenable.io import TenableIO
+from tenable.io.exports.polling import AdaptivePollingPolicy
+
+
+def run_mode(url: str, mode: str, min_delay: float, results):
+    '''
+    Runs a single export using the specified mode and reports the metrics.
+    '''
+    # The injected errors are expected, so we won't log them.
+    logging.basicConfig(level=logging.CRITICAL)
+    tio = TenableIO('a' * 64, 'b' * 64, url=url)
+    polling = AdaptivePollingPolicy(min_delay=min_delay)
+    start = time.perf_counter()
+    first = None
+    count = 0
+    if mode in ('iter', 'stream'):
+        for _ in tio.exports.vulns(stream=mode == 'stream', polling=polling):
+            if first is None:
+                first = time.perf_counter()
+            count += 1
+    else:
+        threads = int(mode.split(':')[1])
+        lock = Lock()
+
+        def consume(data, **kwargs):
+            nonlocal first, count
+            records = sum(1 for _ in data)
+            with lock:
+                if first is None:
+                    first = time.perf_counter()
+                count += records
+
+        tio.exports.vulns(polling=polling).run_threaded(consume,
+                                                        num_threads=threads
+                                                        )
+    elapsed = time.perf_counter() - start
+    results.put({
+        'mode': mode,
+        'records': count,
+        'elapsed': elapsed,
+        'rate': count / elapsed if elapsed else 0,
+        'first': (first - start) if first else None,
+        'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--chunks', type=int, default=20)
+    parser.add_argument('--records', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--truncate-rate', type=float, default=0.0)
+    parser.add_argument('--chunk-interval', type=float, default=0.0)
+    parser.add_argument('--min-delay', type=float, default=0.1,
+                        help='minimum status polling delay in seconds')
+    parser.add_argument('--modes', nargs='+',
+                        default=['iter', 'stream', 'threaded:2',
+                                 'threaded:8'
+                                 ])
+    args = parser.parse_args()
+
+    config = ServerConfig(chunks=args.chunks,
+                          records=args.records,
+                          latency=args.latency,
+                          error_rate=args.error_rate,
+                          truncate_rate=args.truncate_rate,
+                          chunk_interval=args.chunk_interval,
+                          )
+    expected = args.chunks * args.records
+    print(f'{args.chunks} chunks of {args.records} records '
+          f'({expected} records expected)')
+    print(f'{"mode":>12} {"records":>9} {"rec/s":>10} {"first (s)":>10} '
+          f'{"total (s)":>10} {"peak RSS (MiB)":>15}')
+    ctx = multiprocessing.get_context('spawn')
+    with MockExportServer(config) as server:
+        for mode in args.modes:
+            results = ctx.Queue()
+            proc = ctx.Process(target=run_mode,
+                               args=(server.url, mode, args.min_delay, results)
+                               )
+            proc.start()
+            result = results.get()
+            proc.join()
+            first = (f'{result["first"]:.3f}'
+                     if result['first'] is not None else '-'
+                     )
+            print(f'{mode:>12} {result["records"]:>9} {result["rate"]:>10.0f} '
+                  f'{first:>10} {result["elapsed"]:>10.2f} '
+                  f'{result["rss"]:>15.1f}')
+        print(f'server stats: {config.stats}')
+
+
+if __name__ == '__main__':
+    main()
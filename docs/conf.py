@@ -21,6 +21,8 @@ autodoc_mock_imports = [
     'defusedxml',
     'ipaddress',
     'arrow',
+    'aiohttp',
+    'pyarrow',
 ]
 
 import os, sys, datetime
@@ -50,4 +50,8 @@ setup(
         'typing-extensions>=4.0.1',
         'dataclasses>=0.8;python_version=="3.6"',
     ],
+    extras_require={
+        'async': ['aiohttp>=3.7'],
+        'arrow': ['pyarrow>=6.0'],
+    },
 )
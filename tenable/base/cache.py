@@ -0,0 +1,428 @@
+'''
+Response Cache
+==============
+
+The response cache stores the responses of slow-changing GET endpoints, such as
+the filter definitions, the scan timezones, or the policy templates, so that
+repeated calls don't each require a round trip to the platform.  The cache is
+attached to the platform object using the ``cache`` parameter and sits at the
+transport layer, so every response handed back to the caller is a fresh copy.
+
+Each cached endpoint is given its own time-to-live.  Once an entry has expired
+and the platform returned an ``ETag`` header with it, the next call revalidates
+the entry using ``If-None-Match`` and reuses the cached body if the platform
+responds with ``304 Not Modified``.  The entries are keyed on the URL
+(including the query parameters) and the credentials of the session, so a
+cache can be safely shared between sessions authenticated as different users.
+
+Entries are stored either in memory, or on disk within a SQLite database so
+that they can be shared across short-lived processes.  Both backends evict the
+least recently used entries once full, and both are safe to share between
+threads.
+
+.. autoclass:: ResponseCache
+    :members:
+
+.. autoclass:: MemoryCacheBackend
+    :members:
+
+.. autoclass:: DiskCacheBackend
+    :members:
+'''
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, Optional
+from urllib.parse import urlparse
+from requests import PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# The slow-changing endpoints that are cached by default, along with their
+# time-to-live in seconds.  The patterns are matched against the path of the
+# request URL.
+DEFAULT_TTLS: Dict[str, float] = {
+    r'^/filters/': 3600,
+    r'^/scans/timezones$': 86400,
+    r'^/editor/(policy|scan|remediation)/templates$': 3600,
+    r'^/plugins/families$': 3600,
+    r'^/scanners$': 300,
+    r'^/rest/system$': 300,
+}
+
+# The request headers that identify the caller.  Their values form part of
+# the cache key so that cached responses are never served to another user.
+IDENTITY_HEADERS = ('X-APIKeys', 'x-apikey', 'X-SecurityCenter',
+                    'Authorization', 'Cookie', 'Accept'
+                    )
+
+# Response headers describing the wire encoding of the original body, which
+# no longer apply to the decoded body held within the cache.  The names are
+# lowercased as header names are case-insensitive.
+WIRE_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding')
+
+
+@dataclass
+class CacheEntry:
+    '''
+    A cached response.
+    '''
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    etag: Optional[str]
+    stored_at: float
+    expires_at: float
+
+
+class MemoryCacheBackend:
+    '''
+    An in-memory LRU cache backend.
+
+    Args:
+        max_entries (int, optional):
+            The maximum number of entries to hold.  The default is ``256``.
+    '''
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: 'OrderedDict[str, CacheEntry]' = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        '''
+        Returns the entry for the key, marking it as recently used.
+        '''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        '''
+        Stores the entry, evicting the least recently used entries if full.
+        '''
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        '''
+        Removes the entry for the key.
+        '''
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        '''
+        Removes every entry.
+        '''
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskCacheBackend:
+    '''
+    An on-disk LRU cache backend stored within a SQLite database.  The
+    database may be shared by multiple processes.
+
+    Args:
+        path (str):
+            The path to the SQLite database file.  A leading ``~`` is expanded
+            to the user's home directory.
+        max_entries (int, optional):
+            The maximum number of entries to hold.  The default is ``1024``.
+    '''
+
+    def __init__(self, path: str, max_entries: int = 1024):
+        self.path = os.path.expanduser(path)
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._lock = Lock()
+        self._db = sqlite3.connect(self.path,
+                                   timeout=30,
+                                   check_same_thread=False
+                                   )
+        with self._db:
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    status INTEGER NOT NULL,
+                    headers TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    etag TEXT,
+                    stored_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )''')
+            self._db.execute('CREATE INDEX IF NOT EXISTS responses_accessed '
+                             'ON responses (accessed_at)'
+                             )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute('SELECT count(*) FROM responses'
+                                    ).fetchone()[0]
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        '''
+        Returns the entry for the key, marking it as recently used.
+        '''
+        with self._lock, self._db:
+            row = self._db.execute(
+                ('SELECT status, headers, body, etag, stored_at, expires_at '
+                 'FROM responses WHERE key = ?'), (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute('UPDATE responses SET accessed_at = ? '
+                             'WHERE key = ?', (time.time(), key)
+                             )
+        return CacheEntry(status=row[0],
+                          headers=json.loads(row[1]),
+                          body=bytes(row[2]),
+                          etag=row[3],
+                          stored_at=row[4],
+                          expires_at=row[5]
+                          )
+
+    def set(self, key: str, entry: CacheEntry):
+        '''
+        Stores the entry, evicting the least recently used entries if full.
+        '''
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?,?,?,?,?,?,?,?)',
+                (key,
+                 entry.status,
+                 json.dumps(entry.headers),
+                 entry.body,
+                 entry.etag,
+                 entry.stored_at,
+                 entry.expires_at,
+                 time.time()
+                 )
+            )
+            evicted = self._db.execute(
+                ('DELETE FROM responses WHERE key IN ('
+                 'SELECT key FROM responses ORDER BY accessed_at DESC '
+                 'LIMIT -1 OFFSET ?)'), (self.max_entries,)
+            ).rowcount
+            self.evictions += max(evicted, 0)
+
+    def delete(self, key: str):
+        '''
+        Removes the entry for the key.
+        '''
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM responses WHERE key = ?', (key,))
+
+    def clear(self):
+        '''
+        Removes every entry.
+        '''
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM responses')
+
+    def close(self):
+        '''
+        Closes the database connection.
+        '''
+        self._db.close()
+
+
+class ResponseCache:
+    '''
+    A cache of GET responses for slow-changing endpoints.
+
+    Args:
+        backend (optional):
+            The storage backend.  If left unspecified, a
+            :obj:`MemoryCacheBackend` is used.
+        ttls (dict, optional):
+            A dictionary of regular expressions, matched against the path of
+            the request URL, and the number of seconds that matching responses
+            should be cached for.  Only requests matching one of the patterns
+            are cached.  If left unspecified, a default set of slow-changing
+            endpoints (filters, timezones, templates, plugin families,
+            scanners, and the Tenable.sc system details) is used.
+        revalidate (bool, optional):
+            Should expired entries with an ``ETag`` be revalidated using
+            ``If-None-Match``?  The default is ``True``.
+
+    Examples:
+
+        Caching the default endpoints in memory:
+
+        >>> cache = ResponseCache()
+        >>> tio = TenableIO(access_key, secret_key, cache=cache)
+        >>> tio.filters.workbench_vuln_filters()
+        >>> tio.filters.workbench_vuln_filters()
+        >>> cache.stats
+        {'hits': 1, 'misses': 1, 'revalidated': 0, 'stores': 1,
+         'evictions': 0, 'entries': 1}
+
+        Sharing an on-disk cache between short-lived processes, and caching
+        the scanner list for a day:
+
+        >>> cache = ResponseCache(DiskCacheBackend('~/.tenable-cache.db'),
+        ...                       ttls={**DEFAULT_TTLS, r'^/scanners$': 86400}
+        ...                       )
+        >>> tio = TenableIO(access_key, secret_key, cache=cache)
+    '''
+
+    def __init__(self,
+                 backend=None,
+                 ttls: Optional[Dict[str, float]] = None,
+                 revalidate: bool = True
+                 ):
+        self.backend = backend or MemoryCacheBackend()
+        ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.ttls = [(re.compile(k), v) for k, v in ttls.items()]
+        self.revalidate = revalidate
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.stores = 0
+        self._lock = Lock()
+
+    def ttl_for(self, url: str) -> Optional[float]:
+        '''
+        Returns the time-to-live of the URL, or ``None`` if the URL isn't
+        cacheable.
+        '''
+        path = urlparse(url).path
+        for pattern, ttl in self.ttls:
+            if pattern.search(path):
+                return ttl
+        return None
+
+    @staticmethod
+    def key(request: PreparedRequest) -> str:
+        '''
+        Returns the cache key of the request.  The identity headers are hashed
+        along with the URL so that no credentials are stored within the cache.
+        '''
+        digest = hashlib.sha256(request.url.encode())
+        for header in IDENTITY_HEADERS:
+            digest.update(b'\0')
+            digest.update(str(request.headers.get(header, '')).encode())
+        return digest.hexdigest()
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def clear(self):
+        '''
+        Removes every entry from the cache.
+        '''
+        self.backend.clear()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        '''
+        The hit, miss, revalidation, store, and eviction counters, along with
+        the number of entries within the cache.
+        '''
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidated': self.revalidated,
+                'stores': self.stores,
+                'evictions': self.backend.evictions,
+                'entries': len(self.backend),
+            }
+
+
+class CachingAdapter(HTTPAdapter):
+    '''
+    A requests transport adapter that serves cacheable GET requests from the
+    response cache.
+    '''
+
+    def __init__(self, cache: Optional[ResponseCache] = None, **kwargs):
+        self.cache = cache
+        super().__init__(**kwargs)
+
+    def _build_cached(self,
+                      request: PreparedRequest,
+                      entry: CacheEntry
+                      ) -> Response:
+        '''
+        Constructs a response object from the cache entry.
+        '''
+        resp = Response()
+        resp.status_code = entry.status
+        resp.reason = 'OK'
+        resp.headers = CaseInsensitiveDict(entry.headers)
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp._content = entry.body  # noqa: PLW0212
+        resp.url = request.url
+        resp.request = request
+        resp.connection = self
+        return resp
+
+    def send(self,  # noqa: PLR0913
+             request: PreparedRequest,
+             stream: bool = False,
+             **kwargs
+             ) -> Response:
+        cache = self.cache
+        ttl = None
+        if cache and request.method == 'GET' and not stream:
+            ttl = cache.ttl_for(request.url)
+        if ttl is None:
+            return super().send(request, stream=stream, **kwargs)
+
+        key = cache.key(request)
+        entry = cache.backend.get(key)
+        now = time.time()
+        if entry and entry.expires_at > now:
+            cache._count('hits')  # noqa: PLW0212
+            return self._build_cached(request, entry)
+        if entry and entry.etag and cache.revalidate:
+            request.headers['If-None-Match'] = entry.etag
+
+        resp = super().send(request, stream=stream, **kwargs)
+        if entry and resp.status_code == 304:
+            cache._count('revalidated')  # noqa: PLW0212
+            entry.stored_at = now
+            entry.expires_at = now + ttl
+            cache.backend.set(key, entry)
+            resp.close()
+            return self._build_cached(request, entry)
+
+        cache._count('misses')  # noqa: PLW0212
+        storable = (resp.status_code == 200
+                    and 'no-store' not in resp.headers.get('Cache-Control', '')
+                    )
+        if storable:
+            headers = {k: v for k, v in resp.headers.items()
+                       if k.lower() not in WIRE_HEADERS
+                       }
+            cache.backend.set(key, CacheEntry(status=resp.status_code,
+                                              headers=headers,
+                                              body=resp.content,
+                                              etag=resp.headers.get('ETag'),
+                                              stored_at=now,
+                                              expires_at=now + ttl
+                                              ))
+            cache._count('stores')  # noqa: PLW0212
+        return resp
@@ -12,12 +12,24 @@ base class over the original APISession class.
 '''
 import os
 import warnings
+from threading import Lock
+from requests.adapters import DEFAULT_POOLSIZE
 from restfly import APISession as Base
+from tenable.base.cache import CachingAdapter, ResponseCache
+from tenable.base.ratelimit import RateLimitedAdapter, build_limiter
 from tenable.errors import AuthenticationWarning
 from tenable.utils import url_validator
 from tenable.version import version
 
 
+class PlatformAdapter(CachingAdapter, RateLimitedAdapter):
+    '''
+    The transport adapter mounted by the platform.  Cacheable responses are
+    served from the response cache, and the remaining requests are paced by
+    the rate limiter.
+    '''
+
+
 class APIPlatform(Base):
     '''
     Base class for all API Platform packages.  This class handles all of the
@@ -41,8 +53,41 @@ class APIPlatform(Base):
             for more information.
         build (str, optional):
             The build number to put into the User-Agent string.
+        cache (ResponseCache, optional):
+            A response cache for the slow-changing GET endpoints, such as the
+            filter definitions and the templates.  Passing ``True`` creates an
+            in-memory cache with the default time-to-lives.  The cache may be
+            shared between multiple platform objects and threads.  For more
+            details, refer to :obj:`tenable.base.cache.ResponseCache`.  If
+            left unspecified, responses aren't cached.
+        keep_alive (bool, optional):
+            Should connections be kept open and re-used between requests?
+            Disabling keep-alive sends a ``Connection: close`` header with
+            every request, forcing a new connection (and TLS handshake) for
+            each one.  If left unspecified, the default is ``True``.
+        pool_block (bool, optional):
+            Should requests wait for a free connection once every connection
+            within the pool is in use?  If ``False``, an additional connection
+            is opened and then discarded once the request completes.  If left
+            unspecified, the default is ``False``.
+        pool_connections (int, optional):
+            The number of per-host connection pools to keep.  If left
+            unspecified, the default is ``10``.
+        pool_maxsize (int, optional):
+            The maximum number of connections to keep open to each host.  The
+            threaded helpers (such as
+            :py:meth:`ExportsIterator.run_threaded`) will grow the pool to
+            match their number of worker threads.  If left unspecified, the
+            default is ``10``.
         product (str, optional):
             The product name to put into the User-Agent string.
+        rate_limit (RateLimiter, optional):
+            A client-side rate limiter shared by every thread using the
+            platform object.  Either a
+            :obj:`tenable.base.ratelimit.RateLimiter`, the maximum number of
+            requests per second, or ``True`` for a limiter that only adapts to
+            the platform's rate limiting responses.  If left unspecified,
+            requests aren't rate limited.
         proxies (dict, optional):
             A dictionary detailing what proxy should be used for what
             transport protocol.  This value will be passed to the session
@@ -77,8 +122,38 @@ class APIPlatform(Base):
     _env_base = ''
     _auth = {}
     _auth_mech = None
+    _keep_alive = True
+    _pool_block = False
+    _pool_connections = DEFAULT_POOLSIZE
+    _pool_maxsize = DEFAULT_POOLSIZE
+    _pool_adapter = None
+    _response_cache = None
+    _rate_limiter = None
 
     def __init__(self, **kwargs):
+        # The connection pool settings are only applied to sessions that we
+        # build ourselves, unless they have been explicitly specified.
+        pool_keys = ('keep_alive', 'pool_block', 'pool_connections',
+                     'pool_maxsize'
+                     )
+        self._pool_explicit = any(k in kwargs for k in pool_keys)
+        self._keep_alive = bool(kwargs.pop('keep_alive', self._keep_alive))
+        self._pool_block = bool(kwargs.pop('pool_block', self._pool_block))
+        self._pool_connections = int(kwargs.pop('pool_connections',
+                                                self._pool_connections
+                                                ))
+        self._pool_maxsize = int(kwargs.pop('pool_maxsize',
+                                            self._pool_maxsize
+                                            ))
+        self._pool_lock = Lock()
+
+        # A response cache is enabled by passing either a ResponseCache object
+        # or True for an in-memory cache using the default TTLs.
+        cache = kwargs.pop('cache', None)
+        if cache is True:
+            cache = ResponseCache()
+        self._response_cache = cache or None
+        self._rate_limiter = build_limiter(kwargs.pop('rate_limit', None))
 
         # if the constructed URL isn't valid, then we will throw a TypeError
         # to inform the caller that something isn't right here.
@@ -101,6 +176,75 @@ class APIPlatform(Base):
         # Call the RESTfly constructor
         super().__init__(**kwargs)
 
+    def _build_session(self, **kwargs):
+        '''
+        Builds the requests session and mounts the connection pool adapter.
+        A custom adapter or session passed to the constructor is left as-is
+        unless the pool settings, a response cache, or a rate limiter have been
+        explicitly specified.
+        '''
+        custom = self._adapter or 'session' in kwargs
+        managed = (self._pool_explicit
+                   or self._response_cache
+                   or self._rate_limiter
+                   )
+        super()._build_session(**kwargs)
+        if not custom or managed:
+            self._mount_pool()
+        if not self._keep_alive:
+            self._session.headers['Connection'] = 'close'
+
+    def _mount_pool(self):
+        '''
+        Mounts a connection pool adapter built from the pool settings, the
+        response cache, and the rate limiter.
+        '''
+        self._pool_adapter = PlatformAdapter(
+            cache=self._response_cache,
+            limiter=self._rate_limiter,
+            pool_connections=self._pool_connections,
+            pool_maxsize=self._pool_maxsize,
+            pool_block=self._pool_block,
+        )
+        for prefix in ('https://', 'http://'):
+            self._session.mount(prefix, self._pool_adapter)
+
+    def ensure_pool_size(self, size: int) -> int:
+        '''
+        Grows the per-host connection pool to at least the specified size.
+        Threaded helpers call this with their number of worker threads so that
+        connections aren't discarded and re-established while the threads
+        contend for the pool.  The pool is resized in place, closing the idle
+        connections of the previous pool.  The pool is never shrunk, and a
+        custom adapter or session is left untouched.
+
+        Args:
+            size (int): The number of connections required.
+
+        Returns:
+            int:
+                The resulting pool size.
+
+        Example:
+
+            >>> tio.ensure_pool_size(32)
+            32
+        '''
+        with self._pool_lock:
+            if self._pool_adapter is None or size <= self._pool_maxsize:
+                return self._pool_maxsize
+            self._log.debug('growing the connection pool from %d to %d',
+                            self._pool_maxsize, size
+                            )
+            self._pool_maxsize = size
+            previous = self._pool_adapter.poolmanager
+            self._pool_adapter.init_poolmanager(self._pool_connections,
+                                                size,
+                                                block=self._pool_block
+                                                )
+            previous.clear()
+            return size
+
     def _session_auth(self, username, password):
         '''
         Default Session auth behavior
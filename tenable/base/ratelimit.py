@@ -0,0 +1,364 @@
+'''
+Rate Limiter
+============
+
+The rate limiter paces the requests made by every thread sharing a platform
+object, so that a heavily threaded workload slows down as a whole when the
+platform starts rate limiting it, instead of each thread being rejected and
+backing off on its own.  The limiter is attached to the platform object using
+the ``rate_limit`` parameter and sits at the transport layer, so every request
+attempt (including the retries made by the session) is counted, while
+responses served from the response cache are not.
+
+Requests are sorted into endpoint groups, each with its own token bucket, by
+matching the path of the request URL against the group patterns.  Requests not
+matching any group share the ``default`` group.  Each group adapts to the
+responses that it receives:
+
+* When a ``429 Too Many Requests`` (or a ``503 Service Unavailable``) response
+  carries a ``Retry-After`` header, every request within the group is held
+  until the platform has asked the client to wait.
+* Every ``429`` response reduces the group's rate (at most once per second, so
+  that a burst of rejections from many threads counts as a single signal).  A
+  group without a configured rate starts out unbounded, and is given one based
+  upon the request rate observed just before it was rate limited.
+* Every successful response gradually raises the rate back up, to at most the
+  configured rate.
+
+The time that requests spent held by the limiter is exposed through
+:py:attr:`RateLimiter.stats`.
+
+.. autoclass:: RateLimiter
+    :members:
+
+.. autoclass:: TokenBucket
+    :members:
+'''
+import re
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from threading import Lock
+from typing import Any, Dict, Optional, Union
+from urllib.parse import urlparse
+from requests import PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+
+
+def retry_after(resp: Response) -> Optional[float]:
+    '''
+    Returns the number of seconds requested by the ``Retry-After`` header of
+    the response, which may either be a number of seconds or a HTTP date.
+    '''
+    value = resp.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    '''
+    A thread-safe token bucket.
+
+    Args:
+        rate (float, optional):
+            The number of requests per second.  If left unspecified, the
+            bucket is unbounded until it is told to slow down.
+        burst (int, optional):
+            The number of requests that may be made at once after a period of
+            inactivity.  The default is the rate (rounded up).
+        min_rate (float, optional):
+            The lowest rate that the bucket will adapt down to.  The default
+            is ``0.5`` requests per second.
+        decrease (float, optional):
+            The factor the rate is multiplied by when rate limited.  The
+            default is ``0.5``.
+        increase (float, optional):
+            The rate is raised by roughly this many requests per second for
+            every second of successful requests.  The default is ``1.0``.
+        window (float, optional):
+            The number of seconds over which the observed request rate is
+            measured.  The default is ``10``.
+
+    Attributes:
+        wait_time (float):
+            The total number of seconds that callers have been held.
+        waits (int):
+            The number of times a caller has been held.
+    '''
+
+    def __init__(self,
+                 rate: Optional[float] = None,
+                 burst: Optional[int] = None,
+                 min_rate: float = 0.5,
+                 decrease: float = 0.5,
+                 increase: float = 1.0,
+                 window: float = 10.0,
+                 ):
+        self.max_rate = rate
+        self.rate = rate
+        self._burst = burst
+        self.burst = burst or self._default_burst(rate)
+        self.tokens = float(self.burst)
+        self.min_rate = min_rate
+        self.decrease = decrease
+        self.increase = increase
+        self.window = window
+        self.requests = 0
+        self.throttled = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.paused_until = 0.0
+        self._decreased_at = float('-inf')
+        self._sent = deque()
+        self._updated = time.monotonic()
+        self._lock = Lock()
+
+    @staticmethod
+    def _default_burst(rate: Optional[float]) -> int:
+        return max(int(rate + 0.999), 1) if rate else 1
+
+    def _set_rate(self, rate: Optional[float]):
+        '''
+        Changes the rate, resizing the burst unless it was specified.
+        '''
+        self.rate = rate
+        if not self._burst:
+            self.burst = self._default_burst(rate)
+        self.tokens = min(self.tokens, self.burst)
+
+    def acquire(self):
+        '''
+        Takes a token from the bucket, blocking until one is available.
+        '''
+        with self._lock:
+            now = time.monotonic()
+            self.requests += 1
+            self._sent.append(now)
+            while self._sent and self._sent[0] < now - self.window:
+                self._sent.popleft()
+            wait = max(self.paused_until - now, 0.0)
+            if self.rate:
+                # Tokens only accrue once the pause (if any) has elapsed, and
+                # may go negative, reserving a slot for the caller.
+                start = max(now, self.paused_until)
+                self.tokens = min(self.burst,
+                                  self.tokens
+                                  + max(start - self._updated, 0) * self.rate
+                                  )
+                self._updated = start
+                self.tokens -= 1
+                if self.tokens < 0:
+                    wait += -self.tokens / self.rate
+            else:
+                self._updated = now
+            if wait:
+                self.waits += 1
+                self.wait_time += wait
+        if wait:
+            time.sleep(wait)
+
+    def observed_rate(self) -> float:
+        '''
+        Returns the request rate observed over the measurement window.
+        '''
+        with self._lock:
+            if len(self._sent) < 2:
+                return float(len(self._sent))
+            span = max(self._sent[-1] - self._sent[0], 1.0)
+            return len(self._sent) / span
+
+    def throttle(self, delay: Optional[float] = None, limited: bool = True):
+        '''
+        Informs the bucket that the platform has asked the client to slow
+        down.
+
+        Args:
+            delay (float, optional):
+                The number of seconds requested by the ``Retry-After`` header.
+                Every request is held until the delay has elapsed.
+            limited (bool, optional):
+                Was the response a rate limit (``429``) response?  If so, the
+                rate is decreased.
+        '''
+        observed = self.observed_rate()
+        with self._lock:
+            now = time.monotonic()
+            if delay:
+                self.paused_until = max(self.paused_until, now + delay)
+                self.tokens = min(self.tokens, 0.0)
+                self._updated = max(self._updated, self.paused_until)
+            if not limited:
+                return
+            self.throttled += 1
+            if now - self._decreased_at < 1:
+                return
+            self._decreased_at = now
+            current = min([r for r in (self.rate, observed) if r],
+                          default=self.min_rate
+                          )
+            self._set_rate(max(self.min_rate, current * self.decrease))
+
+    def success(self):
+        '''
+        Informs the bucket of a successful response, gradually raising the
+        rate back up to the configured rate.
+        '''
+        with self._lock:
+            if self.rate is None or self.rate == self.max_rate:
+                return
+            rate = self.rate + self.increase / self.rate
+            if self.max_rate:
+                rate = min(rate, self.max_rate)
+            self._set_rate(rate)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        '''
+        The current rate along with the request, rate limit, and wait
+        counters of the bucket.
+        '''
+        with self._lock:
+            return {
+                'rate': self.rate,
+                'max_rate': self.max_rate,
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'waits': self.waits,
+                'wait_time': self.wait_time,
+            }
+
+
+class RateLimiter:
+    '''
+    A client-side rate limiter with per-endpoint-group token buckets.
+
+    Args:
+        rate (float, optional):
+            The number of requests per second for the ``default`` group.  If
+            left unspecified, the group is unbounded until it's rate limited.
+        burst (int, optional):
+            The burst size of the ``default`` group.
+        groups (dict, optional):
+            The endpoint groups, keyed by name.  Each group is a dictionary
+            with the ``pattern`` (a regular expression matched against the path
+            of the request URL), and optionally the ``rate`` and ``burst`` of
+            the group.  The groups are matched in order.
+        **kwargs (dict):
+            Any additional keyword arguments (such as ``min_rate``) are passed
+            to every :obj:`TokenBucket`.
+
+    Examples:
+
+        Sharing a 20 requests per second budget across every thread, with
+        the export endpoints given their own budget:
+
+        >>> limiter = RateLimiter(rate=20, groups={
+        ...     'exports': {'pattern': r'^/(vulns|assets|compliance)/export',
+        ...                 'rate': 5},
+        ... })
+        >>> tio = TenableIO(access_key, secret_key, rate_limit=limiter)
+        >>> export = tio.exports.vulns()
+        >>> export.run_threaded(write_chunk, num_threads=32)
+        >>> limiter.stats['exports']
+        {'rate': 5, 'max_rate': 5, 'requests': 1207, 'throttled': 0,
+         'waits': 840, 'wait_time': 61.2}
+        >>> limiter.wait_time
+        61.2
+
+        Only adapting to the platform's rate limiting:
+
+        >>> tio = TenableIO(access_key, secret_key, rate_limit=True)
+    '''
+
+    def __init__(self,
+                 rate: Optional[float] = None,
+                 burst: Optional[int] = None,
+                 groups: Optional[Dict[str, Dict[str, Any]]] = None,
+                 **kwargs
+                 ):
+        self.groups = []
+        self.buckets: Dict[str, TokenBucket] = {}
+        for name, group in (groups or {}).items():
+            self.groups.append((name, re.compile(group['pattern'])))
+            self.buckets[name] = TokenBucket(rate=group.get('rate'),
+                                             burst=group.get('burst'),
+                                             **kwargs
+                                             )
+        self.buckets['default'] = TokenBucket(rate=rate, burst=burst, **kwargs)
+
+    def bucket(self, url: str) -> TokenBucket:
+        '''
+        Returns the token bucket of the endpoint group the URL belongs to.
+        '''
+        path = urlparse(url).path
+        for name, pattern in self.groups:
+            if pattern.search(path):
+                return self.buckets[name]
+        return self.buckets['default']
+
+    @property
+    def wait_time(self) -> float:
+        '''
+        The total number of seconds requests have been held across every
+        group.
+        '''
+        return sum(b.wait_time for b in self.buckets.values())
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        '''
+        The per-group statistics.  See :py:attr:`TokenBucket.stats`.
+        '''
+        return {n: b.stats for n, b in self.buckets.items()}
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    '''
+    A requests transport adapter that paces the requests using the rate
+    limiter.
+    '''
+
+    def __init__(self, limiter: Optional[RateLimiter] = None, **kwargs):
+        self.limiter = limiter
+        super().__init__(**kwargs)
+
+    def send(self,  # noqa: PLR0913
+             request: PreparedRequest,
+             **kwargs
+             ) -> Response:
+        if self.limiter is None:
+            return super().send(request, **kwargs)
+        bucket = self.limiter.bucket(request.url)
+        bucket.acquire()
+        resp = super().send(request, **kwargs)
+        if resp.status_code in (429, 503):
+            delay = retry_after(resp)
+            if resp.status_code == 429 or delay:
+                bucket.throttle(delay, limited=resp.status_code == 429)
+        elif resp.status_code < 500:
+            bucket.success()
+        return resp
+
+
+def build_limiter(value: Union[RateLimiter, float, bool, None]
+                  ) -> Optional[RateLimiter]:
+    '''
+    Returns the rate limiter for the ``rate_limit`` platform parameter, which
+    may be a limiter, a number of requests per second, or ``True`` for an
+    adaptive-only limiter.
+    '''
+    if value is None or value is False:
+        return None
+    if isinstance(value, RateLimiter):
+        return value
+    if value is True:
+        return RateLimiter()
+    return RateLimiter(rate=float(value))
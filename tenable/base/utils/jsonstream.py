@@ -0,0 +1,207 @@
+'''
+Incremental JSON array decoding utility.
+'''
+import codecs
+import re
+from json import JSONDecoder, JSONDecodeError
+from typing import Any, Iterable, Iterator, Optional
+
+# The characters that matter when looking for the end of an element outside of
+# a string, and within a string.
+STRUCTURAL = re.compile(r'["{}\[\],]')
+STRING_END = re.compile(r'["\\]')
+NON_WHITESPACE = re.compile(r'[^ \t\n\r]')
+
+
+class _ArrayScanner:
+    '''
+    The state of an incremental JSON array decode.  Each element is located
+    by scanning only the newly received text for the delimiter ending it, and
+    is then decoded exactly once, so that large elements split across many
+    blocks are handled in linear time.
+    '''
+
+    def __init__(self, blocks: Iterable[bytes], compact_at: int):
+        self.blocks = iter(blocks)
+        self.compact_at = compact_at
+        self.decoder = JSONDecoder()
+        self.utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.idx = 0
+        self.eof = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def _read(self) -> Optional[str]:
+        '''
+        Returns the next non-empty block of decoded text, or ``None`` at the
+        end of the stream.  Invalid or truncated UTF-8 data (such as a stream
+        cut off part way through a multi-byte character) is raised as a
+        decode error, just like any other malformed or truncated document.
+        '''
+        if self.eof:
+            return None
+        try:
+            for block in self.blocks:
+                text = self.utf8.decode(block)
+                if text:
+                    return text
+            self.eof = True
+            return self.utf8.decode(b'', final=True) or None
+        except UnicodeDecodeError as err:
+            raise JSONDecodeError(f'Invalid UTF-8 data: {err.reason}',
+                                  self.buffer, len(self.buffer)
+                                  ) from err
+
+    def _peek(self) -> str:
+        '''
+        Skips any whitespace and returns the next character, reading more data
+        as necessary.  Returns an empty string at the end of the stream.
+        '''
+        while True:
+            match = NON_WHITESPACE.search(self.buffer, self.idx)
+            if match:
+                self.idx = match.start()
+                return self.buffer[self.idx]
+            text = self._read()
+            if text is None:
+                self.idx = len(self.buffer)
+                return ''
+            self.buffer = text
+            self.idx = 0
+
+    def _scan(self, text: str, pos: int) -> int:
+        '''
+        Advances the element scan over the text, returning the index of the
+        delimiter ending the element, or ``-1`` if more text is required.
+        '''
+        if self._escape:
+            self._escape = False
+            pos += 1
+        while True:
+            if self._in_string:
+                match = STRING_END.search(text, pos)
+                if match is None:
+                    return -1
+                pos = match.end()
+                if match.group() == '"':
+                    self._in_string = False
+                elif pos >= len(text):
+                    self._escape = True
+                    return -1
+                else:
+                    pos += 1
+                continue
+            match = STRUCTURAL.search(text, pos)
+            if match is None:
+                return -1
+            char = match.group()
+            pos = match.end()
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif self._depth:
+                if char != ',':
+                    self._depth -= 1
+            else:
+                return match.start()
+
+    def _next_element(self) -> Any:
+        '''
+        Reads until the end of the next element has been received and then
+        decodes it.
+        '''
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        end = self._scan(self.buffer, self.idx)
+        if end < 0:
+            parts = [self.buffer[self.idx:]]
+            while end < 0:
+                text = self._read()
+                if text is None:
+                    break
+                end = self._scan(text, 0)
+                parts.append(text)
+            self.buffer = ''.join(parts)
+            self.idx = 0
+        item, self.idx = self.decoder.raw_decode(self.buffer, self.idx)
+        return item
+
+    def _compact(self):
+        '''
+        Drops the already decoded portion of the buffer once it's grown large
+        enough, keeping the memory footprint bounded to roughly the size of a
+        single element.
+        '''
+        if self.idx > self.compact_at:
+            self.buffer = self.buffer[self.idx:]
+            self.idx = 0
+
+    def __iter__(self) -> Iterator[Any]:
+        if self._peek() != '[':
+            raise JSONDecodeError('Expecting a JSON array',
+                                  self.buffer, self.idx
+                                  )
+        self.idx += 1
+        char = self._peek()
+        while char != ']':
+            if not char:
+                raise JSONDecodeError('Unterminated JSON array',
+                                      self.buffer, self.idx
+                                      )
+            yield self._next_element()
+            self._compact()
+            char = self._peek()
+            if char == ',':
+                self.idx += 1
+                char = self._peek()
+                if char == ']':
+                    raise JSONDecodeError('Expecting value',
+                                          self.buffer, self.idx
+                                          )
+            elif char and char != ']':
+                raise JSONDecodeError('Expecting "," delimiter',
+                                      self.buffer, self.idx
+                                      )
+
+        # Anything other than whitespace after the closing bracket is an
+        # error.
+        self.idx += 1
+        if self._peek():
+            raise JSONDecodeError('Extra data', self.buffer, self.idx)
+
+
+def iter_json_array(blocks: Iterable[bytes],
+                    compact_at: int = 1048576
+                    ) -> Iterator[Any]:
+    '''
+    Incrementally decodes a JSON array from an iterable of byte blocks (such as
+    the ``iter_content`` generator of a streamed response), yielding each
+    element of the array as soon as it has been fully received.  Only the
+    element currently being decoded is held in memory.
+
+    Args:
+        blocks (Iterable[bytes]):
+            The raw byte blocks making up the JSON document.
+        compact_at (int, optional):
+            How many characters of already decoded data may accumulate within
+            the buffer before it is compacted.  The default is ``1048576``.
+
+    Raises:
+        JSONDecodeError:
+            If the document is not a JSON array, is malformed, or is truncated.
+
+    Yields:
+        Any:
+            Each element within the array.
+
+    Example:
+
+        >>> resp = requests.get(url, stream=True)
+        >>> for item in iter_json_array(resp.iter_content(65536)):
+        ...     print(item)
+    '''
+    return iter(_ArrayScanner(blocks, compact_at))
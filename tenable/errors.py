@@ -2,9 +2,11 @@
 .. autoclass:: AuthenticationWarning
 .. autoclass:: FileDownloadError
 .. autoclass:: ImpersonationError
+.. autoclass:: PackageMissingError
 .. autoclass:: PasswordComplexityError
 .. autoclass:: TioExportsError
 .. autoclass:: TioExportsTimeout
+.. autoclass:: TioExportChunkError
 '''
 from typing import Optional
 from restfly.errors import *
@@ -66,6 +68,27 @@ class TioExportsTimeout(TioExportsError):
         super().__init__(export, uuid, msg)
 
 
+class TioExportChunkError(TioExportsError):
+    '''
+    When an export chunk could not be downloaded after exhausting the retries,
+    this error is thrown.  The last underlying error is chained as the cause.
+    '''
+
+    def __init__(self,
+                 export: str,
+                 uuid: str,
+                 chunk_id: int,
+                 attempts: int = 1,
+                 msg: Optional[str] = None
+                 ):
+        self.chunk_id = chunk_id
+        self.attempts = attempts
+        if not msg:
+            msg = (f'{export} export {uuid} chunk {chunk_id} failed after '
+                   f'{attempts} attempts.')
+        super().__init__(export, uuid, msg)
+
+
 class ImpersonationError(APIError):
     '''
     An ImpersonationError exists when there is an issue with user
@@ -84,6 +107,13 @@ class ImpersonationError(APIError):
     '''
 
 
+class PackageMissingError(RestflyException):
+    '''
+    PackageMissingError is thrown when an optional python package required by
+    the requested functionality has not been installed.
+    '''
+
+
 class PasswordComplexityError(APIError):
     '''
     PasswordComplexityError is thrown when attempting to change a password and
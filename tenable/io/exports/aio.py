@@ -0,0 +1,430 @@
+'''
+The asynchronous exports iterator allows for exports to be driven from within
+an asyncio event loop.  Instead of relying on a thread per request, chunks are
+fetched concurrently using a single aiohttp session, allowing a single process
+to keep many exports (and many chunk downloads) in flight at the same time.
+
+Using the asynchronous iterator requires the ``aiohttp`` package to be
+installed, which can be installed along with pyTenable using the ``async``
+extra (``pip install pytenable[async]``).
+
+.. autoclass:: AsyncExportsIterator
+    :members:
+'''
+import asyncio
+import inspect
+import json
+from typing import Optional, Dict, Any, List, Tuple
+from box import Box
+from tenable.base.ratelimit import retry_after
+from tenable.errors import (PackageMissingError,
+                            TioExportChunkError,
+                            TioExportsError,
+                            TioExportsTimeout
+                            )
+from .iterator import ExportsIterator
+
+try:
+    import aiohttp
+except ImportError:
+    raise PackageMissingError(
+        'The python package aiohttp is required for AsyncExportsIterator')
+
+
+class AsyncExportsIterator(ExportsIterator):  # noqa: PLR0902
+    '''
+    The asynchronous export iterator shares the status, chunk, and cancel
+    semantics of the :obj:`ExportsIterator`, however all of the network calls
+    are performed using asyncio.  The iterator is consumed using either
+    ``async for`` or the :py:meth:`run_async` method.
+
+    The iterator can be passed to any of the export methods using the
+    ``iterator`` parameter.  When doing so, the export job itself will be
+    requested from within the event loop the first time that the iterator is
+    consumed.
+
+    Attributes:
+        concurrency (int):
+            The maximum number of chunks to download concurrently.
+        payload (dict):
+            The export request body to send if the export job has yet to be
+            requested.
+
+    Examples:
+
+        >>> async def main():
+        ...     export = tio.exports.vulns(iterator=AsyncExportsIterator)
+        ...     async with export:
+        ...         async for vuln in export:
+        ...             print(vuln)
+        >>>
+        >>> asyncio.run(main())
+    '''
+    concurrency: int = 8
+    payload: Optional[Dict] = None
+    _is_async: bool = True
+
+    def __init__(self, api, **kwargs):
+        self._session = None
+        self._semaphore = None
+        self._tasks = set()
+        self._ready = []
+        super().__init__(api, **kwargs)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, exc_traceback):
+        await self.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._is_iterator is None:
+            self._is_iterator = True
+        elif not self._is_iterator:
+            raise TioExportsError(export=self.type,
+                                  uuid=self.uuid,
+                                  msg=(f'ExportIterator for {self.uuid} '
+                                       'already set to run as a threaded '
+                                       'job.  Cannot perform iterable '
+                                       'operations.')
+                                  )
+
+        # If we have worked through the current page of records then we should
+        # wait for the next downloaded page of records.
+        while self.page_count >= len(self.page):
+            if self.page:
+                self._chunk_completed(self.chunk_id)
+            self.chunk_id, self.page = await self._get_page_async()
+            self.page_count = 0
+
+        item = self.page[self.page_count]
+        self.count += 1
+        self.page_count += 1
+        if self.boxify and not self.compact:
+            return Box(item)
+        return item
+
+    def _build_session(self):
+        '''
+        Builds the aiohttp session using the headers, cookies, and connection
+        settings of the synchronous API session.
+        '''
+        session = self._api._session
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            ssl=None if self._api._ssl_verify else False
+        )
+        self._session = aiohttp.ClientSession(
+            headers=dict(session.headers),
+            cookies=session.cookies.get_dict(),
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self._api._timeout),
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def _request(self, method: str, path: str, **kwargs) -> Any:
+        '''
+        Performs the HTTP call and returns the decoded JSON response.  Rate
+        limited and server-side errors will be retried using the backoff
+        settings of the API session, and are raised as a
+        ``ClientResponseError`` once those retries are exhausted so that the
+        chunk downloader treats them as transient.
+        '''
+        if not self._session:
+            self._build_session()
+        url = f'{self._api._url}/{path}'
+        proxies = self._api._session.proxies or {}
+        retries = 0
+        while True:
+            async with self._session.request(method,
+                                             url,
+                                             proxy=proxies.get('https'),
+                                             **kwargs
+                                             ) as resp:
+                if (
+                    (resp.status == 429 or resp.status >= 500)
+                    and retries < self._api._retries
+                ):
+                    retries += 1
+                    delay = retry_after(resp)
+                    if delay is None:
+                        delay = retries * self._api._backoff
+                    await asyncio.sleep(delay)
+                    continue
+                if resp.status == 429 or resp.status >= 500:
+                    resp.raise_for_status()
+                if not 200 <= resp.status < 300:
+                    raise TioExportsError(
+                        export=self.type,
+                        uuid=self.uuid,
+                        msg=(f'{method} {path} returned an unexpected '
+                             f'status code of {resp.status}')
+                    )
+                body = await resp.read()
+            return json.loads(body) if body else None
+
+    async def _start(self):
+        '''
+        Requests the export job if we haven't been handed an export UUID.
+        '''
+        if not self.uuid:
+            resp = await self._request('POST',
+                                       f'{self.type}/export',
+                                       json=self.payload or {}
+                                       )
+            self.uuid = resp['export_uuid']
+            self._log.debug(f'{self.type} export job {self.uuid} initiated')
+            self._load_checkpoint()
+
+    async def _get_status_async(self) -> Dict:
+        '''
+        Asynchronous counterpart to the status call.
+        '''
+        await self._start()
+        status = Box(await self._request(
+            'GET', f'{self.type}/export/{self.uuid}/status'
+        ))
+        if self._is_timed_out(status):
+            await self.cancel()
+            raise TioExportsTimeout(self.type, self.uuid)
+        return self._parse_status(status)
+
+    async def _get_chunks_async(self) -> List[int]:
+        '''
+        Asynchronous counterpart to the chunk list updater.  If no chunks are
+        waiting to be processed, we will wait for more chunks to become
+        available or for the export to finish.
+        '''
+        if len(self.chunks) < 1:
+            status = await self._get_status_async()
+            attempt = 0
+            while (len(status.chunks_unfinished) < 1
+                   and status.status not in ['ERROR', 'FINISHED']
+                   ):
+                await asyncio.sleep(self.polling.delay(status, attempt))
+                attempt += 1
+                status = await self._get_status_async()
+        return self.chunks
+
+    async def download_chunk(self, chunk_id: int) -> List[Dict]:
+        '''
+        Downloads the specified chunk of the export.  As with the synchronous
+        downloader, chunks that fail to decode, whose connection fails, or
+        that keep returning a server-side error will be retried as the
+        iterator's retry policy dictates, and a
+        :obj:`TioExportChunkError` is raised once the retries are exhausted.
+
+        Args:
+            chunk_id (int): The chunk id to download.
+
+        Returns:
+            list[dict]:
+                The list of objects within the chunk.
+        '''
+        await self._start()
+        if not self._session:
+            self._build_session()
+        path = f'{self.type}/export/{self.uuid}/chunks/{chunk_id}'
+        attempt = 0
+        async with self._semaphore:
+            while True:
+                try:
+                    resp = await self._request('GET', path) or []
+                    break
+                except (json.JSONDecodeError,
+                        aiohttp.ClientError,
+                        asyncio.TimeoutError
+                        ) as err:
+                    if attempt >= self.retry.retries:
+                        raise TioExportChunkError(self.type,
+                                                  self.uuid,
+                                                  chunk_id,
+                                                  attempts=attempt + 1
+                                                  ) from err
+                    delay = self.retry.delay(attempt)
+                    self._log.warning((
+                        f'{self.type} export {self.uuid} encountered an '
+                        f'error on chunk id {chunk_id} ({err!r}), retrying '
+                        f'in {delay:.2f}s'
+                    ))
+                    await asyncio.sleep(delay)
+                    attempt += 1
+        if len(resp) < 1:
+            self._log.warning((
+                f'{self.type} export {self.uuid} encoundered an empty '
+                f'chunk on chunk id {chunk_id}'
+            ))
+        if self.spool:
+            self.spool.write(self.type, self.uuid, chunk_id, resp)
+        return self._transform(resp)
+
+    async def _fetch(self, chunk_id: int) -> Tuple[int, List[Dict]]:
+        '''
+        Downloads the chunk and returns it alongside the chunk id.  Chunks that
+        can't be downloaded are recorded within the failed chunk ledger and
+        returned without any data.
+        '''
+        try:
+            return chunk_id, await self.download_chunk(chunk_id)
+        except TioExportChunkError as err:
+            self._chunk_failed(chunk_id, err)
+            return chunk_id, None
+
+    def _schedule(self):
+        '''
+        Creates download tasks for the known chunks up to the concurrency
+        limit.
+        '''
+        while self.chunks and len(self._tasks) < self.concurrency:
+            chunk_id = self._next_chunk()
+            self._tasks.add(asyncio.ensure_future(self._fetch(chunk_id)))
+
+    async def _get_page_async(self) -> Tuple[int, List[Dict]]:
+        '''
+        Returns the next non-empty page of data, downloading the available
+        chunks concurrently.
+        '''
+        while not self._ready:
+            # If nothing is currently being downloaded, then we need to wait
+            # for chunks to be made available.  Otherwise we will perform a
+            # single status call to pick up any new chunks.
+            if not self._tasks:
+                await self._get_chunks_async()
+            elif not self.chunks and self.status not in ['ERROR', 'FINISHED']:
+                await self._get_status_async()
+            self._schedule()
+
+            if not self._tasks:
+                self._export_completed()
+                await self.close()
+                raise StopAsyncIteration()
+
+            done, self._tasks = await asyncio.wait(
+                self._tasks, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                chunk_id, page = task.result()
+                if page is None:
+                    continue
+                if len(page) > 0:
+                    self._ready.append((chunk_id, page))
+                else:
+                    self._chunk_completed(chunk_id, empty=True)
+        return self._ready.pop(0)
+
+    async def cancel(self):
+        '''
+        Cancels the current export
+        '''
+        await self._request('POST', f'{self.type}/export/{self.uuid}/cancel')
+
+    async def close(self):
+        '''
+        Closes the underlying aiohttp session.
+        '''
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = set()
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    def next(self):
+        '''
+        Synchronous iteration is not supported by the asynchronous iterator.
+        '''
+        raise TioExportsError(export=self.type,
+                              uuid=self.uuid,
+                              msg=('AsyncExportsIterator must be consumed '
+                                   'with "async for" or run_async.')
+                              )
+
+    def run_threaded(self, *args, **kwargs):
+        '''
+        Threaded processing is not supported by the asynchronous iterator.
+        Use :py:meth:`run_async` instead.
+        '''
+        raise TioExportsError(export=self.type,
+                              uuid=self.uuid,
+                              msg=('AsyncExportsIterator must be consumed '
+                                   'with "async for" or run_async.')
+                              )
+
+    async def run_async(self,
+                        func: Any,
+                        kwargs: Optional[Dict] = None,
+                        concurrency: Optional[int] = None,
+                        ):
+        '''
+        Downloads all of the chunks concurrently and passes each chunk to the
+        provided function.  The function may be either a coroutine function
+        or a regular function.  The same reserved field names apply as with
+        :py:meth:`ExportsIterator.run_threaded`.
+
+        Args:
+            func:
+                The function or coroutine function to call for each chunk.
+            kwargs:
+                Any additional keyword arguments that are to be passed to the
+                function as part of execution.
+            concurrency:
+                How many chunks should be downloaded concurrently.  If left
+                unspecified, the iterator's ``concurrency`` attribute is used.
+
+        Examples:
+
+            >>> async def write_chunk(data, export_uuid, export_type,
+            ...                       export_chunk_id):
+            ...     fn = f'{export_type}-{export_uuid}-{export_chunk_id}.json'
+            ...     with open(fn, 'w') as fobj:
+            ...         json.dump(data, fobj)
+            >>>
+            >>> export = tio.exports.vulns(iterator=AsyncExportsIterator)
+            >>> asyncio.run(export.run_async(write_chunk, concurrency=64))
+        '''
+        if not kwargs:
+            kwargs = {}
+        if concurrency:
+            self.concurrency = concurrency
+
+        if self._is_iterator is None:
+            self._is_iterator = False
+        elif self._is_iterator:
+            raise TioExportsError(export=self.type,
+                                  uuid=self.uuid,
+                                  msg=(f'ExportIterator for {self.uuid} '
+                                       'already set to run as an iterable '
+                                       'job.  Cannot perform threaded '
+                                       'operations.')
+                                  )
+
+        async def process(chunk_id: int):
+            job = dict(kwargs)
+            try:
+                job['data'] = await self.download_chunk(chunk_id)
+            except TioExportChunkError as err:
+                self._chunk_failed(chunk_id, err)
+                return
+            job['export_uuid'] = self.uuid
+            job['export_type'] = self.type
+            job['export_chunk_id'] = chunk_id
+            resp = func(**job)
+            if inspect.isawaitable(resp):
+                await resp
+            self._chunk_completed(chunk_id, empty=len(job['data']) < 1)
+
+        tasks = []
+        try:
+            while not (len(await self._get_chunks_async()) < 1
+                       and self.status in ['ERROR', 'FINISHED']
+                       ):
+                while self.chunks:
+                    chunk_id = self._next_chunk()
+                    tasks.append(asyncio.ensure_future(process(chunk_id)))
+            await asyncio.gather(*tasks)
+            self._export_completed()
+        finally:
+            await self.close()
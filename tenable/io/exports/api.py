@@ -11,14 +11,24 @@ Methods available on ``tio.exports``:
 .. autoclass:: ExportsAPI
     :members:
 '''
+import time
 from uuid import UUID
 from json.decoder import JSONDecodeError
 from typing_extensions import Literal
-from typing import Dict, Union, List
+from typing import Dict, Union, List, Iterator, Optional
 from marshmallow import Schema
 from tenable.base.endpoint import APIEndpoint
+from tenable.base.utils.jsonstream import iter_json_array
+from tenable.errors import TioExportChunkError
 from .schema import AssetExportSchema, VulnExportSchema, ComplianceExportSchema
 from .iterator import ExportsIterator
+from .retry import ChunkRetryPolicy
+from .sizing import SIZE_PARAMS
+
+# The keyword arguments that are passed through to the export iterator as-is.
+ITERATOR_OPTIONS = ('checkpoint', 'spool', 'stream', 'polling', 'projection',
+                    'compact', 'retry', 'sizer'
+                    )
 
 
 class ExportsAPI(APIEndpoint):
@@ -53,15 +63,55 @@ class ExportsAPI(APIEndpoint):
                               box=True
                               ).get('status')
 
+    def _retry_chunk(self,
+                     policy: ChunkRetryPolicy,
+                     export_type: str,
+                     export_uuid: UUID,
+                     chunk_id: int,
+                     attempt: int,
+                     err: Exception
+                     ):
+        '''
+        Handles a failed chunk download attempt.  Transient errors are logged
+        and waited out as the retry policy dictates until the retries have
+        been exhausted, at which point a TioExportChunkError is raised.  Any
+        other error is re-raised as-is.
+        '''
+        if not policy.is_retryable(err):
+            raise err
+        if attempt >= policy.retries:
+            self._log.error(
+                f'{export_type} export {export_uuid} chunk {chunk_id} failed '
+                f'after {attempt + 1} attempts: {err!r}'
+            )
+            raise TioExportChunkError(export_type,
+                                      export_uuid,
+                                      chunk_id,
+                                      attempts=attempt + 1
+                                      ) from err
+        delay = policy.delay(attempt)
+        self._log.warning(
+            f'{export_type} export {export_uuid} encountered an error on '
+            f'chunk id {chunk_id} ({err!r}), retrying in {delay:.2f}s'
+        )
+        time.sleep(delay)
+
     def download_chunk(self,
                        export_type: Literal['vulns', 'assets', 'compliance'],
                        export_uuid: UUID,
                        chunk_id: int,
-                       retries: int = 3
+                       retries: int = 3,
+                       policy: Optional[ChunkRetryPolicy] = None
                        ) -> List:
         '''
         Downloads an export chunk from the specified job.
 
+        Connection resets, timeouts, server-side errors, and truncated chunk
+        bodies are retried using exponential backoff with jitter.  If the
+        chunk still can't be downloaded once the retries have been exhausted,
+        a :obj:`TioExportChunkError` is raised, so that a dead chunk can't be
+        mistaken for an empty one.
+
         API Documentation for downloading an export chunk for
         :devportal:`assets <exports-assets-download-chunk>`,
         :devportal:`compliance <io-exports-compliance-download>`, and
@@ -74,6 +124,13 @@ class ExportsAPI(APIEndpoint):
                 The export job's unique identifier.
             chunk_id:
                 The identifier for the specific chunk to download.
+            retries:
+                How many times should a failed chunk be retried?  The default
+                is ``3``.  Ignored if a ``policy`` is specified.
+            policy:
+                The retry policy to use.  If left unspecified, a
+                :obj:`ChunkRetryPolicy` with the specified number of retries
+                is used.
 
         Returns:
             List:
@@ -83,25 +140,22 @@ class ExportsAPI(APIEndpoint):
 
             >>> chunk = tio.exports.download_chunk('vulns', '{UUID}', 1)
         '''
-        # We will attempt to download a chunk of data and convert it into JSON.
-        # If the conversion fails, then we will increment our own retry counter
-        # and attempt to download the chunk again.  After 3 attempts, we will
-        # assume that the chunk is dead and return an empty list.
-        downloaded = False
-        counter = 0
-        resp = []
-        while not downloaded and counter <= retries:
+        policy = policy or ChunkRetryPolicy(retries=retries)
+        path = f'{export_type}/export/{export_uuid}/chunks/{chunk_id}'
+        attempt = 0
+        while True:
             try:
-                resp = self._api.get(
-                    f'{export_type}/export/{export_uuid}/chunks/{chunk_id}'
-                ).json()
-                downloaded = True
-            except JSONDecodeError:
-                self._log.warning((
-                    f'{export_type} export {export_uuid} encountered an '
-                    f'invalid chunk on chunk id {chunk_id}'
-                ))
-                counter += 1
+                resp = self._api.get(path).json()
+                break
+            except Exception as err:  # noqa: PLW0703
+                self._retry_chunk(policy,
+                                  export_type,
+                                  export_uuid,
+                                  chunk_id,
+                                  attempt,
+                                  err
+                                  )
+                attempt += 1
         if len(resp) < 1:
             self._log.warning((
                 f'{export_type} export {export_uuid} encoundered an empty '
@@ -109,6 +163,142 @@ class ExportsAPI(APIEndpoint):
             ))
         return resp
 
+    def download_chunk_raw(self,
+                           export_type: Literal['vulns', 'assets',
+                                                'compliance'],
+                           export_uuid: UUID,
+                           chunk_id: int,
+                           policy: Optional[ChunkRetryPolicy] = None
+                           ) -> bytes:
+        '''
+        Downloads an export chunk from the specified job without decoding it.
+        Useful when the decoding is to be performed elsewhere, such as within
+        a worker process.  Failed downloads are retried in the same way as
+        :py:meth:`download_chunk`.  As the body isn't decoded, a truncated
+        chunk is detected by the body not ending with the closing bracket of
+        the JSON array.
+
+        Args:
+            export_type:
+                The type of export job
+            export_uuid:
+                The export job's unique identifier.
+            chunk_id:
+                The identifier for the specific chunk to download.
+            policy:
+                The retry policy to use.  If left unspecified, the default
+                :obj:`ChunkRetryPolicy` is used.
+
+        Returns:
+            bytes:
+                The raw JSON body of the chunk.
+
+        Example:
+
+            >>> raw = tio.exports.download_chunk_raw('vulns', '{UUID}', 1)
+        '''
+        policy = policy or ChunkRetryPolicy()
+        path = f'{export_type}/export/{export_uuid}/chunks/{chunk_id}'
+        attempt = 0
+        while True:
+            try:
+                raw = self._api.get(path).content
+                body = raw.rstrip()
+                if body and not body.endswith(b']'):
+                    raise JSONDecodeError('Truncated chunk body',
+                                          body[-32:].decode(errors='replace'),
+                                          len(body)
+                                          )
+                return raw
+            except Exception as err:  # noqa: PLW0703
+                self._retry_chunk(policy,
+                                  export_type,
+                                  export_uuid,
+                                  chunk_id,
+                                  attempt,
+                                  err
+                                  )
+                attempt += 1
+
+    def stream_chunk(self,
+                     export_type: Literal['vulns', 'assets', 'compliance'],
+                     export_uuid: UUID,
+                     chunk_id: int,
+                     retries: int = 3,
+                     block_size: int = 65536,
+                     policy: Optional[ChunkRetryPolicy] = None
+                     ) -> Iterator[Dict]:
+        '''
+        Streams an export chunk from the specified job, decoding and yielding
+        each record as it's received instead of buffering the whole chunk.
+
+        If the chunk turns out to be corrupt or the connection drops part way
+        through, the chunk will be requested again and the records that have
+        already been yielded will be skipped.  Retries use exponential backoff
+        with jitter, and once they have been exhausted a
+        :obj:`TioExportChunkError` is raised.  Note that the records yielded
+        before the error will have already been handed to the caller.
+
+        Args:
+            export_type:
+                The type of export job
+            export_uuid:
+                The export job's unique identifier.
+            chunk_id:
+                The identifier for the specific chunk to download.
+            retries:
+                How many times should a failed chunk be retried?  The default
+                is ``3``.  Ignored if a ``policy`` is specified.
+            block_size:
+                The number of bytes to read from the response at a time.  The
+                default is ``65536``.
+            policy:
+                The retry policy to use.  If left unspecified, a
+                :obj:`ChunkRetryPolicy` with the specified number of retries
+                is used.
+
+        Yields:
+            Dict:
+                Each object within the chunk of data requested.
+
+        Example:
+
+            >>> for item in tio.exports.stream_chunk('vulns', '{UUID}', 1):
+            ...     print(item)
+        '''
+        policy = policy or ChunkRetryPolicy(retries=retries)
+        path = f'{export_type}/export/{export_uuid}/chunks/{chunk_id}'
+        yielded = 0
+        attempt = 0
+        while True:
+            try:
+                resp = self._api.get(path, stream=True)
+                try:
+                    records = iter_json_array(resp.iter_content(block_size))
+                    for idx, record in enumerate(records):
+                        # Skip the records we have already handed back to the
+                        # caller from a prior attempt.
+                        if idx >= yielded:
+                            yielded += 1
+                            yield record
+                finally:
+                    resp.close()
+                break
+            except Exception as err:  # noqa: PLW0703
+                self._retry_chunk(policy,
+                                  export_type,
+                                  export_uuid,
+                                  chunk_id,
+                                  attempt,
+                                  err
+                                  )
+                attempt += 1
+        if yielded < 1:
+            self._log.warning((
+                f'{export_type} export {export_uuid} encoundered an empty '
+                f'chunk on chunk id {chunk_id}'
+            ))
+
     def status(self,
                export_type: Literal['vulns', 'assets', 'compliance'],
                export_uuid: UUID,
@@ -174,8 +364,31 @@ class ExportsAPI(APIEndpoint):
         when_done = kwargs.pop('when_done', False)
         Iterator = kwargs.pop('iterator', ExportsIterator)  # noqa: PLC0103
         timeout = kwargs.pop('timeout', None)
+        options = {k: kwargs.pop(k) for k in ITERATOR_OPTIONS if k in kwargs}
+
+        # If a chunk sizer has been provided and the chunk size parameter
+        # wasn't explicitly set, then we will use the recommended size based
+        # on the chunks of the prior exports.
+        param = SIZE_PARAMS[export_type][0]
+        if options.get('sizer') and param not in kwargs:
+            kwargs[param] = options['sizer'].recommend(export_type)
+            self._log.debug(f'{export_type} export using the recommended '
+                            f'{param} of {kwargs[param]}'
+                            )
         payload = schema.dump(schema.load(kwargs))
 
+        # Asynchronous iterators will request the export job from within the
+        # event loop, so we will simply hand the payload off to the iterator.
+        if use_iterator and getattr(Iterator, '_is_async', False):
+            return Iterator(self._api,
+                            type=export_type,
+                            uuid=export_uuid,
+                            payload=payload,
+                            _wait_for_complete=when_done,
+                            timeout=timeout,
+                            **options
+                            )
+
         if not export_uuid:
             export_uuid = self._api.post(f'{export_type}/export',
                                          json=payload,
@@ -189,7 +402,8 @@ class ExportsAPI(APIEndpoint):
                             type=export_type,
                             uuid=export_uuid,
                             _wait_for_complete=when_done,
-                            timeout=timeout
+                            timeout=timeout,
+                            **options
                             )
         return UUID(export_uuid)
 
@@ -257,6 +471,42 @@ class ExportsAPI(APIEndpoint):
             iterator (Iterator, optional):
                 Supports overloading the iterator class to be used to process
                 the datachunks.
+            checkpoint (ExportCheckpoint, optional):
+                A checkpoint store to record the completed chunks within.  When
+                combined with the ``uuid`` of a previously started export, the
+                chunks that have already been completed will be skipped.
+            spool (ExportSpool, optional):
+                A local spool to write each downloaded chunk into so that the
+                export can later be replayed from disk.
+            stream (bool, optional):
+                Should the chunks be decoded incrementally as they're received
+                instead of being fully buffered?  Useful to bound the memory
+                used for large chunks.  The default is ``False``.
+            polling (PollingPolicy, optional):
+                The policy to use to determine how long to wait between status
+                polls while no chunks are ready.  If left unspecified, a linear
+                backoff capped at 30 seconds is used.
+            projection (list[str], optional):
+                The dotted field paths to keep within each record, such as
+                ``asset.uuid`` or ``plugin.id``.  All other fields are dropped
+                as soon as each chunk is decoded.
+            compact (bool, optional):
+                Should the records be returned as compact slotted records
+                instead of dictionaries?  Compact records use a fraction of the
+                memory and support the same read-only access patterns.  The
+                default is ``False``.
+            retry (ChunkRetryPolicy, optional):
+                The policy to use when retrying failed chunk downloads.  Chunks
+                that still fail once the retries have been exhausted are
+                recorded within the iterator's ``failed_chunks`` ledger and
+                can be re-fetched later using ``retry_failed``.  If left
+                unspecified, each chunk is retried up to 3 times using
+                exponential backoff with jitter.
+            sizer (ChunkSizer, optional):
+                A chunk sizer to measure the downloaded chunks with.  If
+                ``chunk_size`` isn't specified, the sizer will choose it based
+                on the chunks of the prior exports, targeting the sizer's
+                chunk size and latency.
 
         Examples:
 
@@ -317,6 +567,42 @@ class ExportsAPI(APIEndpoint):
             iterator (Iterator, optional):
                 Supports overloading the iterator class to be used to process
                 the datachunks.
+            checkpoint (ExportCheckpoint, optional):
+                A checkpoint store to record the completed chunks within.  When
+                combined with the ``uuid`` of a previously started export, the
+                chunks that have already been completed will be skipped.
+            spool (ExportSpool, optional):
+                A local spool to write each downloaded chunk into so that the
+                export can later be replayed from disk.
+            stream (bool, optional):
+                Should the chunks be decoded incrementally as they're received
+                instead of being fully buffered?  Useful to bound the memory
+                used for large chunks.  The default is ``False``.
+            polling (PollingPolicy, optional):
+                The policy to use to determine how long to wait between status
+                polls while no chunks are ready.  If left unspecified, a linear
+                backoff capped at 30 seconds is used.
+            projection (list[str], optional):
+                The dotted field paths to keep within each record, such as
+                ``asset.uuid`` or ``plugin.id``.  All other fields are dropped
+                as soon as each chunk is decoded.
+            compact (bool, optional):
+                Should the records be returned as compact slotted records
+                instead of dictionaries?  Compact records use a fraction of the
+                memory and support the same read-only access patterns.  The
+                default is ``False``.
+            retry (ChunkRetryPolicy, optional):
+                The policy to use when retrying failed chunk downloads.  Chunks
+                that still fail once the retries have been exhausted are
+                recorded within the iterator's ``failed_chunks`` ledger and
+                can be re-fetched later using ``retry_failed``.  If left
+                unspecified, each chunk is retried up to 3 times using
+                exponential backoff with jitter.
+            sizer (ChunkSizer, optional):
+                A chunk sizer to measure the downloaded chunks with.  If
+                ``num_findings`` isn't specified, the sizer will choose it
+                based on the chunks of the prior exports, targeting the
+                sizer's chunk size and latency.
 
         Examples:
 
@@ -423,6 +709,42 @@ class ExportsAPI(APIEndpoint):
             iterator (Iterator, optional):
                 Supports overloading the iterator class to be used to process
                 the datachunks.
+            checkpoint (ExportCheckpoint, optional):
+                A checkpoint store to record the completed chunks within.  When
+                combined with the ``uuid`` of a previously started export, the
+                chunks that have already been completed will be skipped.
+            spool (ExportSpool, optional):
+                A local spool to write each downloaded chunk into so that the
+                export can later be replayed from disk.
+            stream (bool, optional):
+                Should the chunks be decoded incrementally as they're received
+                instead of being fully buffered?  Useful to bound the memory
+                used for large chunks.  The default is ``False``.
+            polling (PollingPolicy, optional):
+                The policy to use to determine how long to wait between status
+                polls while no chunks are ready.  If left unspecified, a linear
+                backoff capped at 30 seconds is used.
+            projection (list[str], optional):
+                The dotted field paths to keep within each record, such as
+                ``asset.uuid`` or ``plugin.id``.  All other fields are dropped
+                as soon as each chunk is decoded.
+            compact (bool, optional):
+                Should the records be returned as compact slotted records
+                instead of dictionaries?  Compact records use a fraction of the
+                memory and support the same read-only access patterns.  The
+                default is ``False``.
+            retry (ChunkRetryPolicy, optional):
+                The policy to use when retrying failed chunk downloads.  Chunks
+                that still fail once the retries have been exhausted are
+                recorded within the iterator's ``failed_chunks`` ledger and
+                can be re-fetched later using ``retry_failed``.  If left
+                unspecified, each chunk is retried up to 3 times using
+                exponential backoff with jitter.
+            sizer (ChunkSizer, optional):
+                A chunk sizer to measure the downloaded chunks with.  If
+                ``num_assets`` isn't specified, the sizer will choose it based
+                on the chunks of the prior exports, targeting the sizer's
+                chunk size and latency.
 
         Examples:
 
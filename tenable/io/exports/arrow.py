@@ -0,0 +1,429 @@
+'''
+The Arrow export sink converts export chunks into columnar record batches with
+a stable schema for each export type and writes them out as either Parquet or
+Arrow IPC files.  The sink is a callable that can be handed directly to
+:py:meth:`ExportsIterator.run_threaded`, so the conversion of each chunk
+happens in parallel within the worker threads while the writes themselves are
+serialized.  Each chunk is written out as soon as it has been converted,
+keeping memory usage bounded to the chunks currently in flight.
+
+Using the Arrow sink requires the ``pyarrow`` package to be installed, which
+can be installed along with pyTenable using the ``arrow`` extra
+(``pip install pytenable[arrow]``).
+
+.. autoclass:: ArrowSink
+    :members:
+
+.. autofunction:: chunk_to_batch
+
+.. autofunction:: export_schema
+'''
+import json
+from collections.abc import Mapping
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from dateutil.parser import isoparse
+from tenable.errors import PackageMissingError
+from .records import json_default
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    raise PackageMissingError(
+        'The python package pyarrow is required for ArrowSink')
+
+
+# Column definitions are a list of (dotted path, arrow type) pairs.  Columns
+# defined with the JSON type will have the value serialized into a JSON string,
+# which is used for the deeply nested or loosely structured fields.
+JSON = 'json'
+TIMESTAMP = pa.timestamp('ms', tz='UTC')
+STRINGS = pa.list_(pa.string())
+
+VULN_COLUMNS = [
+    ('asset.uuid', pa.string()),
+    ('asset.hostname', pa.string()),
+    ('asset.fqdn', pa.string()),
+    ('asset.ipv4', pa.string()),
+    ('asset.ipv6', pa.string()),
+    ('asset.mac_address', pa.string()),
+    ('asset.netbios_name', pa.string()),
+    ('asset.network_id', pa.string()),
+    ('asset.operating_system', STRINGS),
+    ('asset.device_type', pa.string()),
+    ('asset.agent_uuid', pa.string()),
+    ('asset.tracked', pa.bool_()),
+    ('plugin.id', pa.int64()),
+    ('plugin.name', pa.string()),
+    ('plugin.family', pa.string()),
+    ('plugin.type', pa.string()),
+    ('plugin.risk_factor', pa.string()),
+    ('plugin.cve', STRINGS),
+    ('plugin.cvss_base_score', pa.float64()),
+    ('plugin.cvss_temporal_score', pa.float64()),
+    ('plugin.cvss3_base_score', pa.float64()),
+    ('plugin.cvss3_temporal_score', pa.float64()),
+    ('plugin.vpr.score', pa.float64()),
+    ('plugin.exploit_available', pa.bool_()),
+    ('plugin.has_patch', pa.bool_()),
+    ('plugin.publication_date', TIMESTAMP),
+    ('plugin.patch_publication_date', TIMESTAMP),
+    ('plugin.synopsis', pa.string()),
+    ('plugin.solution', pa.string()),
+    ('port.port', pa.int64()),
+    ('port.protocol', pa.string()),
+    ('port.service', pa.string()),
+    ('scan.uuid', pa.string()),
+    ('scan.schedule_uuid', pa.string()),
+    ('scan.started_at', TIMESTAMP),
+    ('scan.completed_at', TIMESTAMP),
+    ('severity', pa.string()),
+    ('severity_id', pa.int64()),
+    ('state', pa.string()),
+    ('first_found', TIMESTAMP),
+    ('last_found', TIMESTAMP),
+    ('last_fixed', TIMESTAMP),
+    ('indexed', TIMESTAMP),
+    ('output', pa.string()),
+]
+
+ASSET_COLUMNS = [
+    ('id', pa.string()),
+    ('has_agent', pa.bool_()),
+    ('has_plugin_results', pa.bool_()),
+    ('created_at', TIMESTAMP),
+    ('updated_at', TIMESTAMP),
+    ('deleted_at', TIMESTAMP),
+    ('terminated_at', TIMESTAMP),
+    ('first_seen', TIMESTAMP),
+    ('last_seen', TIMESTAMP),
+    ('first_scan_time', TIMESTAMP),
+    ('last_scan_time', TIMESTAMP),
+    ('last_authenticated_scan_date', TIMESTAMP),
+    ('last_licensed_scan_date', TIMESTAMP),
+    ('agent_uuid', pa.string()),
+    ('bios_uuid', pa.string()),
+    ('network_id', pa.string()),
+    ('network_name', pa.string()),
+    ('acr_score', pa.float64()),
+    ('exposure_score', pa.float64()),
+    ('agent_names', STRINGS),
+    ('ipv4s', STRINGS),
+    ('ipv6s', STRINGS),
+    ('fqdns', STRINGS),
+    ('hostnames', STRINGS),
+    ('mac_addresses', STRINGS),
+    ('netbios_names', STRINGS),
+    ('operating_systems', STRINGS),
+    ('system_types', STRINGS),
+    ('installed_software', STRINGS),
+    ('ssh_fingerprints', STRINGS),
+    ('qualys_asset_ids', STRINGS),
+    ('servicenow_sysid', pa.string()),
+    ('sources', JSON),
+    ('tags', JSON),
+    ('network_interfaces', JSON),
+]
+
+COMPLIANCE_COLUMNS = [
+    ('asset_uuid', pa.string()),
+    ('first_seen', TIMESTAMP),
+    ('last_seen', TIMESTAMP),
+    ('audit_file', pa.string()),
+    ('check_id', pa.string()),
+    ('check_name', pa.string()),
+    ('check_info', pa.string()),
+    ('expected_value', pa.string()),
+    ('actual_value', pa.string()),
+    ('status', pa.string()),
+    ('state', pa.string()),
+    ('plugin_id', pa.int64()),
+    ('solution', pa.string()),
+    ('see_also', pa.string()),
+    ('reference', JSON),
+]
+
+COLUMNS = {
+    'vulns': VULN_COLUMNS,
+    'assets': ASSET_COLUMNS,
+    'compliance': COMPLIANCE_COLUMNS,
+}
+
+
+def export_schema(export_type: str,
+                  columns: Optional[List[Tuple[str, Any]]] = None
+                  ) -> 'pa.Schema':
+    '''
+    Returns the Arrow schema for the export type.
+
+    Args:
+        export_type (str):
+            The export datatype (``vulns``, ``assets``, or ``compliance``).
+        columns (list[tuple[str, Any]], optional):
+            Overrides the default column definitions for the export type.
+
+    Returns:
+        pyarrow.Schema:
+            The export schema.  Column names are the dotted field paths.
+    '''
+    columns = columns or COLUMNS[export_type]
+    return pa.schema([(path, pa.string() if dtype == JSON else dtype)
+                      for path, dtype in columns
+                      ])
+
+
+def _get(record: Dict, keys: List[str]) -> Any:
+    '''
+    Walks the dotted path into the record.
+    '''
+    for key in keys:
+        if not isinstance(record, Mapping):
+            return None
+        record = record.get(key)
+    return record
+
+
+def _timestamp(values: List[Any]) -> 'pa.Array':
+    '''
+    Converts the ISO-8601 strings (or epoch seconds) into a timestamp array.
+    '''
+    if all(v is None or isinstance(v, str) for v in values):
+        try:
+            return pa.array(values, type=pa.string()).cast(TIMESTAMP)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            pass
+    converted = []
+    for value in values:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            converted.append(int(value * 1000))
+        elif isinstance(value, str):
+            try:
+                converted.append(isoparse(value))
+            except ValueError:
+                converted.append(None)
+        else:
+            converted.append(None)
+    return pa.array(converted, type=TIMESTAMP)
+
+
+def _to_int(value: Any) -> int:
+    '''
+    Converts the value into an integer, accepting numeric strings.
+    '''
+    try:
+        return int(value)
+    except ValueError:
+        return int(float(value))
+
+
+def _numeric(values: List[Any], dtype: Any) -> List[Any]:
+    '''
+    Coerces the values of an integer or floating point column, such as numeric
+    fields returned as strings.  Values that can't be converted become nulls.
+    '''
+    if pa.types.is_integer(dtype):
+        native, cast = int, _to_int
+    else:
+        native, cast = (int, float), float
+    if all(v is None or (isinstance(v, native) and not isinstance(v, bool))
+           for v in values):
+        return values
+    converted = []
+    for value in values:
+        try:
+            converted.append(None if value is None else cast(value))
+        except (TypeError, ValueError, OverflowError):
+            converted.append(None)
+    return converted
+
+
+def _column(values: List[Any], dtype: Any) -> 'pa.Array':
+    '''
+    Builds the Arrow array for the column.
+    '''
+    if dtype == JSON:
+        return pa.array([json.dumps(v, default=json_default)
+                         if v is not None else None
+                         for v in values
+                         ], type=pa.string())
+    if dtype == TIMESTAMP:
+        return _timestamp(values)
+    if dtype == pa.string():
+        values = [v if v is None or isinstance(v, str) else str(v)
+                  for v in values
+                  ]
+    elif pa.types.is_integer(dtype) or pa.types.is_floating(dtype):
+        values = _numeric(values, dtype)
+    elif dtype == STRINGS:
+        values = [[str(i) for i in v] if isinstance(v, list)
+                  else [str(v)] if v is not None else None
+                  for v in values
+                  ]
+    return pa.array(values, type=dtype, from_pandas=True)
+
+
+def chunk_to_batch(data: Iterable[Dict],
+                   export_type: str,
+                   columns: Optional[List[Tuple[str, Any]]] = None
+                   ) -> 'pa.RecordBatch':
+    '''
+    Converts a chunk of export records into a record batch.  Fields that are
+    missing from a record are stored as nulls and any fields not described
+    in the column definitions are dropped.
+
+    Args:
+        data (Iterable[dict]):
+            The export records.
+        export_type (str):
+            The export datatype.
+        columns (list[tuple[str, Any]], optional):
+            Overrides the default column definitions for the export type.
+
+    Returns:
+        pyarrow.RecordBatch:
+            The converted chunk.
+
+    Example:
+
+        >>> chunk = tio.exports.download_chunk('vulns', '{UUID}', 1)
+        >>> batch = chunk_to_batch(chunk, 'vulns')
+    '''
+    columns = columns or COLUMNS[export_type]
+    paths = [path.split('.') for path, _ in columns]
+    values = [[] for _ in columns]
+    for record in data:
+        for idx, keys in enumerate(paths):
+            values[idx].append(_get(record, keys))
+    return pa.RecordBatch.from_arrays(
+        [_column(v, dtype) for v, (_, dtype) in zip(values, columns)],
+        schema=export_schema(export_type, columns)
+    )
+
+
+class ArrowSink:
+    '''
+    Writes export chunks into a single Parquet or Arrow IPC file.
+
+    Args:
+        path (str):
+            The path of the file to write.
+        export_type (str):
+            The export datatype (``vulns``, ``assets``, or ``compliance``).
+        file_format (str, optional):
+            Either ``parquet`` or ``ipc``.  The default is ``parquet``.
+        columns (list[tuple[str, Any]], optional):
+            Overrides the default column definitions for the export type.
+            Each column is defined as a tuple of the dotted field path and
+            the Arrow datatype to store it as.
+        compression (str, optional):
+            The Parquet compression codec.  The default is ``snappy``.
+
+    Examples:
+
+        Write a vulnerability export to Parquet using 8 threads:
+
+        >>> with ArrowSink('vulns.parquet', 'vulns') as sink:
+        ...     tio.exports.vulns().run_threaded(sink, num_threads=8)
+
+        Write an asset export to an Arrow IPC file:
+
+        >>> sink = ArrowSink('assets.arrow', 'assets', file_format='ipc')
+        >>> sink.consume(tio.exports.assets(), num_threads=4)
+    '''
+
+    def __init__(self,
+                 path: str,
+                 export_type: str,
+                 file_format: str = 'parquet',
+                 columns: Optional[List[Tuple[str, Any]]] = None,
+                 compression: str = 'snappy'
+                 ):
+        if file_format not in ['parquet', 'ipc']:
+            raise ValueError('file_format must be either parquet or ipc')
+        self.path = path
+        self.export_type = export_type
+        self.file_format = file_format
+        self.columns = columns or COLUMNS[export_type]
+        self.compression = compression
+        self.schema = export_schema(export_type, self.columns)
+        self.rows = 0
+        self.batches = 0
+        self._writer = None
+        self._closed = False
+        self._lock = Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def __call__(self, data: Iterable[Dict], **kwargs):
+        '''
+        Converts and writes the chunk.  Matches the function signature that
+        :py:meth:`ExportsIterator.run_threaded` expects.
+        '''
+        self.write(chunk_to_batch(data, self.export_type, self.columns))
+
+    def _open(self):
+        '''
+        Opens the file writer.
+        '''
+        if self.file_format == 'parquet':
+            return pq.ParquetWriter(self.path,
+                                    self.schema,
+                                    compression=self.compression
+                                    )
+        return ipc.new_file(self.path, self.schema)
+
+    def write(self, batch: 'pa.RecordBatch'):
+        '''
+        Writes the record batch to the file.
+
+        Args:
+            batch (pyarrow.RecordBatch): The record batch to write.
+        '''
+        if batch.num_rows < 1:
+            return
+        with self._lock:
+            if not self._writer:
+                self._writer = self._open()
+            if self.file_format == 'parquet':
+                self._writer.write_batch(batch)
+            else:
+                self._writer.write(batch)
+            self.rows += batch.num_rows
+            self.batches += 1
+
+    def consume(self, iterator: Any, num_threads: int = 2, **kwargs):
+        '''
+        Runs the export through the sink using the threaded export runner and
+        closes the file once the export has completed.
+
+        Args:
+            iterator (ExportsIterator):
+                The export iterator to consume.
+            num_threads (int, optional):
+                The number of threads to convert chunks with.
+            **kwargs (dict):
+                Additional keyword arguments for ``run_threaded``.
+        '''
+        try:
+            iterator.run_threaded(self, num_threads=num_threads, **kwargs)
+        finally:
+            self.close()
+
+    def close(self):
+        '''
+        Closes the file.  If no records were written, an empty file with the
+        export schema is created.
+        '''
+        with self._lock:
+            if self._closed:
+                return
+            if not self._writer:
+                self._writer = self._open()
+            self._writer.close()
+            self._closed = True
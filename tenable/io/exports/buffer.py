@@ -0,0 +1,238 @@
+'''
+The chunk buffer bounds the amount of export data held in memory between the
+downloader threads and the processing threads of
+:py:meth:`ExportsIterator.run_threaded`.  When the processing function falls
+behind the downloads, new downloads block until the consumer has caught up
+instead of letting the downloaded chunks pile up in memory.
+
+The buffer can be bounded by the number of chunks, the number of bytes, or
+both.  The chunk limit covers every chunk that has been handed to the
+downloaders but has yet to be completely processed.  The byte limit is checked
+once a chunk has been downloaded, using the size of the raw chunk body.  A
+single chunk larger than the byte limit is still admitted once the
+buffer is empty, so that the export can always make progress.  Streamed chunks
+cannot be measured ahead of time and only count against the chunk limit.
+
+.. autoclass:: ChunkBuffer
+    :members:
+
+.. autoclass:: ReorderBuffer
+    :members:
+'''
+import time
+from threading import Condition
+from typing import Any, Dict, Optional
+
+
+class ChunkBuffer:
+    '''
+    A bounded buffer of in-flight export chunks.
+
+    Args:
+        max_chunks (int, optional):
+            The maximum number of chunks that may be in flight.
+        max_bytes (int, optional):
+            The maximum number of bytes of downloaded chunk data that may be
+            waiting on, or being handled by, the processing threads.
+
+    Examples:
+
+        >>> export = tio.exports.vulns()
+        >>> export.run_threaded(insert_into_db,
+        ...                     num_threads=2,
+        ...                     download_threads=8,
+        ...                     max_chunks=8,
+        ...                     max_bytes=256 * 1024 * 1024
+        ...                     )
+
+        Monitoring the buffer from another thread while the export runs:
+
+        >>> export.buffer.occupancy
+        {'chunks': 8, 'bytes': 201326592, 'max_chunks': 8,
+         'max_bytes': 268435456, 'peak_chunks': 8, 'peak_bytes': 251658240,
+         'waits': 14, 'wait_time': 31.5}
+    '''
+
+    def __init__(self,
+                 max_chunks: Optional[int] = None,
+                 max_bytes: Optional[int] = None
+                 ):
+        self.max_chunks = max_chunks
+        self.max_bytes = max_bytes
+        self.chunks = 0
+        self.bytes = 0
+        self.peak_chunks = 0
+        self.peak_bytes = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self._condition = Condition()
+
+    def _wait(self, is_full):
+        '''
+        Waits until the buffer is no longer full, recording the time spent
+        blocked.
+        '''
+        if not is_full():
+            return
+        start = time.monotonic()
+        self.waits += 1
+        while is_full():
+            self._condition.wait()
+        self.wait_time += time.monotonic() - start
+
+    def acquire(self):
+        '''
+        Reserves a chunk slot within the buffer, blocking until one is
+        available.
+        '''
+        with self._condition:
+            self._wait(lambda: (self.max_chunks is not None
+                                and self.chunks >= self.max_chunks
+                                ))
+            self.chunks += 1
+            self.peak_chunks = max(self.peak_chunks, self.chunks)
+
+    def reserve(self, size: int) -> int:
+        '''
+        Reserves space within the buffer for the downloaded chunk, blocking
+        until there is enough room.
+
+        Args:
+            size (int): The size of the raw chunk body in bytes.
+
+        Returns:
+            int:
+                The number of bytes reserved, which must be passed back to
+                :py:meth:`release` once the chunk has been processed.
+        '''
+        if self.max_bytes is None or not size:
+            return 0
+        with self._condition:
+            self._wait(lambda: (self.bytes > 0
+                                and self.bytes + size > self.max_bytes
+                                ))
+            self.bytes += size
+            self.peak_bytes = max(self.peak_bytes, self.bytes)
+        return size
+
+    def release(self, size: int = 0):
+        '''
+        Releases the chunk slot and the bytes reserved for the chunk.
+
+        Args:
+            size (int, optional): The number of bytes reserved for the chunk.
+        '''
+        with self._condition:
+            self.chunks -= 1
+            self.bytes -= size
+            self._condition.notify_all()
+
+    @property
+    def occupancy(self) -> Dict[str, Any]:
+        '''
+        A snapshot of the buffer occupancy and how often, and for how long,
+        the downloads have been blocked waiting on the consumer.
+        '''
+        with self._condition:
+            return {
+                'chunks': self.chunks,
+                'bytes': self.bytes,
+                'max_chunks': self.max_chunks,
+                'max_bytes': self.max_bytes,
+                'peak_chunks': self.peak_chunks,
+                'peak_bytes': self.peak_bytes,
+                'waits': self.waits,
+                'wait_time': self.wait_time,
+            }
+
+
+class ReorderBuffer:
+    '''
+    Releases the downloaded chunks in the order that they were handed out,
+    regardless of the order in which the downloads complete.  Each chunk is
+    given a sequence number when it is handed to the downloaders, and the
+    consumer only receives a chunk once every earlier chunk has been received.
+
+    The number of chunks held within the reorder buffer is bounded by the
+    :obj:`ChunkBuffer` that the ordered mode of
+    :py:meth:`ExportsIterator.run_threaded` uses alongside it.
+
+    Attributes:
+        stalls (int):
+            The number of times the consumer had to wait on the head chunk
+            while later chunks were already waiting within the buffer.
+        stall_time (float):
+            The total number of seconds the consumer spent stalled.
+    '''
+
+    def __init__(self):
+        self._items: Dict[int, Any] = {}
+        self._next = 0
+        self._total = None
+        self.peak_held = 0
+        self.stalls = 0
+        self.stall_time = 0.0
+        self._condition = Condition()
+
+    def put(self, seq: int, item: Any):
+        '''
+        Adds the item to the buffer.
+
+        Args:
+            seq (int): The sequence number of the item.
+            item: The item.
+        '''
+        with self._condition:
+            self._items[seq] = item
+            self.peak_held = max(self.peak_held, len(self._items))
+            self._condition.notify_all()
+
+    def finish(self, total: int):
+        '''
+        Informs the buffer of the total number of items that will be added.
+        Once every item has been returned, :py:meth:`get` will return
+        ``None``.
+
+        Args:
+            total (int): The total number of items.
+        '''
+        with self._condition:
+            self._total = total
+            self._condition.notify_all()
+
+    def get(self) -> Any:
+        '''
+        Returns the next item in sequence, blocking until it is available.
+
+        Returns:
+            The next item, or ``None`` once every item has been returned.
+        '''
+        with self._condition:
+            stalled = None
+            while self._next not in self._items:
+                if self._total is not None and self._next >= self._total:
+                    return None
+                if self._items and stalled is None:
+                    stalled = time.monotonic()
+                    self.stalls += 1
+                self._condition.wait()
+            if stalled is not None:
+                self.stall_time += time.monotonic() - stalled
+            item = self._items.pop(self._next)
+            self._next += 1
+            return item
+
+    @property
+    def occupancy(self) -> Dict[str, Any]:
+        '''
+        A snapshot of the reorder buffer and how often the consumer has been
+        stalled waiting on the head chunk.
+        '''
+        with self._condition:
+            return {
+                'held': len(self._items),
+                'peak_held': self.peak_held,
+                'delivered': self._next,
+                'stalls': self.stalls,
+                'stall_time': self.stall_time,
+            }
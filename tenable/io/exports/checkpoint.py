@@ -0,0 +1,266 @@
+'''
+Export checkpoints persist the chunk ids that have been completely handled for
+each export job.  When an iterator is handed a checkpoint store along with the
+UUID of a previously started export, any chunks already recorded as completed
+will be skipped, allowing a long-running export to be resumed (within the
+export's retention window) without re-downloading the data.
+
+.. autoclass:: ExportCheckpoint
+    :members:
+
+.. autoclass:: FileCheckpoint
+    :members:
+
+.. autoclass:: SQLiteCheckpoint
+    :members:
+'''
+import abc
+import os
+import sqlite3
+import time
+from threading import Lock
+from typing import Optional, Set
+
+
+class ExportCheckpoint(abc.ABC):
+    '''
+    Base checkpoint store.  Checkpoint backends must implement the
+    :py:meth:`completed`, :py:meth:`mark_completed`, :py:meth:`register`,
+    :py:meth:`latest`, and :py:meth:`clear` methods.  All methods must be safe
+    to call from multiple threads.
+    '''
+
+    @abc.abstractmethod
+    def register(self, export_type: str, export_uuid: str):
+        '''
+        Records that the export job is being worked on.
+
+        Args:
+            export_type (str): The datatype of the export job.
+            export_uuid (str): The export job UUID.
+        '''
+
+    @abc.abstractmethod
+    def completed(self, export_type: str, export_uuid: str) -> Set[int]:
+        '''
+        Returns the chunk ids that have been completed for the export.
+
+        Args:
+            export_type (str): The datatype of the export job.
+            export_uuid (str): The export job UUID.
+
+        Returns:
+            set[int]:
+                The completed chunk ids.
+        '''
+
+    @abc.abstractmethod
+    def mark_completed(self,
+                       export_type: str,
+                       export_uuid: str,
+                       chunk_id: int
+                       ):
+        '''
+        Records the chunk as completed.
+
+        Args:
+            export_type (str): The datatype of the export job.
+            export_uuid (str): The export job UUID.
+            chunk_id (int): The chunk id that has been completed.
+        '''
+
+    @abc.abstractmethod
+    def latest(self, export_type: str) -> Optional[str]:
+        '''
+        Returns the UUID of the most recently registered export job for the
+        datatype.
+
+        Args:
+            export_type (str): The datatype of the export job.
+
+        Returns:
+            str:
+                The export UUID, or ``None`` if no export has been recorded.
+
+        Example:
+
+            >>> checkpoint = SQLiteCheckpoint('exports.db')
+            >>> export = tio.exports.vulns(uuid=checkpoint.latest('vulns'),
+            ...                            checkpoint=checkpoint
+            ...                            )
+        '''
+
+    @abc.abstractmethod
+    def clear(self, export_type: str, export_uuid: str):
+        '''
+        Removes all of the recorded state for the export job.
+
+        Args:
+            export_type (str): The datatype of the export job.
+            export_uuid (str): The export job UUID.
+        '''
+
+
+class FileCheckpoint(ExportCheckpoint):
+    '''
+    A checkpoint store backed by an append-only, tab-delimited text file.
+    Every line written is either an export registration or a completed chunk
+    record, so a crash will at most lose the line being written.
+
+    Args:
+        path (str): The path to the checkpoint file.
+
+    Example:
+
+        >>> checkpoint = FileCheckpoint('vulns.checkpoint')
+        >>> for vuln in tio.exports.vulns(checkpoint=checkpoint):
+        ...     print(vuln)
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = Lock()
+
+    def _read(self):
+        '''
+        Yields each of the records within the checkpoint file.
+        '''
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as fobj:
+            for line in fobj:
+                fields = line.rstrip('\n').split('\t')
+                if len(fields) == 3:
+                    yield fields
+
+    def _write(self, *fields):
+        '''
+        Appends a record to the checkpoint file.
+        '''
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as fobj:
+                fobj.write('\t'.join([str(f) for f in fields]) + '\n')
+                fobj.flush()
+                os.fsync(fobj.fileno())
+
+    def register(self, export_type: str, export_uuid: str):
+        self._write(export_type, export_uuid, '')
+
+    def completed(self, export_type: str, export_uuid: str) -> Set[int]:
+        with self._lock:
+            return {int(c) for t, u, c in self._read()
+                    if t == export_type and u == str(export_uuid) and c
+                    }
+
+    def mark_completed(self,
+                       export_type: str,
+                       export_uuid: str,
+                       chunk_id: int
+                       ):
+        self._write(export_type, export_uuid, chunk_id)
+
+    def latest(self, export_type: str) -> Optional[str]:
+        latest = None
+        with self._lock:
+            for etype, uuid, chunk in self._read():
+                if etype == export_type and not chunk:
+                    latest = uuid
+        return latest
+
+    def clear(self, export_type: str, export_uuid: str):
+        with self._lock:
+            records = [r for r in self._read()
+                       if not (r[0] == export_type
+                               and r[1] == str(export_uuid))
+                       ]
+            with open(self.path, 'w', encoding='utf-8') as fobj:
+                for record in records:
+                    fobj.write('\t'.join(record) + '\n')
+
+
+class SQLiteCheckpoint(ExportCheckpoint):
+    '''
+    A checkpoint store backed by a SQLite database.  The database may be
+    shared between multiple export types and export jobs.
+
+    Args:
+        path (str): The path to the SQLite database file.
+
+    Example:
+
+        >>> checkpoint = SQLiteCheckpoint('exports.db')
+        >>> export = tio.exports.vulns(checkpoint=checkpoint)
+        >>> export.run_threaded(write_chunk, num_threads=4)
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS exports (
+                    export_type TEXT NOT NULL,
+                    export_uuid TEXT NOT NULL,
+                    registered_at REAL NOT NULL,
+                    PRIMARY KEY (export_type, export_uuid)
+                )''')
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS chunks (
+                    export_type TEXT NOT NULL,
+                    export_uuid TEXT NOT NULL,
+                    chunk_id INTEGER NOT NULL,
+                    completed_at REAL NOT NULL,
+                    PRIMARY KEY (export_type, export_uuid, chunk_id)
+                )''')
+
+    def register(self, export_type: str, export_uuid: str):
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO exports VALUES (?, ?, ?)',
+                (export_type, str(export_uuid), time.time())
+            )
+
+    def completed(self, export_type: str, export_uuid: str) -> Set[int]:
+        with self._lock:
+            rows = self._db.execute(
+                ('SELECT chunk_id FROM chunks '
+                 'WHERE export_type = ? AND export_uuid = ?'),
+                (export_type, str(export_uuid))
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def mark_completed(self,
+                       export_type: str,
+                       export_uuid: str,
+                       chunk_id: int
+                       ):
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?)',
+                (export_type, str(export_uuid), int(chunk_id), time.time())
+            )
+
+    def latest(self, export_type: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute(
+                ('SELECT export_uuid FROM exports WHERE export_type = ? '
+                 'ORDER BY registered_at DESC LIMIT 1'),
+                (export_type,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def clear(self, export_type: str, export_uuid: str):
+        with self._lock, self._db:
+            for table in ('exports', 'chunks'):
+                self._db.execute(
+                    (f'DELETE FROM {table} '
+                     'WHERE export_type = ? AND export_uuid = ?'),
+                    (export_type, str(export_uuid))
+                )
+
+    def close(self):
+        '''
+        Closes the database connection.
+        '''
+        self._db.close()
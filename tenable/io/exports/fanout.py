@@ -0,0 +1,221 @@
+'''
+The export fan-out downloads each chunk of an export once and dispatches it to
+several registered sinks, such as a Parquet writer, a message queue producer,
+and a summary counter, all within the same pass over the export.
+
+Every sink has its own worker pool and queue, so each sink can run at its own
+concurrency, and a slow sink won't hold up the others until its queue is full.
+Errors raised by a sink are isolated to that sink: they are logged and
+counted, and the sink continues to receive the following chunks, while the
+other sinks are unaffected.
+
+As the same chunk is handed to every sink, the sinks must treat the records as
+read-only.  Chunks are dispatched to the sinks when the fan-out is called, so
+a checkpoint will consider a chunk to be completed once it has been queued for
+every sink, not once every sink has processed it.
+
+.. autoclass:: ExportFanout
+    :members:
+'''
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from threading import BoundedSemaphore, Lock
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+@dataclass
+class FanoutSink:
+    '''
+    The state tracked by the fan-out for each sink.
+    '''
+    name: str
+    func: Any
+    concurrency: int = 1
+    max_pending: Optional[int] = None
+    chunks: int = 0
+    records: int = 0
+    errors: int = 0
+    pending_chunks: int = 0
+    busy_time: float = 0
+    wait_time: float = 0
+    executor: Optional[ThreadPoolExecutor] = None
+    pending: Optional[BoundedSemaphore] = None
+    lock: Lock = field(default_factory=Lock)
+
+
+class ExportFanout:
+    '''
+    Dispatches each export chunk to multiple sinks.  The fan-out is called with
+    the same signature as the function passed to
+    :py:meth:`ExportsIterator.run_threaded`, and each sink is called with that
+    same signature as well.
+
+    Examples:
+
+        >>> fanout = ExportFanout()
+        >>> fanout.add(ArrowSink('vulns.parquet', 'vulns'), name='parquet')
+        >>> fanout.add(push_to_kafka, name='kafka', concurrency=4)
+        >>> fanout.add(count_severities, name='counts')
+        >>> fanout.run(tio.exports.vulns(), num_threads=4)
+        >>> fanout.stats()['kafka']
+        {'chunks': 180, 'records': 412042, 'errors': 0, 'pending': 0,
+         'busy_time': 96.1, 'wait_time': 0.0}
+    '''
+
+    def __init__(self):
+        self.sinks: Dict[str, FanoutSink] = {}
+        self.errors: List[Tuple[str, Exception]] = []
+        self._log = logging.getLogger(
+            f'{self.__module__}.{self.__class__.__name__}'
+        )
+
+    def add(self,
+            func: Any,
+            name: Optional[str] = None,
+            concurrency: int = 1,
+            max_pending: Optional[int] = None
+            ) -> FanoutSink:
+        '''
+        Registers a sink.
+
+        Args:
+            func:
+                The function (or callable sink) to pass each chunk to.
+            name (str, optional):
+                The name to report the sink under.  If left unspecified, the
+                name of the function is used.
+            concurrency (int, optional):
+                The number of chunks the sink may process at the same time.
+                The default is ``1``.
+            max_pending (int, optional):
+                The maximum number of chunks that may be queued for the sink.
+                Once full, dispatching new chunks blocks until the sink catches
+                up, bounding the memory used by a slow sink at the cost of
+                eventually slowing down the export.  If left unspecified, the
+                queue is unbounded.
+
+        Returns:
+            FanoutSink:
+                The sink state tracked by the fan-out.
+        '''
+        name = name or getattr(func, '__name__', type(func).__name__)
+        sink = FanoutSink(name=name,
+                          func=func,
+                          concurrency=concurrency,
+                          max_pending=max_pending,
+                          executor=ThreadPoolExecutor(
+                              max_workers=concurrency,
+                              thread_name_prefix=f'fanout-{name}'
+                          ),
+                          pending=(BoundedSemaphore(max_pending)
+                                   if max_pending else None),
+                          )
+        self.sinks[name] = sink
+        return sink
+
+    def __call__(self, data: Iterable[Dict], **kwargs):
+        '''
+        Dispatches the chunk to every sink.
+        '''
+        # Streamed chunks can only be consumed once, so they are read into a
+        # list before being shared between the sinks.
+        if not isinstance(data, list):
+            data = list(data)
+        for sink in self.sinks.values():
+            if sink.pending:
+                start = time.monotonic()
+                sink.pending.acquire()
+                with sink.lock:
+                    sink.wait_time += time.monotonic() - start
+            with sink.lock:
+                sink.pending_chunks += 1
+            sink.executor.submit(self._process, sink, data, kwargs)
+
+    def _process(self, sink: FanoutSink, data: List[Dict], kwargs: Dict):
+        '''
+        Passes the chunk to the sink, isolating any errors to that sink.
+        '''
+        start = time.monotonic()
+        try:
+            sink.func(data=data, **kwargs)
+        except Exception as err:  # noqa: PLW0703
+            self._log.error('fan-out sink %s failed on chunk %s: %s',
+                            sink.name, kwargs.get('export_chunk_id'), err
+                            )
+            with sink.lock:
+                sink.errors += 1
+                self.errors.append((sink.name, err))
+        else:
+            with sink.lock:
+                sink.chunks += 1
+                sink.records += len(data)
+        finally:
+            with sink.lock:
+                sink.busy_time += time.monotonic() - start
+                sink.pending_chunks -= 1
+            if sink.pending:
+                sink.pending.release()
+
+    def close(self):
+        '''
+        Waits for every sink to finish processing the dispatched chunks and
+        shuts down the sink worker pools.  Any sink exposing a ``close``
+        method is closed as well.
+        '''
+        for sink in self.sinks.values():
+            sink.executor.shutdown(wait=True)
+            closer = getattr(sink.func, 'close', None)
+            if callable(closer):
+                try:
+                    closer()
+                except Exception as err:  # noqa: PLW0703
+                    self._log.error('fan-out sink %s failed to close: %s',
+                                    sink.name, err
+                                    )
+                    self.errors.append((sink.name, err))
+
+    def run(self, iterator, **kwargs) -> Dict[str, Dict]:
+        '''
+        Runs the export through the fan-out using
+        :py:meth:`ExportsIterator.run_threaded` and closes the fan-out.
+
+        Args:
+            iterator (ExportsIterator):
+                The export iterator.
+            **kwargs (dict):
+                Any keyword arguments to pass to ``run_threaded``.
+
+        Returns:
+            dict:
+                The per-sink statistics.
+        '''
+        try:
+            iterator.run_threaded(self, **kwargs)
+        finally:
+            self.close()
+        return self.stats()
+
+    def stats(self) -> Dict[str, Dict]:
+        '''
+        Returns the per-sink statistics.
+
+        Returns:
+            dict:
+                The chunks and records processed, errors raised, chunks still
+                pending, time spent processing, and time the dispatcher spent
+                waiting on a full queue for each sink.
+        '''
+        resp = {}
+        for name, sink in self.sinks.items():
+            with sink.lock:
+                resp[name] = {
+                    'chunks': sink.chunks,
+                    'records': sink.records,
+                    'errors': sink.errors,
+                    'pending': sink.pending_chunks,
+                    'busy_time': sink.busy_time,
+                    'wait_time': sink.wait_time,
+                }
+        return resp
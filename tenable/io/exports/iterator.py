@@ -8,12 +8,28 @@ handling of data depending on how the data is accessed.
 .. autoclass:: ExportsIterator
     :members:
 '''
+import json
+import os
 import time
-from concurrent.futures import ThreadPoolExecutor
-from typing import Optional, List, Dict, Any
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
+from threading import Lock
+from typing import Optional, List, Dict, Any, Iterable, Deque, Set, Tuple
 from box import Box
 from restfly.iterator import APIIterator
-from tenable.errors import TioExportsError, TioExportsTimeout
+from tenable.errors import (TioExportChunkError,
+                            TioExportsError,
+                            TioExportsTimeout,
+                            UnexpectedValueError
+                            )
+from .buffer import ChunkBuffer, ReorderBuffer
+from .checkpoint import ExportCheckpoint
+from .polling import PollingPolicy, LinearBackoffPolicy
+from .projection import compile_projection
+from .records import RecordCache, compact_records
+from .retry import ChunkRetryPolicy
+from .sizing import ChunkSizer, count_units
 
 
 class ExportsIterator(APIIterator):  # noqa: PLR0902
@@ -24,10 +40,11 @@ class ExportsIterator(APIIterator):  # noqa: PLR0902
     Attributes:
         boxify (bool):
             Should the items returned be converted to a Box object?
-        chunks (list[int]):
-            The list of chunks yet to be handled.
-        processed (list[int]):
-            The list of chunks already processed.
+        chunks (deque[int]):
+            The queue of chunks yet to be handled.
+        processed (set[int]):
+            The set of chunks already processed (or currently being
+            processed).
         page (list[dict]):
             The current chunk of data.
         chunk_id (int):
@@ -43,27 +60,288 @@ class ExportsIterator(APIIterator):  # noqa: PLR0902
             The current status of the job.
         start_time:
             The timestamp denoting when the iterator was created.
+        checkpoint (ExportCheckpoint):
+            An optional checkpoint store used to persist the completed chunks.
+            Any chunks already recorded as completed for the export job will
+            be skipped.
+        spool (ExportSpool):
+            An optional spool to write each downloaded chunk into, allowing the
+            export to be replayed from local disk later.
+        stream (bool):
+            Should chunks be decoded incrementally as they are received?  When
+            enabled, records are yielded as soon as they are decoded and the
+            ``data`` passed to the ``run_threaded`` function is a generator
+            instead of a list, keeping memory usage bounded to roughly a
+            single record per chunk being processed.
+        chunks_available (int):
+            The number of chunks reported as available by the last status call.
+        chunks_in_flight (int):
+            The number of chunks that have been handed out but have yet to be
+            completely handled.
+        chunks_done (int):
+            The number of chunks that have been completely handled.
+        chunks_empty (int):
+            The number of completed chunks that contained no records.
+        chunks_failed (int):
+            The number of chunks that could not be downloaded.
+        failed_chunks (dict[int, TioExportChunkError]):
+            The ledger of chunks that could not be downloaded once the retries
+            had been exhausted, keyed by the chunk id.  Failed chunks don't
+            stop the export, and can be re-fetched afterwards using
+            :py:meth:`retry_failed`.
+        retry (ChunkRetryPolicy):
+            The policy used to retry failed chunk downloads.  The default is
+            the :obj:`ChunkRetryPolicy`.
+        sizer (ChunkSizer):
+            An optional chunk sizer to record the size, record count, and
+            download time of each downloaded chunk into.
+        polling (PollingPolicy):
+            The policy determining how long to wait between status polls while
+            no chunks are ready.  The default is the
+            :obj:`LinearBackoffPolicy`.
+        chunk_rate (float):
+            The observed chunk production rate of the export in chunks per
+            second, or ``None`` if it has yet to be observed.
+        projection (list[str]):
+            The dotted field paths to keep within each record.  If specified,
+            every record is reduced down to these fields as soon as the chunk
+            has been decoded.
+        compact (bool):
+            Should the records be converted into compact slotted records?  When
+            enabled, ``boxify`` is ignored.  See :obj:`CompactRecord` for
+            details.
+        buffer (ChunkBuffer):
+            The bounded buffer used by the last call to ``run_threaded`` if
+            either ``max_chunks`` or ``max_bytes`` was specified.  The buffer
+            occupancy can be monitored while the export is running.
+        reorder (ReorderBuffer):
+            The reorder buffer used by the last ordered ``run_threaded`` call.
     '''
     boxify: bool = False
     _term_on_error: bool = True
     _wait_for_complete: bool = False
     _is_iterator: bool = None
-    chunks: List[int]
-    processed: List[int]
+    chunks: Deque[int]
+    processed: Set[int]
     page: List[Dict]
     chunk_id: int
     timeout: int = None
-    uuid: str
+    uuid: str = None
     type: str
     status: str
     start_time: int
+    checkpoint: ExportCheckpoint = None
+    spool = None
+    stream: bool = False
+    chunks_available: int = 0
+    chunks_in_flight: int = 0
+    chunks_done: int = 0
+    chunks_empty: int = 0
+    chunks_failed: int = 0
+    failed_chunks: Dict[int, TioExportChunkError]
+    retry: ChunkRetryPolicy = None
+    sizer: ChunkSizer = None
+    polling: PollingPolicy = None
+    chunk_rate: Optional[float] = None
+    buffer: ChunkBuffer = None
+    reorder: ReorderBuffer = None
+    projection: List[str] = None
+    compact: bool = False
 
     def __init__(self, api, **kwargs):
-        self.chunks = []
-        self.processed = []
+        self.chunks = deque()
+        self.processed = set()
+        self.failed_chunks = {}
+        self._chunk_bytes = {}
+        self._counter_lock = Lock()
         self.page = []
+        self._records = None
         self.start_time = int(time.time())
         super().__init__(api, **kwargs)
+        if not self.polling:
+            self.polling = LinearBackoffPolicy()
+        if not self.retry:
+            self.retry = ChunkRetryPolicy()
+        self._projector = None
+        self._record_cache = RecordCache()
+        if self.projection:
+            self._projector = compile_projection(self.projection)
+        if self.uuid:
+            self._load_checkpoint()
+
+    def _load_checkpoint(self):
+        '''
+        Registers the export job with the checkpoint store and marks any chunks
+        that have previously been completed as processed.
+        '''
+        if self.checkpoint:
+            self.checkpoint.register(self.type, self.uuid)
+            completed = self.checkpoint.completed(self.type, self.uuid)
+            self.processed.update(completed)
+            self._log.debug('%s export %s resuming with %d completed chunks',
+                            self.type,
+                            self.uuid,
+                            len(completed)
+                            )
+
+    def _download_chunk(self, chunk_id: int) -> Iterable[Dict]:
+        '''
+        Downloads the specified chunk and writes it to the spool if one has
+        been provided.  If the iterator is set to stream the chunks, then a
+        generator of the records is returned instead of a list.
+        '''
+        if self.stream:
+            data = self._api.exports.stream_chunk(self.type,
+                                                  self.uuid,
+                                                  chunk_id,
+                                                  policy=self.retry
+                                                  )
+            if self.spool:
+                data = self.spool.write_iter(self.type,
+                                             self.uuid,
+                                             chunk_id,
+                                             data
+                                             )
+            return self._transform(data)
+
+        if self.sizer or (self.buffer and self.buffer.max_bytes):
+            data = self._download_measured(chunk_id)
+        else:
+            data = self._api.exports.download_chunk(self.type,
+                                                    self.uuid,
+                                                    chunk_id,
+                                                    policy=self.retry
+                                                    )
+        if self.spool:
+            self.spool.write(self.type, self.uuid, chunk_id, data)
+        return self._transform(data)
+
+    def _download_measured(self, chunk_id: int) -> List[Dict]:
+        '''
+        Downloads and decodes the raw chunk, recording the size of the body,
+        the number of records, and the download time with the chunk sizer (if
+        any), and the size of the body for the chunk buffer.
+        '''
+        start = time.perf_counter()
+        raw = self._api.exports.download_chunk_raw(self.type,
+                                                   self.uuid,
+                                                   chunk_id,
+                                                   policy=self.retry
+                                                   )
+        seconds = time.perf_counter() - start
+        data = json.loads(raw) if raw.strip() else []
+        self._record_size(chunk_id, len(raw))
+        if self.sizer:
+            self.sizer.record(self.type,
+                              records=len(data),
+                              units=count_units(self.type, data),
+                              nbytes=len(raw),
+                              seconds=seconds,
+                              export_uuid=self.uuid,
+                              chunk_id=chunk_id
+                              )
+        return data
+
+    def _record_size(self, chunk_id: int, nbytes: int):
+        '''
+        Records the size of the raw chunk body when the chunk buffer is bounded
+        by bytes, so that the buffer can reserve room for the chunk without
+        having to measure the decoded data.
+        '''
+        if self.buffer and self.buffer.max_bytes:
+            self._chunk_bytes[chunk_id] = nbytes
+
+    def _transform(self, data: Iterable[Dict]) -> Iterable[Dict]:
+        '''
+        Applies the field projection and compact record conversion to the
+        chunk data.  The full records are always spooled, so the
+        transformations are applied afterwards.
+        '''
+        if self._projector:
+            if isinstance(data, list):
+                data = [self._projector(r) for r in data]
+            else:
+                data = map(self._projector, data)
+        if self.compact:
+            data = compact_records(data, self.type, self._record_cache)
+        return data
+
+    def _export_completed(self):
+        '''
+        Called once every chunk within the export has been handed off.  The
+        spool is only marked as complete once no failed chunks remain.
+        '''
+        if self.spool and not self.failed_chunks:
+            self.spool.mark_complete(self.type, self.uuid)
+
+    @property
+    def counters(self) -> Dict[str, int]:
+        '''
+        A snapshot of the chunk bookkeeping counters for the export.
+
+        Example:
+
+            >>> export.counters
+            {'available': 12, 'queued': 4, 'in_flight': 2, 'done': 6,
+             'empty': 1, 'failed': 0}
+        '''
+        with self._counter_lock:
+            return {
+                'available': self.chunks_available,
+                'queued': len(self.chunks),
+                'in_flight': self.chunks_in_flight,
+                'done': self.chunks_done,
+                'empty': self.chunks_empty,
+                'failed': self.chunks_failed,
+            }
+
+    def _next_chunk(self) -> int:
+        '''
+        Takes the next chunk off of the local queue and marks it as in flight.
+        '''
+        chunk_id = self.chunks.popleft()
+        self.processed.add(chunk_id)
+        with self._counter_lock:
+            self.chunks_in_flight += 1
+        return chunk_id
+
+    def _chunk_completed(self, chunk_id: int, empty: bool = False):
+        '''
+        Called once a chunk has been completely handled.
+        '''
+        with self._counter_lock:
+            self.chunks_in_flight -= 1
+            self.chunks_done += 1
+            if empty:
+                self.chunks_empty += 1
+        if self.checkpoint:
+            self.checkpoint.mark_completed(self.type, self.uuid, chunk_id)
+
+    def _chunk_failed(self, chunk_id: int, err: TioExportChunkError):
+        '''
+        Called when a chunk could not be downloaded.  The chunk is recorded
+        within the failed chunk ledger and isn't marked as completed within
+        the checkpoint.
+        '''
+        self._log.error('%s export %s chunk %s has been added to the failed '
+                        'chunk ledger: %s', self.type, self.uuid, chunk_id, err
+                        )
+        with self._counter_lock:
+            self.chunks_in_flight -= 1
+            self.chunks_failed += 1
+            self.failed_chunks[chunk_id] = err
+
+    def _chunk_errored(self, chunk_id: int, err: Exception):
+        '''
+        Called when a chunk could not be handled because of an error that will
+        be relayed to the caller, such as an error raised by the processing
+        function.  The chunk is no longer counted as in flight.
+        '''
+        self._log.error('%s export %s chunk %s failed: %s',
+                        self.type, self.uuid, chunk_id, err
+                        )
+        with self._counter_lock:
+            self.chunks_in_flight -= 1
 
     def _get_status(self) -> Dict:
         '''
@@ -71,6 +349,31 @@ class ExportsIterator(APIIterator):  # noqa: PLR0902
         iterator is within the export job and return the status to the caller
         '''
         status = self._api.exports.status(self.type, self.uuid)
+
+        # If the export is still queued and the timeout has been reached, then
+        # we will inform the API that we want to cancel the export and then
+        # raise a timeout exception.
+        if self._is_timed_out(status):
+            self.cancel()
+            raise TioExportsTimeout(self.type, self.uuid)
+        return self._parse_status(status)
+
+    def _is_timed_out(self, status: Dict) -> bool:
+        '''
+        Determines if the export job has been sitting in the queue for longer
+        than the timeout allows.
+        '''
+        return (
+            status.status == 'QUEUED'
+            and self.timeout is not None
+            and time.time() > self.timeout + self.start_time
+        )
+
+    def _parse_status(self, status: Dict) -> Dict:
+        '''
+        Calculates where the iterator is within the export job based on the
+        status response and returns the status to the caller.
+        '''
         self._log.debug('%s export %s is currenty %s',
                         self.type,
                         self.uuid,
@@ -82,17 +385,6 @@ class ExportsIterator(APIIterator):  # noqa: PLR0902
         if status.status == 'ERROR' and self._term_on_error:
             raise TioExportsError(self.type, self.uuid)
 
-        # If the export is still queued and the timeout has been reached, then
-        # we will inform the API that we want to cancel the export and then
-        # raise a timeout exception.
-        if (
-            status.status == 'QUEUED'
-            and self.timeout is not None
-            and time.time() > self.timeout + self.start_time
-        ):
-            self.cancel()
-            raise TioExportsTimeout(self.type, self.uuid)
-
         # If the _wait_for_complete flag has been set, then we will always
         # return an empty list until the status is 'FINISHED'
         if self._wait_for_complete and status.status != 'FINISHED':
@@ -103,11 +395,18 @@ class ExportsIterator(APIIterator):  # noqa: PLR0902
         # "chunks_unfinished" attribute.
         else:
             avail = status.get('chunks_available', [])
-            unfinished = [c for c in avail if c not in self.processed]
+            processed = self.processed
+            unfinished = [c for c in avail if c not in processed]
             status.chunks_unfinished = unfinished
-        self.chunks = status.chunks_unfinished
+            self.chunks_available = len(avail)
+        self.chunks = deque(status.chunks_unfinished)
         self.status = status.status
 
+        # Hand the status off to the polling policy so that it can track the
+        # rate at which the export is producing chunks.
+        self.polling.observe(status)
+        self.chunk_rate = self.polling.rate
+
         # return the status to the caller.
         return status
 
@@ -120,15 +419,16 @@ class ExportsIterator(APIIterator):  # noqa: PLR0902
         if len(self.chunks) < 1:
             status = self._get_status()
 
-            backoff_counter = 1
+            attempt = 0
             # if the export is still processing, but there aren't any chunks
             # for us to process yet, then we will wait here in a loop and call
-            # for status once a second until we get something else to work on.
+            # for status as the polling policy dictates until we get something
+            # else to work on.
             while (len(status.chunks_unfinished) < 1
                    and status.status not in ['ERROR', 'FINISHED']
                    ):
-                backoff_counter += 1
-                time.sleep(backoff_counter if backoff_counter < 30 else 30)
+                time.sleep(self.polling.delay(status, attempt))
+                attempt += 1
                 status = self._get_status()
             self._log.debug(f'{status} and {self.chunks}')
             if (
@@ -136,6 +436,7 @@ class ExportsIterator(APIIterator):  # noqa: PLR0902
                 and len(self.chunks) == 0
                 and self._is_iterator
             ):
+                self._export_completed()
                 raise StopIteration()
         return self.chunks
 
@@ -143,24 +444,51 @@ class ExportsIterator(APIIterator):  # noqa: PLR0902
         '''
         Gets the next chunk of data for the iterator
         '''
-        # We need to update the chunk queue and raise a stop iteration
-        # exception if there is nothing left to process.
-        self._get_chunks()
-
-        # Now to take the first chunk off the local queue, move it to the
-        # processed list, and store the chunk id
-        self.chunk_id = self.chunks.pop(0)
-        self.processed.append(self.chunk_id)
-        self.page = self._api.exports.download_chunk(self.type,
-                                                     self.uuid,
-                                                     self.chunk_id
-                                                     )
-
-        # If the chunk of data is empty, then we will call ourselves to get the
-        # next page of data.  This allows us to properly handle empty chunks of
-        # data.
-        if len(self.page) < 1:
-            self._get_page()
+        # If the chunk of data is empty, then we will move on to the next
+        # chunk.  This allows us to properly handle empty chunks of data.
+        self.page = []
+        while len(self.page) < 1:
+            # We need to update the chunk queue and raise a stop iteration
+            # exception if there is nothing left to process.
+            self._get_chunks()
+
+            # Now to take the first chunk off the local queue, move it to the
+            # processed set, and store the chunk id
+            self.chunk_id = self._next_chunk()
+            try:
+                self.page = self._download_chunk(self.chunk_id)
+            except TioExportChunkError as err:
+                self._chunk_failed(self.chunk_id, err)
+                continue
+            if len(self.page) < 1:
+                self._chunk_completed(self.chunk_id, empty=True)
+
+    def _next_streamed(self) -> Dict:
+        '''
+        Gets the next record from the chunk currently being streamed, moving
+        on to the next chunk whenever the current one has been exhausted.
+        '''
+        while True:
+            if self._records is not None:
+                try:
+                    for item in self._records:
+                        self.page_count += 1
+                        return item
+                except TioExportChunkError as err:
+                    self._records = None
+                    self._chunk_failed(self.chunk_id, err)
+                    continue
+                self._records = None
+                self._chunk_completed(self.chunk_id,
+                                      empty=self.page_count == 0
+                                      )
+
+            # We need to update the chunk queue and raise a stop iteration
+            # exception if there is nothing left to process.
+            self._get_chunks()
+            self.chunk_id = self._next_chunk()
+            self._records = iter(self._download_chunk(self.chunk_id))
+            self.page_count = 0
 
     def next(self):
         '''
@@ -176,9 +504,20 @@ class ExportsIterator(APIIterator):  # noqa: PLR0902
                                        'job.  Cannot perform iterable '
                                        'operations.')
                                   )
+        # When streaming, the records are pulled directly from the chunk
+        # generator instead of from a page of data.
+        if self.stream:
+            item = self._next_streamed()
+            self.count += 1
+            if self.boxify and not self.compact:
+                return Box(item)
+            return item
+
         # If we have worked through the current page of records then we should
         # query the next page of records.
         if self.page_count >= len(self.page):
+            if self.page:
+                self._chunk_completed(self.chunk_id)
             self._get_page()
             self.page_count = 0
 
@@ -187,7 +526,7 @@ class ExportsIterator(APIIterator):  # noqa: PLR0902
         item = self.page[self.page_count]
         self.count += 1
         self.page_count += 1
-        if self.boxify:
+        if self.boxify and not self.compact:
             return Box(item)
         return item
 
@@ -197,10 +536,94 @@ class ExportsIterator(APIIterator):  # noqa: PLR0902
         '''
         self._api.exports.cancel(self.type, self.uuid)
 
+    def _set_threaded(self):
+        '''
+        Sets the iterator to run as a threaded job, raising an error if it has
+        already been used as an iterable.
+        '''
+        # if the iterator flag is unset, then we will set it.
+        if self._is_iterator is None:
+            self._is_iterator = False
+
+        # if the iterator flag was already set to be an iterable, then we will
+        # raise an error that we cannot continue.
+        elif self._is_iterator:
+            raise TioExportsError(export=self.type,
+                                  uuid=self.uuid,
+                                  msg=(f'ExportIterator for {self.uuid} '
+                                       'already set to run as an iterable '
+                                       'job.  Cannot perform threaded '
+                                       'operations.')
+                                  )
+
+    def _download_and_submit(self,
+                             executor: ThreadPoolExecutor,
+                             func: Any,
+                             chunk_id: int,
+                             kwargs: Dict,
+                             ):
+        '''
+        Downloads the specified chunk from within a downloader thread and then
+        hands the data off to the processing executor.  Chunks that can't be
+        downloaded are recorded within the failed chunk ledger.
+        '''
+        job = dict(kwargs)
+        try:
+            job['data'] = self._download_chunk(chunk_id)
+        except Exception as err:
+            if self.buffer:
+                self.buffer.release()
+            if isinstance(err, TioExportChunkError):
+                self._chunk_failed(chunk_id, err)
+                return None
+            self._chunk_errored(chunk_id, err)
+            raise
+        size = (self.buffer.reserve(self._chunk_bytes.pop(chunk_id, 0))
+                if self.buffer else 0
+                )
+        job['export_uuid'] = self.uuid
+        job['export_type'] = self.type
+        job['export_chunk_id'] = chunk_id
+        self._log.debug(
+            (f'{self.type} export {self.uuid} chunk {chunk_id} '
+             'has been downloaded and the data has been handed '
+             'off to the specified function'
+             ))
+        return executor.submit(self._process_chunk, func, job, size)
+
+    def _process_chunk(self, func: Any, job: Dict, size: int = 0):
+        '''
+        Passes the chunk to the user-provided function and records the chunk
+        as completed once the function has returned.  When streaming, the
+        chunk download may fail part way through the function, in which case
+        the chunk is recorded within the failed chunk ledger instead.  Any
+        other error raised by the function is relayed to the caller.
+        '''
+        try:
+            resp = func(**job)
+        except TioExportChunkError as err:
+            self._chunk_failed(job['export_chunk_id'], err)
+            return None
+        except Exception as err:
+            self._chunk_errored(job['export_chunk_id'], err)
+            raise
+        finally:
+            if self.buffer:
+                self.buffer.release(size)
+        self._chunk_completed(job['export_chunk_id'],
+                              empty=isinstance(job['data'], list)
+                              and len(job['data']) < 1
+                              )
+        return resp
+
     def run_threaded(self,
                      func: Any,
                      kwargs: Optional[Dict] = None,
                      num_threads: int = 2,
+                     download_threads: Optional[int] = None,
+                     max_chunks: Optional[int] = None,
+                     max_bytes: Optional[int] = None,
+                     ordered: bool = False,
                      ):
         '''
         Initiate a multi-threaded export using the provided function and
@@ -221,6 +644,36 @@ class ExportsIterator(APIIterator):  # noqa: PLR0902
             num_threads:
                 How many concurrent threads should be run.  The default is
                 ``2``.
+            download_threads:
+                How many concurrent threads should be downloading chunks.  Each
+                downloaded chunk is handed off to the processing threads as
+                soon as it has been retrieved, so downloads and processing
+                happen in parallel.  The connection pool of the API session
+                is grown to match.  If left unspecified, the default is to
+                use the same value as ``num_threads``.
+            max_chunks:
+                The maximum number of chunks that may be downloading, waiting
+                to be processed, or being processed at any given time.  Once
+                reached, no further downloads are started until a chunk has
+                been processed.  If left unspecified, the number of chunks
+                held in memory is unbounded.
+            max_bytes:
+                The maximum number of bytes of downloaded chunk data that may
+                be waiting on, or being handled by, the processing threads.
+                Downloaded chunks are held by the downloader threads until
+                there is room.  If left unspecified, the number of bytes held
+                in memory is unbounded.
+            ordered:
+                Should the chunks be passed to the function in order?  The
+                chunks are still downloaded in parallel, however they are held
+                within a reorder buffer and released to the function one at a
+                time, in the order that they were handed out to the
+                downloaders (ascending chunk id order within each status
+                update).  In this mode ``max_chunks`` bounds the reorder
+                buffer (defaulting to twice the number of download threads),
+                ``num_threads`` is ignored, and ``max_bytes`` is unsupported.
+                The reorder buffer statistics are available as
+                ``export.reorder.occupancy``.  The default is ``False``.
 
         Examples:
 
@@ -238,49 +691,441 @@ class ExportsIterator(APIIterator):  # noqa: PLR0902
             >>>
             >>> export = tio.exports.vulns()
             >>> export.run_threaded(write_chunk, num_threads=4)
+
+            Downloading 16 chunks at a time while only processing 4:
+
+            >>> export.run_threaded(write_chunk,
+            ...                     num_threads=4,
+            ...                     download_threads=16
+            ...                     )
+
+            Blocking the downloads whenever more than 8 chunks are in flight
+            because the processing function has fallen behind:
+
+            >>> export.run_threaded(write_chunk,
+            ...                     num_threads=4,
+            ...                     download_threads=16,
+            ...                     max_chunks=8
+            ...                     )
+            >>> export.buffer.occupancy['waits']
+            42
+
+            Writing the chunks to a single file in chunk order.  As chunks may
+            become available out of order while the export is processing,
+            ``when_done`` ensures the same order across runs:
+
+            >>> export = tio.exports.vulns(when_done=True)
+            >>> with open('vulns.jsonl', 'w') as fobj:
+            ...     export.run_threaded(
+            ...         lambda data, **kw: fobj.writelines(
+            ...             f'{json.dumps(r)}\\n' for r in data),
+            ...         download_threads=8,
+            ...         ordered=True
+            ...     )
+            >>> export.reorder.occupancy['stalls']
+            3
         '''
         if not kwargs:
             kwargs = {}
-        # if the iterator flag is unset, then we will set it.
-        if self._is_iterator is None:
-            self._is_iterator = False
+        if not download_threads:
+            download_threads = num_threads
+        self._set_threaded()
 
-        # if the iterator flag was already set to be an iterable, then we will
-        # raise an error that we cannot continue.
-        elif self._is_iterator:
-            raise TioExportsError(export=self.type,
-                                  uuid=self.uuid,
-                                  msg=(f'ExportIterator for {self.uuid} '
-                                       'already set to run as an iterable '
-                                       'job.  Cannot perform threaded '
-                                       'operations.')
-                                  )
+        # Size the connection pool so that every downloader thread (and the
+        # status polls from this thread) can hold on to its own connection.
+        # Replayed exports don't have an API session to size.
+        if self._api:
+            self._api.ensure_pool_size(download_threads + 1)
+
+        if ordered:
+            if max_bytes:
+                raise UnexpectedValueError(
+                    'max_bytes is not supported for ordered exports'
+                )
+            return self._run_ordered(func,
+                                     kwargs,
+                                     download_threads,
+                                     max_chunks or download_threads * 2
+                                     )
+
+        if max_chunks or max_bytes:
+            self.buffer = ChunkBuffer(max_chunks=max_chunks,
+                                      max_bytes=max_bytes
+                                      )
 
-        # initiate the thread pool and get the show on the road.
-        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        # initiate the thread pools and get the show on the road.  The
+        # downloader pool is the last context entered, so it will be the first
+        # one to be shut down, ensuring that every downloaded chunk has been
+        # handed off before the processing pool stops accepting work.
+        downloads = []
+        with ThreadPoolExecutor(max_workers=num_threads) as executor, \
+                ThreadPoolExecutor(max_workers=download_threads) as downloader:
             # we will want to make sure to stay in this loop until the job is
             # finished and all of the chunks have been processed.
             while not (len(self._get_chunks()) < 1
                        and self.status in ['FINISHED']
                        ):
                 # loop over the number of chunks that are available, pulling
-                # each chunk id out of the chunk list, constructing the kwargs
-                # with the necessary elements, and loading that job into the
-                # executor.  When all of the chunks have been added to the
-                # pool, then call the _get_chunks method again to wait for more
-                # chunks to become available.
-                num_chunks = range(len(self.chunks))
-                for _ in num_chunks:
-                    chunk_id = self.chunks.pop(0)
-                    kwargs['data'] = self._api.exports.download_chunk(
-                        self.type, self.uuid, chunk_id)
-                    kwargs['export_uuid'] = self.uuid
-                    kwargs['export_type'] = self.type
-                    kwargs['export_chunk_id'] = chunk_id
-                    self._log.debug(
-                        (f'{self.type} export {self.uuid} chunk {chunk_id} '
-                         'has been downloaded and the data has been handed '
-                         'off to the specified function'
-                         ))
-                    executor.submit(func, **kwargs)
-                    self.processed.append(chunk_id)
+                # each chunk id out of the chunk list and loading the download
+                # job into the downloader pool.  Each download job will then
+                # pass the data on to the processing pool when it completes.
+                # When all of the chunks have been added to the pool, then
+                # call the _get_chunks method again to wait for more chunks to
+                # become available.
+                while self.chunks:
+                    if self.buffer:
+                        self.buffer.acquire()
+                    chunk_id = self._next_chunk()
+                    downloads.append(downloader.submit(
+                        self._download_and_submit,
+                        executor,
+                        func,
+                        chunk_id,
+                        kwargs
+                    ))
+
+        # If any of the downloads or any of the processing jobs had failed,
+        # then we will want to relay the first error back to the caller, just
+        # as we would have if the chunk had been handled within this thread.
+        # Each download returns the future of the processing job it submitted
+        # (or None if the chunk was added to the failed chunk ledger).
+        processing = [download.result() for download in downloads]
+        for job in processing:
+            if job is not None:
+                job.result()
+        self._export_completed()
+
+    def _download_ordered(self, seq: int, chunk_id: int, kwargs: Dict):
+        '''
+        Downloads the chunk from within a downloader thread and places it into
+        the reorder buffer.  Failed downloads are placed into the buffer as
+        well, so that the consumer never waits on a chunk that won't arrive.
+        '''
+        job = dict(kwargs)
+        try:
+            job['data'] = self._download_chunk(chunk_id)
+        except Exception as err:
+            self.reorder.put(seq, (chunk_id, None, err))
+            if isinstance(err, TioExportChunkError):
+                self._chunk_failed(chunk_id, err)
+                return
+            self._chunk_errored(chunk_id, err)
+            raise
+        job['export_uuid'] = self.uuid
+        job['export_type'] = self.type
+        job['export_chunk_id'] = chunk_id
+        self.reorder.put(seq, (chunk_id, job, None))
+
+    def _consume_ordered(self, func: Any):
+        '''
+        Passes the chunks from the reorder buffer to the function in order.
+        Once the function has raised an error, the remaining chunks are
+        drained from the buffer without being processed so that the
+        downloaders aren't left blocked, and the error is then raised.
+        '''
+        error = None
+        while True:
+            item = self.reorder.get()
+            if item is None:
+                break
+            _, job, failed = item
+            if failed or error:
+                self.buffer.release()
+                continue
+            try:
+                self._process_chunk(func, job)
+            except Exception as err:  # noqa: PLW0703
+                error = err
+        if error:
+            raise error
+
+    def _run_ordered(self,
+                     func: Any,
+                     kwargs: Dict,
+                     download_threads: int,
+                     max_chunks: int
+                     ):
+        '''
+        The ordered mode of run_threaded.
+        '''
+        self.buffer = ChunkBuffer(max_chunks=max_chunks)
+        self.reorder = ReorderBuffer()
+        seq = 0
+        downloads = []
+        with ThreadPoolExecutor(max_workers=1) as consumer, \
+                ThreadPoolExecutor(max_workers=download_threads) as downloader:
+            consuming = consumer.submit(self._consume_ordered, func)
+            try:
+                while not (len(self._get_chunks()) < 1
+                           and self.status in ['FINISHED']
+                           ):
+                    while self.chunks:
+                        self.buffer.acquire()
+                        chunk_id = self._next_chunk()
+                        downloads.append(downloader.submit(
+                            self._download_ordered, seq, chunk_id, kwargs
+                        ))
+                        seq += 1
+            finally:
+                self.reorder.finish(seq)
+
+        for download in downloads:
+            download.result()
+        consuming.result()
+        self._export_completed()
+
+    def _download_and_submit_raw(self,
+                                 pool: ProcessPoolExecutor,
+                                 func: Any,
+                                 chunk_id: int,
+                                 kwargs: Dict,
+                                 done: Any
+                                 ):
+        '''
+        Downloads the raw chunk from within a downloader thread and hands the
+        bytes off to the process pool.
+        '''
+        try:
+            raw = self._api.exports.download_chunk_raw(self.type,
+                                                       self.uuid,
+                                                       chunk_id,
+                                                       policy=self.retry
+                                                       )
+        except Exception as err:
+            self.buffer.release()
+            if isinstance(err, TioExportChunkError):
+                self._chunk_failed(chunk_id, err)
+                return
+            self._chunk_errored(chunk_id, err)
+            raise
+        if self.spool:
+            self.spool.write_raw(self.type, self.uuid, chunk_id, raw)
+        job = dict(kwargs)
+        job['export_uuid'] = self.uuid
+        job['export_type'] = self.type
+        job['export_chunk_id'] = chunk_id
+        future = pool.submit(_process_raw_chunk,
+                             func,
+                             raw,
+                             job,
+                             self.projection
+                             )
+        future.add_done_callback(
+            partial(done, chunk_id, raw.strip() in (b'', b'[]'))
+        )
+
+    def run_processes(self,
+                      func: Any,
+                      kwargs: Optional[Dict] = None,
+                      num_processes: Optional[int] = None,
+                      download_threads: int = 4,
+                      max_chunks: Optional[int] = None,
+                      callback: Optional[Any] = None,
+                      ) -> Optional[List[Any]]:
+        '''
+        Initiate a multi-process export using the provided function.  The raw
+        chunks are downloaded within threads of this process and then handed
+        off to a pool of worker processes, which decode the chunk and pass the
+        records to the function.  As the decoding and the function both run
+        outside of this process, CPU-bound work scales across every core
+        instead of being limited by the GIL.
+
+        The function, the keyword arguments, and the values returned by the
+        function must all be picklable.  The function is called with the same
+        reserved keyword arguments as :py:meth:`run_threaded`.  Only the value
+        returned by the function is sent back to this process, so returning a
+        compact summary rather than the records themselves keeps the overhead
+        down.  If a ``projection`` was specified for the export, it is applied
+        within the worker processes.
+
+        Args:
+            func:
+                A picklable (module-level) function to run within the worker
+                processes.
+            kwargs:
+                Any additional keyword arguments that are to be passed to the
+                function as part of execution.
+            num_processes:
+                The number of worker processes.  If left unspecified, the
+                number of CPUs is used.
+            download_threads:
+                The number of concurrent chunk downloads.  The default is
+                ``4``.
+            max_chunks:
+                The maximum number of chunks that may be downloading or waiting
+                on the worker processes at any given time.  The default is
+                twice the number of worker processes.
+            callback:
+                If specified, each returned value is passed to the callback as
+                soon as the chunk has been processed instead of being
+                collected.
+
+        Returns:
+            list:
+                The values returned by the function for each chunk, in
+                completion order, or ``None`` if a callback was specified.
+
+        Examples:
+
+            >>> # counters.py
+            >>> def count_severities(data, **kwargs):
+            ...     counts = {}
+            ...     for vuln in data:
+            ...         sev = vuln['severity']
+            ...         counts[sev] = counts.get(sev, 0) + 1
+            ...     return counts
+
+            >>> from counters import count_severities
+            >>> export = tio.exports.vulns()
+            >>> results = export.run_processes(count_severities,
+            ...                                num_processes=8,
+            ...                                download_threads=8
+            ...                                )
+        '''
+        self._set_threaded()
+        if self._api:
+            self._api.ensure_pool_size(download_threads + 1)
+        kwargs = kwargs or {}
+        num_processes = num_processes or os.cpu_count() or 1
+        self.buffer = ChunkBuffer(max_chunks=max_chunks or num_processes * 2)
+        results = []
+        errors = []
+        lock = Lock()
+
+        def done(chunk_id: int, empty: bool, future: Future):
+            try:
+                resp = future.result()
+                with lock:
+                    if callback:
+                        callback(resp)
+                    else:
+                        results.append(resp)
+                self._chunk_completed(chunk_id, empty=empty)
+            except Exception as err:  # noqa: PLW0703
+                self._chunk_errored(chunk_id, err)
+                with lock:
+                    errors.append(err)
+            finally:
+                self.buffer.release()
+
+        # As with run_threaded, the downloader pool is entered last so that
+        # every chunk has been handed to the process pool before the process
+        # pool is shut down.
+        downloads = []
+        with ProcessPoolExecutor(max_workers=num_processes) as pool, \
+                ThreadPoolExecutor(max_workers=download_threads) as downloader:
+            while not (len(self._get_chunks()) < 1
+                       and self.status in ['FINISHED']
+                       ):
+                while self.chunks:
+                    self.buffer.acquire()
+                    chunk_id = self._next_chunk()
+                    downloads.append(downloader.submit(
+                        self._download_and_submit_raw,
+                        pool,
+                        func,
+                        chunk_id,
+                        kwargs,
+                        done
+                    ))
+
+        for download in downloads:
+            download.result()
+        if errors:
+            raise errors[0]
+        self._export_completed()
+        return None if callback else results
+
+    def retry_failed(self,
+                     func: Any,
+                     kwargs: Optional[Dict] = None
+                     ) -> Dict[int, TioExportChunkError]:
+        '''
+        Re-fetches only the chunks within the failed chunk ledger and passes
+        each one to the provided function, allowing a large export to be
+        completed without re-running it.  The function is called with the
+        same reserved keyword arguments as :py:meth:`run_threaded`.  Chunks
+        that are successfully handled are removed from the ledger (and marked
+        as completed within the checkpoint), while chunks that fail again
+        remain within it.
+
+        As the chunks of an export job expire after a few days, the failed
+        chunks should be re-fetched shortly after the export has finished.
+
+        Args:
+            func:
+                The function to pass each re-fetched chunk to.
+            kwargs:
+                Any additional keyword arguments that are to be passed to the
+                function as part of execution.
+
+        Returns:
+            dict:
+                The chunks that are still failing, keyed by the chunk id.
+
+        Examples:
+
+            >>> export = tio.exports.vulns()
+            >>> export.run_threaded(write_chunk, num_threads=4)
+            >>> export.failed_chunks
+            {17: TioExportChunkError('vulns export ... chunk 17 failed ...')}
+            >>> export.retry_failed(write_chunk)
+            {}
+
+            Re-fetching the failed chunks of an export that was iterated:
+
+            >>> vulns = list(export)
+            >>> export.retry_failed(lambda data, **kw: vulns.extend(data))
+        '''
+        kwargs = kwargs or {}
+        for chunk_id in sorted(self.failed_chunks):
+            job = dict(kwargs)
+            job['export_uuid'] = self.uuid
+            job['export_type'] = self.type
+            job['export_chunk_id'] = chunk_id
+            try:
+                job['data'] = self._download_chunk(chunk_id)
+                func(**job)
+            except TioExportChunkError as err:
+                self._log.error('%s export %s chunk %s failed again: %s',
+                                self.type, self.uuid, chunk_id, err
+                                )
+                with self._counter_lock:
+                    self.failed_chunks[chunk_id] = err
+                continue
+            with self._counter_lock:
+                del self.failed_chunks[chunk_id]
+                self.chunks_failed -= 1
+                self.chunks_done += 1
+                if isinstance(job['data'], list) and len(job['data']) < 1:
+                    self.chunks_empty += 1
+            if self.checkpoint:
+                self.checkpoint.mark_completed(self.type, self.uuid, chunk_id)
+        finished = getattr(self, 'status', None) == 'FINISHED'
+        if finished and not self.failed_chunks:
+            self._export_completed()
+        return dict(self.failed_chunks)
+
+
+@lru_cache(maxsize=8)
+def _worker_projection(projection: Tuple[str, ...]) -> Any:
+    '''
+    Compiles the projection once within each worker process.
+    '''
+    return compile_projection(projection)
+
+
+def _process_raw_chunk(func: Any,
+                       raw: bytes,
+                       job: Dict,
+                       projection: Optional[List[str]] = None
+                       ) -> Any:
+    '''
+    Decodes the raw chunk and passes the records to the function.  Runs within
+    the worker processes of :py:meth:`ExportsIterator.run_processes`.
+    '''
+    data = json.loads(raw) if raw.strip() else []
+    if projection:
+        project = _worker_projection(tuple(projection))
+        data = [project(r) for r in data]
+    return func(data=data, **job)
@@ -0,0 +1,202 @@
+'''
+The asset join index enriches vulnerability export records with fields from
+the asset export, such as the tags, ACR, network, and sources of each asset,
+without having to hold every full asset record in memory.
+
+The index is built from an asset export and stores only the selected fields of
+each asset (as compact JSON) keyed by the asset UUID, either in memory or
+within an on-disk SQLite database for very large containers.  The vulnerability
+export can then be streamed through :py:meth:`AssetIndex.enrich`, which joins
+each finding to its asset one record at a time, so the enriched output is
+produced in a single pass with bounded memory.
+
+.. autoclass:: AssetIndex
+    :members:
+'''
+import json
+import sqlite3
+from functools import lru_cache
+from threading import Lock
+from typing import Dict, Iterable, Iterator, List, Optional
+from .projection import compile_projection
+from .records import json_default
+
+DEFAULT_FIELDS = [
+    'tags',
+    'acr_score',
+    'exposure_score',
+    'network_name',
+    'sources',
+]
+
+
+class AssetIndex:
+    '''
+    An index of asset fields keyed by the asset UUID.
+
+    Args:
+        fields (list[str], optional):
+            The dotted field paths of the asset records to keep.  The default
+            is ``tags``, ``acr_score``, ``exposure_score``, ``network_name``,
+            and ``sources``.
+        path (str, optional):
+            If specified, the index will be stored within a SQLite database at
+            this path instead of in memory.
+        cache_size (int, optional):
+            The number of decoded assets to keep cached when enriching.  As the
+            findings of an asset tend to be grouped together within a chunk,
+            a small cache avoids decoding the same asset repeatedly.  The
+            default is ``1024``.
+
+    Examples:
+
+        Building the index from an asset export and then enriching a streamed
+        vulnerability export:
+
+        >>> index = AssetIndex(fields=['tags', 'acr_score', 'sources'])
+        >>> tio.exports.assets().run_threaded(index, num_threads=4)
+        >>> for vuln in index.enrich(tio.exports.vulns(stream=True)):
+        ...     print(vuln['asset']['uuid'], vuln['asset']['acr_score'])
+
+        Storing the index on disk so that it can be reused by later runs:
+
+        >>> index = AssetIndex(path='assets.idx')
+        >>> index.add(tio.exports.assets())
+        >>> index.close()
+    '''
+
+    def __init__(self,
+                 fields: Optional[List[str]] = None,
+                 path: Optional[str] = None,
+                 cache_size: int = 1024
+                 ):
+        self.fields = fields or DEFAULT_FIELDS
+        self.path = path
+        self._project = compile_projection(self.fields)
+        self._lock = Lock()
+        self._memory: Dict[str, str] = {}
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            with self._conn:
+                self._conn.execute('CREATE TABLE IF NOT EXISTS assets '
+                                   '(uuid TEXT PRIMARY KEY, data TEXT)'
+                                   )
+        self._lookup = lru_cache(maxsize=cache_size)(self._load)
+
+    def __call__(self, data: Iterable[Dict], **kwargs):
+        '''
+        Adds the chunk of assets to the index.  Matches the function signature
+        that :py:meth:`ExportsIterator.run_threaded` expects.
+        '''
+        self.add(data)
+
+    def __len__(self) -> int:
+        if self._conn:
+            with self._lock:
+                return self._conn.execute('SELECT count(*) FROM assets'
+                                          ).fetchone()[0]
+        return len(self._memory)
+
+    def add(self, assets: Iterable[Dict]):
+        '''
+        Adds the asset records to the index.  Assets already within the index
+        are replaced.
+
+        Args:
+            assets (Iterable[dict]): The asset export records.
+        '''
+        rows = [(a['id'], json.dumps(self._project(a),
+                                     separators=(',', ':'),
+                                     default=json_default
+                                     ))
+                for a in assets
+                ]
+        with self._lock:
+            if self._conn:
+                with self._conn:
+                    self._conn.executemany('INSERT OR REPLACE INTO assets '
+                                           'VALUES (?, ?)', rows
+                                           )
+            else:
+                self._memory.update(rows)
+            self._lookup.cache_clear()
+
+    def _load(self, asset_uuid: str) -> Optional[Dict]:
+        '''
+        Reads and decodes the asset fields from the index.
+        '''
+        if self._conn:
+            with self._lock:
+                row = self._conn.execute('SELECT data FROM assets '
+                                         'WHERE uuid = ?', (asset_uuid,)
+                                         ).fetchone()
+            data = row[0] if row else None
+        else:
+            data = self._memory.get(asset_uuid)
+        return json.loads(data) if data is not None else None
+
+    def get(self, asset_uuid: str) -> Optional[Dict]:
+        '''
+        Returns the indexed fields of the asset.
+
+        Args:
+            asset_uuid (str): The asset UUID.
+
+        Returns:
+            dict:
+                The selected asset fields, or ``None`` if the asset isn't
+                within the index.
+        '''
+        info = self._lookup(asset_uuid)
+        return dict(info) if info is not None else None
+
+    def enrich(self,
+               vulns: Iterable[Dict],
+               key: Optional[str] = None,
+               ) -> Iterator[Dict]:
+        '''
+        Joins each vulnerability record to the indexed fields of its asset.
+
+        Args:
+            vulns (Iterable[dict]):
+                The vulnerability records.  This can be an export iterator,
+                allowing the export to be enriched as it is downloaded.
+            key (str, optional):
+                The key to store the asset fields under within each record.  If
+                left unspecified, the fields are merged into the ``asset``
+                object of the record, without overwriting any of the fields
+                already present.
+
+        Yields:
+            dict:
+                The enriched vulnerability records.  Each enriched record is a
+                new, shallow copy of the original, so read-only records (such
+                as compact records) can be enriched and the original records
+                are left untouched.  Findings on assets that aren't within the
+                index are passed through unchanged (or copied with ``None``
+                stored under the key).
+        '''
+        for vuln in vulns:
+            asset = vuln.get('asset') or {}
+            info = self._lookup(asset.get('uuid'))
+            if key:
+                enriched = dict(vuln)
+                enriched[key] = dict(info) if info is not None else None
+            elif info:
+                merged = dict(asset)
+                for field, value in info.items():
+                    merged.setdefault(field, value)
+                enriched = dict(vuln)
+                enriched['asset'] = merged
+            else:
+                enriched = vuln
+            yield enriched
+
+    def close(self):
+        '''
+        Closes the on-disk index.
+        '''
+        if self._conn:
+            self._conn.close()
+            self._conn = None
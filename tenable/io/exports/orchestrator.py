@@ -0,0 +1,350 @@
+'''
+The export orchestrator runs several exports at the same time, interleaving
+their status polling and scheduling the chunk downloads from all of them
+through a single, bounded worker pool.  Chunks are handed to the pool in a
+round-robin fashion across the exports so that a large export cannot starve
+the smaller ones, and the wall-clock time of the run becomes that of the
+longest export instead of the sum of all of them.  The status polls are made
+from their own small pool, so a slow status call for one export doesn't hold up
+the polling of the others or the scheduling of their chunks.
+
+.. autoclass:: ExportOrchestrator
+    :members:
+'''
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from threading import Condition
+from typing import Any, Dict, List, Optional
+from tenable.errors import TioExportChunkError, TioExportsError
+from .iterator import ExportsIterator
+
+
+@dataclass
+class OrchestratedExport:
+    '''
+    The state tracked by the orchestrator for each export.
+    '''
+    name: str
+    iterator: ExportsIterator
+    func: Any
+    kwargs: Dict = field(default_factory=dict)
+    in_flight: int = 0
+    records: int = 0
+    errors: int = 0
+    next_poll: float = 0
+    poll_count: int = 0
+    polling: bool = False
+    finished: bool = False
+    error: Optional[Exception] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+class ExportOrchestrator:
+    '''
+    Runs multiple exports concurrently using one shared worker pool.
+
+    Args:
+        num_threads (int, optional):
+            The number of worker threads within the shared pool.  Each worker
+            both downloads and processes a chunk.  The default is ``4``.
+        max_queued (int, optional):
+            The maximum number of chunks that may be submitted to the pool at
+            any given time.  The default is twice the number of threads.
+        poll_threads (int, optional):
+            The number of status polls that may be made at the same time.
+            Each export is only ever polled by one thread at a time.  The
+            default is ``4``.
+
+    Examples:
+
+        >>> orchestrator = ExportOrchestrator(num_threads=8)
+        >>> orchestrator.add(tio.exports.vulns(), write_vulns)
+        >>> orchestrator.add(tio.exports.assets(), write_assets)
+        >>> orchestrator.add(tio.exports.compliance(), write_compliance)
+        >>> orchestrator.run()
+        >>> orchestrator.progress()['total']
+        {'exports': 3, 'finished': 3, 'available': 180, 'queued': 0,
+         'in_flight': 0, 'done': 180, 'empty': 2, 'records': 412042,
+         'errors': 0}
+    '''
+
+    def __init__(self,
+                 num_threads: int = 4,
+                 max_queued: Optional[int] = None,
+                 poll_threads: int = 4
+                 ):
+        self.num_threads = num_threads
+        self.max_queued = max_queued or num_threads * 2
+        self.poll_threads = poll_threads
+        self.exports: List[OrchestratedExport] = []
+        self.errors: List[Exception] = []
+        self._in_flight = 0
+        self._cursor = 0
+        self._condition = Condition()
+        self._pollers: Optional[ThreadPoolExecutor] = None
+
+    def add(self,
+            iterator: ExportsIterator,
+            func: Any,
+            kwargs: Optional[Dict] = None,
+            name: Optional[str] = None
+            ) -> OrchestratedExport:
+        '''
+        Adds an export to the orchestrator.  The function is called for each
+        chunk using the same signature as
+        :py:meth:`ExportsIterator.run_threaded`.
+
+        Args:
+            iterator (ExportsIterator):
+                The export iterator.
+            func:
+                The function to pass each chunk to.
+            kwargs (dict, optional):
+                Additional keyword arguments to pass to the function.
+            name (str, optional):
+                The name to report the export's progress under.  If left
+                unspecified, the export type and UUID will be used.
+
+        Returns:
+            OrchestratedExport:
+                The export state tracked by the orchestrator.
+        '''
+        if iterator._is_iterator:
+            raise TioExportsError(export=iterator.type,
+                                  uuid=iterator.uuid,
+                                  msg=(f'ExportIterator for {iterator.uuid} '
+                                       'already set to run as an iterable '
+                                       'job.  Cannot perform threaded '
+                                       'operations.')
+                                  )
+        iterator._is_iterator = False
+        job = OrchestratedExport(
+            name=name or f'{iterator.type}:{iterator.uuid}',
+            iterator=iterator,
+            func=func,
+            kwargs=kwargs or {},
+        )
+        self.exports.append(job)
+        return job
+
+    def _poll(self, job: OrchestratedExport):
+        '''
+        Performs a single, non-blocking status poll for the export.  If no new
+        chunks are available, the next poll is scheduled using the iterator's
+        polling policy.
+        '''
+        iterator = job.iterator
+        if job.started_at is None:
+            job.started_at = time.time()
+        status = iterator._get_status()
+        if len(status.chunks_unfinished) > 0:
+            job.poll_count = 0
+            job.next_poll = 0
+        else:
+            job.poll_count += 1
+            job.next_poll = time.time() + iterator.polling.delay(
+                status, job.poll_count - 1
+            )
+
+    def _poll_job(self, job: OrchestratedExport):
+        '''
+        Polls the status of the export within the polling pool.  A failed poll
+        fails the export (unless it has already finished, such as an export
+        that was cancelled while being polled).
+        '''
+        try:
+            self._poll(job)
+        except Exception as err:  # noqa: PLW0703
+            if not job.finished:
+                self._fail(job, err)
+        finally:
+            with self._condition:
+                job.polling = False
+                self._condition.notify_all()
+
+    def _fail(self, job: OrchestratedExport, err: Exception):
+        '''
+        Marks the export as finished with an error, such as an export that has
+        errored or timed out, and stops scheduling its chunks.  The failure is
+        isolated to the export and any of its chunks already in flight are
+        left to complete.
+        '''
+        job.iterator._log.error('%s export has failed: %s', job.name, err)
+        with self._condition:
+            job.error = err
+            job.errors += 1
+            job.finished = True
+            job.finished_at = time.time()
+            self.errors.append(err)
+        job.iterator.chunks.clear()
+
+    def _work(self, job: OrchestratedExport, chunk_id: int):
+        '''
+        Downloads and processes a chunk within the worker pool.  Chunks that
+        can't be downloaded are recorded within the iterator's failed chunk
+        ledger, while any other error is recorded against the export.
+        '''
+        iterator = job.iterator
+        try:
+            try:
+                data = iterator._download_chunk(chunk_id)
+            except TioExportChunkError as err:
+                iterator._chunk_failed(chunk_id, err)
+                return
+            except Exception as err:
+                iterator._chunk_errored(chunk_id, err)
+                raise
+            if isinstance(data, list):
+                records = len(data)
+            else:
+                records = None
+            work = dict(job.kwargs)
+            work['data'] = data
+            work['export_uuid'] = iterator.uuid
+            work['export_type'] = iterator.type
+            work['export_chunk_id'] = chunk_id
+            iterator._process_chunk(job.func, work)
+        except Exception as err:  # noqa: PLW0703
+            iterator._log.error('%s chunk %s failed: %s',
+                                job.name, chunk_id, err
+                                )
+            with self._condition:
+                job.errors += 1
+                self.errors.append(err)
+        else:
+            with self._condition:
+                job.records += records or 0
+        finally:
+            with self._condition:
+                job.in_flight -= 1
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def _next_job(self) -> Optional[OrchestratedExport]:
+        '''
+        Returns the next export with chunks ready to be processed, working
+        through the exports in a round-robin fashion.
+        '''
+        count = len(self.exports)
+        for offset in range(count):
+            job = self.exports[(self._cursor + offset) % count]
+            if not job.finished and job.iterator.chunks:
+                self._cursor = (self._cursor + offset + 1) % count
+                return job
+        return None
+
+    def _update(self):
+        '''
+        Hands any exports whose status poll is due to the polling pool and
+        marks completed exports as finished.
+        '''
+        now = time.time()
+        for job in self.exports:
+            iterator = job.iterator
+            if job.finished or job.polling or iterator.chunks:
+                continue
+            if getattr(iterator, 'status', None) in ['ERROR', 'FINISHED']:
+                with self._condition:
+                    done = job.in_flight == 0
+                if done:
+                    job.finished = True
+                    job.finished_at = time.time()
+                    iterator._export_completed()
+                continue
+            if now >= job.next_poll:
+                job.polling = True
+                self._pollers.submit(self._poll_job, job)
+
+    def run(self):
+        '''
+        Runs all of the exports to completion.  Errors raised when downloading
+        or processing a chunk are isolated to that chunk, and errors raised
+        when polling the status of an export (such as an errored or timed out
+        export) are isolated to that export.  Once all of the exports have
+        finished, the first error encountered is raised.
+        '''
+        # Each worker may be downloading a chunk from the same container, so
+        # the connection pool of each API session is sized to match.
+        for api in {id(j.iterator._api): j.iterator._api
+                    for j in self.exports if j.iterator._api}.values():
+            api.ensure_pool_size(self.num_threads + self.poll_threads)
+        with ThreadPoolExecutor(max_workers=self.num_threads) as executor, \
+                ThreadPoolExecutor(max_workers=self.poll_threads) as pollers:
+            self._pollers = pollers
+            while not all(j.finished and not j.polling
+                          for j in self.exports):
+                self._update()
+
+                # Hand out chunks until the pool is full or no export has any
+                # chunks ready for us.
+                scheduled = False
+                while True:
+                    with self._condition:
+                        if self._in_flight >= self.max_queued:
+                            break
+                    job = self._next_job()
+                    if not job:
+                        break
+                    chunk_id = job.iterator._next_chunk()
+                    with self._condition:
+                        job.in_flight += 1
+                        self._in_flight += 1
+                    executor.submit(self._work, job, chunk_id)
+                    scheduled = True
+
+                if scheduled:
+                    continue
+
+                # Nothing could be scheduled, so we will wait for either a
+                # worker or status poll to finish, or the next status poll to
+                # be due.
+                polls = [j.next_poll for j in self.exports
+                         if not (j.finished or j.polling or j.iterator.chunks)
+                         ]
+                wait = max(min(polls) - time.time(), 0) if polls else 1
+                with self._condition:
+                    self._condition.wait(timeout=min(wait, 1))
+            self._pollers = None
+
+        if self.errors:
+            raise self.errors[0]
+
+    def progress(self) -> Dict[str, Dict]:
+        '''
+        Returns the combined progress and metrics of the exports.
+
+        Returns:
+            dict:
+                A dictionary keyed by the export name with the export's chunk
+                counters, records processed, error count, and the error that
+                caused the export to fail (if any), along with a
+                ``total`` key combining all of the exports.
+        '''
+        resp = {}
+        total = {'exports': len(self.exports), 'finished': 0, 'records': 0,
+                 'errors': 0
+                 }
+        with self._condition:
+            for job in self.exports:
+                counters = job.iterator.counters
+                info = dict(counters,
+                            status=getattr(job.iterator, 'status', None),
+                            records=job.records,
+                            errors=job.errors,
+                            error=job.error,
+                            finished=job.finished,
+                            elapsed=((job.finished_at or time.time())
+                                     - job.started_at
+                                     if job.started_at else 0
+                                     ),
+                            )
+                resp[job.name] = info
+                total['finished'] += int(job.finished)
+                total['records'] += job.records
+                total['errors'] += job.errors
+                for key, value in counters.items():
+                    total[key] = total.get(key, 0) + value
+        resp['total'] = total
+        return resp
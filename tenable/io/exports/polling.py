@@ -0,0 +1,196 @@
+'''
+Polling policies determine how long an export iterator waits between status
+calls while no chunks are ready to be processed.  Every status response is
+passed to the policy, allowing it to track how quickly the export is producing
+chunks, and the policy is then asked how long to wait before the next poll.
+
+A custom policy can be provided to any of the export methods using the
+``polling`` parameter.
+
+.. autoclass:: PollingPolicy
+    :members:
+
+.. autoclass:: LinearBackoffPolicy
+    :members:
+
+.. autoclass:: AdaptivePollingPolicy
+    :members:
+'''
+import abc
+import random
+import time
+from typing import Dict, Optional
+
+
+class PollingPolicy(abc.ABC):
+    '''
+    Base polling policy.  Tracks the observed chunk production rate of the
+    export using an exponentially weighted moving average.  Subclasses must
+    implement the :py:meth:`delay` method.
+
+    Args:
+        smoothing (float, optional):
+            The weight given to the newest rate observation.  The default is
+            ``0.3``.
+
+    Attributes:
+        rate (float):
+            The observed chunk production rate in chunks per second.  Will be
+            ``None`` until at least two status responses with differing chunk
+            counts have been observed.
+    '''
+    rate: Optional[float] = None
+
+    def __init__(self, smoothing: float = 0.3):
+        self.smoothing = smoothing
+        self.rate = None
+        self._last = None
+
+    @staticmethod
+    def produced(status: Dict) -> int:
+        '''
+        Returns the number of chunks the export has produced so far.  The
+        ``finished_chunks`` count is preferred when the API returns it, falling
+        back to the number of available chunks.
+        '''
+        finished = status.get('finished_chunks')
+        if finished is not None:
+            return int(finished)
+        return len(status.get('chunks_available', []))
+
+    def observe(self, status: Dict, now: Optional[float] = None):
+        '''
+        Records the status response, updating the observed production rate.
+
+        Args:
+            status (dict): The export status response.
+            now (float, optional): The time of the observation.
+        '''
+        now = now if now is not None else time.monotonic()
+        produced = self.produced(status)
+        if self._last is not None:
+            last_time, last_produced = self._last
+            if produced > last_produced and now > last_time:
+                rate = (produced - last_produced) / (now - last_time)
+                if self.rate is None:
+                    self.rate = rate
+                else:
+                    self.rate = (self.smoothing * rate
+                                 + (1 - self.smoothing) * self.rate
+                                 )
+            elif produced == last_produced:
+                # Nothing new has been produced, so we won't move the baseline
+                # forward and the next change will be averaged over the whole
+                # gap.
+                return
+        self._last = (now, produced)
+
+    @abc.abstractmethod
+    def delay(self, status: Dict, attempt: int) -> float:
+        '''
+        Returns the number of seconds to wait before the next status poll.
+
+        Args:
+            status (dict):
+                The most recent export status response.
+            attempt (int):
+                The number of consecutive polls that have returned no new
+                chunks to process.
+
+        Returns:
+            float:
+                The number of seconds to sleep.
+        '''
+
+
+class LinearBackoffPolicy(PollingPolicy):
+    '''
+    The default polling policy.  Waits an additional second for each
+    consecutive poll without new chunks, up to the maximum delay.
+
+    Args:
+        max_delay (float, optional):
+            The maximum number of seconds to wait.  The default is ``30``.
+    '''
+
+    def __init__(self, max_delay: float = 30, **kwargs):
+        self.max_delay = max_delay
+        super().__init__(**kwargs)
+
+    def delay(self, status: Dict, attempt: int) -> float:
+        return min(attempt + 2, self.max_delay)
+
+
+class AdaptivePollingPolicy(PollingPolicy):
+    '''
+    Estimates when the next chunk will be ready based on the observed chunk
+    production rate and the remaining chunks within the export, and waits
+    roughly that long (with jitter) before polling again.  Until a production
+    rate has been observed, the delay grows exponentially from the minimum.
+
+    Args:
+        min_delay (float, optional):
+            The minimum number of seconds to wait.  The default is ``1``.
+        max_delay (float, optional):
+            The maximum number of seconds to wait.  The default is ``30``.
+        jitter (float, optional):
+            The proportion of random jitter to apply to the delay.  The default
+            is ``0.1`` (+/- 10%).
+
+    Example:
+
+        >>> policy = AdaptivePollingPolicy(min_delay=0.5, max_delay=20)
+        >>> export = tio.exports.vulns(polling=policy)
+        >>> for vuln in export:
+        ...     pass
+        >>> export.chunk_rate
+        0.42
+    '''
+
+    def __init__(self,
+                 min_delay: float = 1,
+                 max_delay: float = 30,
+                 jitter: float = 0.1,
+                 **kwargs
+                 ):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        super().__init__(**kwargs)
+
+    def _backoff(self, attempt: int) -> float:
+        '''
+        Returns the exponential backoff delay for the attempt.  The exponent
+        is clamped, as the delay is capped long before then and a large
+        enough exponent would overflow a float.
+        '''
+        return self.min_delay * (2 ** min(attempt, 32))
+
+    def estimate(self, status: Dict, attempt: int) -> float:
+        '''
+        Returns the estimated number of seconds until the next chunk is ready.
+        '''
+        if not self.rate:
+            return self._backoff(attempt)
+        eta = 1 / self.rate
+
+        # If we know how many chunks the export will contain and every one of
+        # them has been produced, then we are just waiting on the status to
+        # flip over to finished and should check back quickly.
+        total = status.get('total_chunks')
+        if total and self.produced(status) >= total:
+            return self.min_delay
+
+        # Subtract the time that has already elapsed since the last chunk was
+        # produced.  The longer we've waited beyond the estimate, the less
+        # reliable it is, so we fall back to backing off exponentially.
+        if self._last is not None:
+            eta -= time.monotonic() - self._last[0]
+        if eta <= 0:
+            return self._backoff(attempt)
+        return eta
+
+    def delay(self, status: Dict, attempt: int) -> float:
+        delay = self.estimate(status, attempt)
+        delay *= 1 + random.uniform(-self.jitter, self.jitter)  # noqa: S311
+        return max(self.min_delay, min(delay, self.max_delay))
@@ -0,0 +1,94 @@
+'''
+Field projection reduces each export record down to the fields that the caller
+is actually interested in.  The dotted field paths are compiled once into an
+extractor that is applied to every record as soon as the chunk is decoded, so
+the unused portions of the records are dropped before they are handed to the
+caller.
+
+The projected records keep the same nested structure as the original records.
+Any path that traverses a list of objects (such as ``plugin.xrefs.type``) is
+applied to every object within the list, and paths that don't exist within a
+record are simply left out of the projected record.
+
+.. autofunction:: compile_projection
+'''
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+Projector = Callable[[Dict], Dict]
+
+
+def _build_tree(fields: Iterable[str]) -> Dict[str, Any]:
+    '''
+    Builds the nested field tree from the dotted paths.  Leaves are stored as
+    ``None``.  A leaf always wins over a branch, as selecting the parent field
+    already includes all of its children.
+    '''
+    tree = {}
+    for path in fields:
+        node = tree
+        keys = path.split('.')
+        for key in keys[:-1]:
+            child = node.get(key, {})
+            if child is None:
+                break
+            node = node.setdefault(key, child)
+        else:
+            node[keys[-1]] = None
+    return tree
+
+
+def _compile(tree: Dict[str, Any]) -> Projector:
+    '''
+    Compiles the field tree into the extractor function.
+    '''
+    leaves: Tuple[str, ...] = tuple(k for k, v in tree.items() if v is None)
+    branches: List[Tuple[str, Projector]] = [
+        (k, _compile(v)) for k, v in tree.items() if v is not None
+    ]
+
+    def project(record: Dict) -> Dict:
+        resp = {k: record[k] for k in leaves if k in record}
+        for key, func in branches:
+            value = record.get(key)
+            if isinstance(value, Mapping):
+                resp[key] = func(value)
+            elif isinstance(value, list):
+                resp[key] = [func(v) for v in value if isinstance(v, Mapping)]
+        return resp
+    return project
+
+
+def compile_projection(fields: Iterable[str]) -> Projector:
+    '''
+    Compiles the list of dotted field paths into a projection function.
+
+    Args:
+        fields (list[str]):
+            The dotted field paths to keep within each record.
+
+    Returns:
+        Callable:
+            A function that accepts a record and returns the projected record.
+
+    Examples:
+
+        >>> project = compile_projection(['asset.uuid',
+        ...                               'asset.hostname',
+        ...                               'plugin.id',
+        ...                               'severity'
+        ...                               ])
+        >>> project(vuln)
+        {'severity': 'high',
+         'asset': {'uuid': '...', 'hostname': 'server1'},
+         'plugin': {'id': 19506}}
+
+        Projecting a vulnerability export as it's downloaded:
+
+        >>> for vuln in tio.exports.vulns(projection=['asset.uuid',
+        ...                                           'plugin.id',
+        ...                                           'severity'
+        ...                                           ]):
+        ...     print(vuln)
+    '''
+    return _compile(_build_tree(fields))
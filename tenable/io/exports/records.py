@@ -0,0 +1,412 @@
+'''
+Compact record types store export records using ``__slots__`` instead of a
+per-record dictionary, cutting the memory used by each record to a fraction of
+the equivalent ``dict`` (and even more so of the equivalent ``Box``).  This is
+most useful when millions of records need to be held in memory at once, such
+as when correlating the findings of a vulnerability export.
+
+The nested objects within the vulnerability records (``asset``, ``plugin``,
+``port``, and ``scan``) are stored as compact sub-records, and frequently
+repeated short values such as the severity and state are interned so that
+every record shares the same string object.  As the same asset, plugin, port,
+and scan objects are repeated across many findings, identical sub-records are
+also shared between the records converted with the same cache (the export
+iterators share a bounded :obj:`RecordCache` across the whole export).  As
+such, compact records should be treated as read-only.  Any field that isn't
+defined on the record type is kept within a small overflow dictionary, so the
+conversion is lossless.
+
+Compact records behave as read-only mappings, so ``record['asset']['uuid']``
+and ``record.get('output')`` work just as they would with a ``dict``, and the
+fields are also available as attributes (``record.asset.uuid``).  Fields
+missing from the original record will return ``None`` when accessed as an
+attribute.  Conversion back into plain dictionaries only happens when
+:py:meth:`CompactRecord.to_dict` is called.
+
+Compact records can be requested from the exports using the ``compact``
+parameter:
+
+.. code-block:: python
+
+    for vuln in tio.exports.vulns(compact=True):
+        print(vuln.asset.hostname, vuln.plugin.id, vuln.severity)
+
+.. autoclass:: CompactRecord
+    :members:
+
+.. autoclass:: RecordCache
+    :members:
+
+.. autofunction:: compact_records
+
+.. autofunction:: json_default
+'''
+import sys
+from collections import OrderedDict
+from collections.abc import Mapping
+from threading import Lock
+from typing import (Any, Dict, FrozenSet, Iterable, Iterator, Optional,
+                    Tuple, Type, Union
+                    )
+
+_MISSING = object()
+
+
+def _hashable(value: Any) -> Any:
+    '''
+    Converts list values into tuples so that they can be used within a key.
+    '''
+    if isinstance(value, list):
+        return tuple(_hashable(v) for v in value)
+    if isinstance(value, dict):
+        return tuple((k, _hashable(v)) for k, v in value.items())
+    return value
+
+
+class RecordCache:
+    '''
+    A bounded, thread-safe cache of shareable sub-records.  Once the cache is
+    full, the least recently used sub-records are evicted, so that the cache
+    of a long running export can't grow without bound.  Sub-records that have
+    been evicted remain shared by the records that were already converted.
+
+    Args:
+        max_size (int, optional):
+            The maximum number of sub-records to hold.  The default is
+            ``100000``.
+    '''
+
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Tuple) -> Optional['CompactRecord']:
+        '''
+        Returns the cached sub-record, or ``None`` if it isn't cached.
+        '''
+        with self._lock:
+            obj = self._items.get(key)
+            if obj is not None:
+                self._items.move_to_end(key)
+            return obj
+
+    def __setitem__(self, key: Tuple, obj: 'CompactRecord'):
+        with self._lock:
+            self._items[key] = obj
+            if len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+class CompactRecord(Mapping):
+    '''
+    Base compact record.  Subclasses define the fields that they store using
+    both the ``__slots__`` and ``_fields`` attributes.
+    '''
+    __slots__ = ('_extra',)
+    _fields: Tuple[str, ...] = ()
+    _field_set: FrozenSet[str] = frozenset()
+    _nested: Dict[str, Type['CompactRecord']] = {}
+    _interned: FrozenSet[str] = frozenset()
+    _key: Tuple[str, ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._field_set = frozenset(cls._fields)
+
+    def __init__(self, **kwargs):
+        self._extra = None
+        for key, value in kwargs.items():
+            self._set(key, value)
+
+    def _set(self,
+             key: str,
+             value: Any,
+             cache: Optional[Union[Dict, RecordCache]] = None
+             ):
+        '''
+        Stores the value, converting nested objects and interning strings.
+        '''
+        if key in self._field_set:
+            if key in self._nested and isinstance(value, dict):
+                value = self._nested[key].from_dict(value, cache)
+            elif key in self._interned and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    @classmethod
+    def from_dict(cls,
+                  data: Dict,
+                  cache: Optional[Union[Dict, RecordCache]] = None
+                  ) -> 'CompactRecord':
+        '''
+        Builds the compact record from the decoded record.
+
+        Args:
+            data (dict):
+                The record.
+            cache (dict | RecordCache, optional):
+                The cache of shareable sub-records.  Record types with a
+                ``_key`` defined are looked up within the cache using the key
+                fields, and only converted if they haven't been seen before.
+
+        Returns:
+            CompactRecord:
+                The compact record.
+        '''
+        key = None
+        if cache is not None and cls._key and data.keys() <= cls._field_set:
+            key = (cls,) + tuple(_hashable(data.get(k, _MISSING))
+                                 for k in cls._key
+                                 )
+            obj = cache.get(key)
+            if obj is not None:
+                return obj
+        obj = cls.__new__(cls)
+        obj._extra = None
+        for name, value in data.items():
+            obj._set(name, value, cache)
+        if key is not None:
+            cache[key] = obj
+        return obj
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for slots that have never been set.
+        if name in self._field_set:
+            return None
+        raise AttributeError(name)
+
+    def _items(self) -> Iterator[Tuple[str, Any]]:
+        '''
+        Iterates over the fields that were set and the overflow fields.
+        '''
+        cls = type(self)
+        for name in self._fields:
+            try:
+                yield name, getattr(cls, name).__get__(self, cls)
+            except AttributeError:
+                continue
+        if self._extra:
+            yield from self._extra.items()
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._field_set:
+            cls = type(self)
+            try:
+                return getattr(cls, key).__get__(self, cls)
+            except AttributeError as err:
+                raise KeyError(key) from err
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for key, _ in self._items():
+            yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self._items())
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.to_dict()!r})'
+
+    def __getstate__(self) -> Dict:
+        return self.to_dict()
+
+    def __setstate__(self, state: Dict):
+        self._extra = None
+        for key, value in state.items():
+            self._set(key, value)
+
+    def to_dict(self) -> Dict:
+        '''
+        Converts the compact record (and any nested records) back into a
+        dictionary.
+        '''
+        return {k: v.to_dict() if isinstance(v, CompactRecord) else v
+                for k, v in self._items()
+                }
+
+
+class VulnAssetRecord(CompactRecord):
+    '''
+    The asset object within a vulnerability record.
+    '''
+    __slots__ = _fields = (
+        'uuid', 'hostname', 'fqdn', 'ipv4', 'ipv6', 'mac_address',
+        'netbios_name', 'netbios_workgroup', 'network_id', 'operating_system',
+        'device_type', 'tracked', 'agent_uuid', 'bios_uuid',
+        'last_authenticated_results', 'last_unauthenticated_results',
+    )
+    _interned = frozenset({'device_type', 'network_id'})
+    _key = _fields
+
+
+class PluginRecord(CompactRecord):
+    '''
+    The plugin object within a vulnerability record.
+    '''
+    __slots__ = _fields = (
+        'id', 'name', 'family', 'family_id', 'type', 'version',
+        'publication_date', 'modification_date', 'description', 'synopsis',
+        'solution', 'see_also', 'risk_factor', 'cpe', 'cve', 'bid', 'xrefs',
+        'cvss_base_score', 'cvss_temporal_score', 'cvss_vector',
+        'cvss3_base_score', 'cvss3_temporal_score', 'cvss3_vector', 'vpr',
+        'has_patch', 'exploit_available', 'exploitability_ease',
+        'patch_publication_date', 'vuln_publication_date',
+        'checks_for_malware', 'checks_for_default_account', 'in_the_news',
+        'unsupported_by_vendor',
+    )
+    _interned = frozenset({'family', 'type', 'risk_factor', 'version',
+                           'exploitability_ease'
+                           })
+    _key = _fields
+
+
+class PortRecord(CompactRecord):
+    '''
+    The port object within a vulnerability record.
+    '''
+    __slots__ = _fields = ('port', 'protocol', 'service')
+    _interned = frozenset({'protocol', 'service'})
+    _key = _fields
+
+
+class ScanRecord(CompactRecord):
+    '''
+    The scan object within a vulnerability record.
+    '''
+    __slots__ = _fields = ('uuid', 'schedule_uuid', 'started_at',
+                           'completed_at'
+                           )
+    _interned = frozenset(_fields)
+    _key = _fields
+
+
+class VulnRecord(CompactRecord):
+    '''
+    A vulnerability export record.
+    '''
+    __slots__ = _fields = (
+        'asset', 'plugin', 'port', 'scan', 'output', 'severity', 'severity_id',
+        'severity_default_id', 'severity_modification_type', 'state',
+        'first_found', 'last_found', 'last_fixed', 'indexed', 'source',
+    )
+    _nested = {
+        'asset': VulnAssetRecord,
+        'plugin': PluginRecord,
+        'port': PortRecord,
+        'scan': ScanRecord,
+    }
+    _interned = frozenset({'severity', 'severity_modification_type', 'state',
+                           'source'
+                           })
+
+
+class AssetRecord(CompactRecord):
+    '''
+    An asset export record.
+    '''
+    __slots__ = _fields = (
+        'id', 'has_agent', 'has_plugin_results', 'created_at',
+        'terminated_at', 'terminated_by', 'updated_at', 'deleted_at',
+        'deleted_by', 'first_seen', 'last_seen', 'first_scan_time',
+        'last_scan_time', 'last_authenticated_scan_date',
+        'last_licensed_scan_date', 'last_scan_id', 'last_schedule_id',
+        'azure_vm_id', 'azure_resource_id', 'gcp_project_id', 'gcp_zone',
+        'gcp_instance_id', 'aws_ec2_instance_id', 'aws_owner_id',
+        'aws_region', 'agent_uuid', 'bios_uuid', 'network_id',
+        'network_name', 'agent_names', 'installed_software', 'ipv4s',
+        'ipv6s', 'fqdns', 'mac_addresses', 'netbios_names',
+        'operating_systems', 'system_types', 'hostnames', 'ssh_fingerprints',
+        'qualys_asset_ids', 'qualys_host_ids', 'manufacturer_tpm_ids',
+        'symantec_ep_hardware_keys', 'sources', 'tags', 'network_interfaces',
+        'acr_score', 'exposure_score',
+    )
+    _interned = frozenset({'network_id', 'network_name'})
+
+
+class ComplianceRecord(CompactRecord):
+    '''
+    A compliance export record.
+    '''
+    __slots__ = _fields = (
+        'asset', 'asset_uuid', 'first_seen', 'last_seen', 'last_observed',
+        'indexed_at', 'audit_file', 'check_id', 'check_name', 'check_info',
+        'expected_value', 'actual_value', 'status', 'state', 'reference',
+        'see_also', 'solution', 'synopsis', 'description', 'plugin_id',
+        'profile_name', 'compliance_benchmark_name',
+        'compliance_benchmark_version', 'compliance_control_id',
+        'compliance_full_id', 'compliance_functional_id',
+        'compliance_informational_id', 'metadata_id', 'uname_output',
+    )
+    _interned = frozenset({'audit_file', 'status', 'state', 'profile_name',
+                           'compliance_benchmark_name',
+                           'compliance_benchmark_version'
+                           })
+
+
+RECORD_TYPES: Dict[str, Type[CompactRecord]] = {
+    'vulns': VulnRecord,
+    'assets': AssetRecord,
+    'compliance': ComplianceRecord,
+}
+
+
+def json_default(obj: Any) -> Any:
+    '''
+    A ``default`` hook for :func:`json.dumps` that serializes compact records
+    (including any nested within plain dictionaries) as dictionaries.
+
+    Example:
+
+        >>> json.dumps(record, default=json_default)
+    '''
+    if isinstance(obj, CompactRecord):
+        return obj.to_dict()
+    raise TypeError(f'Object of type {type(obj).__name__} '
+                    'is not JSON serializable')
+
+
+def compact_records(data: Iterable[Dict],
+                    export_type: str,
+                    cache: Optional[Union[Dict, RecordCache]] = None
+                    ) -> Iterable[CompactRecord]:
+    '''
+    Converts the chunk records into compact records.  Lists are converted
+    eagerly, while any other iterable is converted lazily.
+
+    Args:
+        data (Iterable[dict]):
+            The chunk records.
+        export_type (str):
+            The datatype of the export.
+        cache (dict | RecordCache, optional):
+            The cache of shareable sub-records.  Pass the same cache when
+            converting each chunk of an export to share the sub-records across
+            the chunks.  A :obj:`RecordCache` keeps the size of the cache
+            bounded.  If left unspecified, the sub-records are only shared
+            within the chunk.
+
+    Returns:
+        Iterable[CompactRecord]:
+            The compact records.
+
+    Example:
+
+        >>> chunk = tio.exports.download_chunk('vulns', '{UUID}', 1)
+        >>> records = compact_records(chunk, 'vulns')
+    '''
+    convert = RECORD_TYPES[export_type].from_dict
+    if cache is None:
+        cache = {}
+    if isinstance(data, list):
+        return [convert(r, cache) for r in data]
+    return (convert(r, cache) for r in data)
@@ -0,0 +1,110 @@
+'''
+Chunk retry policies determine which export chunk download failures are worth
+retrying and how long to wait between each attempt.  Connection resets,
+timeouts, server-side (5xx) errors, rate limiting, and truncated or otherwise
+undecodable chunk bodies are all considered to be transient.
+
+The API session already retries rate limited and unavailable responses on its
+own, so the chunk retry policy sits above it and handles the failures that the
+session will either give up on or never see, such as a chunk body that was cut
+short part way through.  Once the retries for a chunk have been exhausted, a
+:obj:`TioExportChunkError` is raised and the export iterators record the chunk
+within their ledger of failed chunks (see
+:py:meth:`ExportsIterator.retry_failed`).
+
+A custom policy can be provided to any of the export methods using the
+``retry`` parameter.
+
+.. autoclass:: ChunkRetryPolicy
+    :members:
+'''
+import random
+from json.decoder import JSONDecodeError
+from typing import Tuple, Type
+from requests.exceptions import (ChunkedEncodingError,
+                                 ConnectionError as RequestsConnectionError,
+                                 ContentDecodingError,
+                                 Timeout
+                                 )
+from restfly.errors import APIError
+
+TRANSIENT_ERRORS: Tuple[Type[Exception], ...] = (
+    JSONDecodeError,
+    ChunkedEncodingError,
+    ContentDecodingError,
+    RequestsConnectionError,
+    Timeout,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class ChunkRetryPolicy:
+    '''
+    Exponential backoff with jitter for export chunk downloads.
+
+    Args:
+        retries (int, optional):
+            The number of times a failed chunk download will be retried.  The
+            default is ``3``.
+        backoff (float, optional):
+            The base delay in seconds.  The delay before each retry doubles
+            with every attempt.  The default is ``1.0``.
+        max_backoff (float, optional):
+            The upper bound of the delay in seconds.  The default is ``60.0``.
+        jitter (bool, optional):
+            Should the delay be randomized?  When enabled, a random delay
+            between zero and the computed backoff is used ("full jitter"),
+            preventing every downloader thread from retrying in lock-step.  The
+            default is ``True``.
+
+    Examples:
+
+        Retrying each chunk up to 6 times, waiting at most 30 seconds between
+        each attempt:
+
+        >>> policy = ChunkRetryPolicy(retries=6, max_backoff=30)
+        >>> export = tio.exports.vulns(retry=policy)
+    '''
+
+    def __init__(self,
+                 retries: int = 3,
+                 backoff: float = 1.0,
+                 max_backoff: float = 60.0,
+                 jitter: bool = True,
+                 ):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+
+    def delay(self, attempt: int) -> float:
+        '''
+        Returns the number of seconds to wait before the next attempt.
+
+        Args:
+            attempt (int): The number of attempts that have already failed.
+
+        Returns:
+            float:
+                The number of seconds to wait.
+        '''
+        delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+        if self.jitter:
+            return random.uniform(0, delay)  # noqa: S311
+        return delay
+
+    def is_retryable(self, err: Exception) -> bool:
+        '''
+        Returns if the error raised by the chunk download is transient.
+
+        Args:
+            err (Exception): The error raised by the download.
+
+        Returns:
+            bool:
+                ``True`` if the chunk download should be retried.
+        '''
+        if isinstance(err, APIError):
+            return err.code == 429 or err.code >= 500
+        return isinstance(err, TRANSIENT_ERRORS)
@@ -0,0 +1,262 @@
+'''
+The chunk sizer tunes the chunk size parameter of each export type
+(``num_assets`` for vulnerability exports, ``chunk_size`` for asset exports,
+and ``num_findings`` for compliance exports) based upon the chunks that have
+been downloaded by prior exports.
+
+Every chunk downloaded by an iterator that has been handed a sizer is measured
+(the size of the body in bytes, the number of records, the number of sizing
+units, and the download time) and the measurements are persisted within a
+SQLite database.  When the next export of the same type is requested with the
+sizer, the chunk size parameter is chosen so that the chunks are expected to
+hit the target size in bytes, the target download latency, or both (whichever
+results in the smaller chunks).  Any chunk size parameter passed explicitly to
+the export is left untouched.
+
+The sizing units are the unit that the chunk size parameter is expressed in:
+the number of distinct assets within a vulnerability chunk, and the number of
+records within an asset or compliance chunk.  The latency is modeled as a
+fixed per-request overhead plus a per-unit cost, fitted over the recorded
+chunks, so that small chunks dominated by the request overhead don't skew the
+recommendation.
+
+Only chunks that are downloaded whole are measured, so streamed exports,
+process-pool exports, and asynchronous exports don't record any measurements.
+
+.. autoclass:: ChunkSizer
+    :members:
+'''
+import sqlite3
+import time
+from threading import Lock
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# The chunk size parameter of each export type along with the default value
+# and the range of values that the API accepts.
+SIZE_PARAMS: Dict[str, Tuple[str, int, int, int]] = {
+    'vulns': ('num_assets', 500, 50, 5000),
+    'assets': ('chunk_size', 1000, 100, 10000),
+    'compliance': ('num_findings', 5000, 50, 10000),
+}
+
+
+def count_units(export_type: str, data: Iterable[Dict]) -> int:
+    '''
+    Returns the number of sizing units within the chunk.
+    '''
+    if export_type == 'vulns':
+        return len({(r.get('asset') or {}).get('uuid') for r in data})
+    return len(data)
+
+
+class ChunkSizer:
+    '''
+    Records the per-chunk measurements of each export and recommends the chunk
+    size parameter for the next export.
+
+    Args:
+        path (str, optional):
+            The path to the SQLite database to persist the measurements to.  If
+            left unspecified, the measurements are only held in memory.
+        target_bytes (int, optional):
+            The desired size of each chunk in bytes.  The default is 32MiB.
+        target_seconds (float, optional):
+            The desired download time of each chunk in seconds.  If left
+            unspecified, only the size target is used.
+        history (int, optional):
+            The number of most recent chunks of each export type to base the
+            recommendation on.  The default is ``1000``.
+
+    Examples:
+
+        >>> sizer = ChunkSizer('sizing.db', target_bytes=16 * 1024 * 1024)
+        >>> export = tio.exports.vulns(sizer=sizer)
+        >>> export.run_threaded(write_chunk, num_threads=4)
+
+        The next export will use the recommended ``num_assets`` value:
+
+        >>> sizer.recommend('vulns')
+        1340
+        >>> sizer.stats('vulns')
+        {'chunks': 38, 'records': 1702291, 'units': 18410,
+         'bytes': 602931200, 'seconds': 171.0, 'bytes_per_unit': 32750.2,
+         'records_per_unit': 92.5, 'seconds_per_unit': 0.0089,
+         'overhead': 0.41}
+    '''
+
+    def __init__(self,
+                 path: Optional[str] = None,
+                 target_bytes: Optional[int] = 32 * 1024 * 1024,
+                 target_seconds: Optional[float] = None,
+                 history: int = 1000
+                 ):
+        self.path = path
+        self.target_bytes = target_bytes
+        self.target_seconds = target_seconds
+        self.history = history
+        self._lock = Lock()
+        self._db = sqlite3.connect(path or ':memory:',
+                                   check_same_thread=False
+                                   )
+        with self._db:
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS chunk_stats (
+                    export_type TEXT NOT NULL,
+                    export_uuid TEXT,
+                    chunk_id INTEGER,
+                    records INTEGER NOT NULL,
+                    units INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    seconds REAL NOT NULL,
+                    recorded_at REAL NOT NULL
+                )''')
+
+    def record(self,
+               export_type: str,
+               records: int,
+               units: int,
+               nbytes: int,
+               seconds: float,
+               export_uuid: Optional[str] = None,
+               chunk_id: Optional[int] = None
+               ):
+        '''
+        Records the measurements of a downloaded chunk.  Empty chunks are
+        ignored.
+
+        Args:
+            export_type (str): The datatype of the export job.
+            records (int): The number of records within the chunk.
+            units (int): The number of sizing units within the chunk.
+            nbytes (int): The size of the chunk body in bytes.
+            seconds (float): The time taken to download the chunk.
+            export_uuid (str, optional): The export job UUID.
+            chunk_id (int, optional): The chunk id.
+        '''
+        if units < 1:
+            return
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT INTO chunk_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (export_type,
+                 str(export_uuid) if export_uuid else None,
+                 chunk_id,
+                 records,
+                 units,
+                 nbytes,
+                 seconds,
+                 time.time()
+                 )
+            )
+
+    def _recent(self, export_type: str):
+        '''
+        Returns the units, records, bytes, and seconds of the most recent
+        chunks of the export type.
+        '''
+        with self._lock:
+            return self._db.execute(
+                ('SELECT units, records, bytes, seconds FROM chunk_stats '
+                 'WHERE export_type = ? ORDER BY rowid DESC LIMIT ?'),
+                (export_type, self.history)
+            ).fetchall()
+
+    @staticmethod
+    def _fit(rows) -> Tuple[float, float]:
+        '''
+        Fits the download time as a fixed overhead plus a per-unit cost using
+        least squares, falling back to a purely per-unit cost when the chunks
+        don't vary enough in size for the fit to be meaningful.
+        '''
+        count = len(rows)
+        mean_u = sum(r[0] for r in rows) / count
+        mean_s = sum(r[3] for r in rows) / count
+        var = sum((r[0] - mean_u) ** 2 for r in rows)
+        if var > 0:
+            slope = sum((r[0] - mean_u) * (r[3] - mean_s) for r in rows) / var
+            overhead = mean_s - slope * mean_u
+            if slope > 0 and overhead >= 0:
+                return overhead, slope
+        return 0.0, mean_s / mean_u
+
+    def stats(self, export_type: str) -> Dict[str, Any]:
+        '''
+        Returns the aggregated measurements for the export type.
+
+        Args:
+            export_type (str): The datatype of the export job.
+
+        Returns:
+            dict:
+                The chunk, record, unit, byte, and second totals along with
+                the derived per-unit costs and the fitted per-request
+                overhead.  Returns an empty dictionary if no chunks have been
+                recorded.
+        '''
+        rows = self._recent(export_type)
+        if not rows:
+            return {}
+        units = sum(r[0] for r in rows)
+        overhead, slope = self._fit(rows)
+        return {
+            'chunks': len(rows),
+            'records': sum(r[1] for r in rows),
+            'units': units,
+            'bytes': sum(r[2] for r in rows),
+            'seconds': sum(r[3] for r in rows),
+            'bytes_per_unit': sum(r[2] for r in rows) / units,
+            'records_per_unit': sum(r[1] for r in rows) / units,
+            'seconds_per_unit': slope,
+            'overhead': overhead,
+        }
+
+    def recommend(self, export_type: str) -> int:
+        '''
+        Returns the chunk size parameter value for the next export.
+
+        Args:
+            export_type (str): The datatype of the export job.
+
+        Returns:
+            int:
+                The recommended value, clamped to the range the API accepts.
+                If no chunks have been recorded for the export type yet, the
+                API default is returned.
+        '''
+        _, default, minimum, maximum = SIZE_PARAMS[export_type]
+        stats = self.stats(export_type)
+        if not stats:
+            return default
+        candidates = []
+        if self.target_bytes and stats['bytes_per_unit'] > 0:
+            candidates.append(self.target_bytes / stats['bytes_per_unit'])
+        if self.target_seconds and stats['seconds_per_unit'] > 0:
+            candidates.append((self.target_seconds - stats['overhead'])
+                              / stats['seconds_per_unit']
+                              )
+        if not candidates:
+            return default
+        return int(max(minimum, min(maximum, min(candidates))))
+
+    def clear(self, export_type: Optional[str] = None):
+        '''
+        Removes the recorded measurements.
+
+        Args:
+            export_type (str, optional):
+                The datatype to remove the measurements for.  If left
+                unspecified, every measurement is removed.
+        '''
+        with self._lock, self._db:
+            if export_type:
+                self._db.execute('DELETE FROM chunk_stats '
+                                 'WHERE export_type = ?', (export_type,)
+                                 )
+            else:
+                self._db.execute('DELETE FROM chunk_stats')
+
+    def close(self):
+        '''
+        Closes the database connection.
+        '''
+        self._db.close()
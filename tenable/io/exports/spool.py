@@ -0,0 +1,373 @@
+'''
+The export spool stores every downloaded chunk as a gzip-compressed JSON file
+on local disk, keyed by the export type, export UUID, and chunk id.  Once an
+export has been spooled, any number of additional consumers can replay the
+export from disk using the :obj:`SpoolIterator`, which shares the same
+interface as the :obj:`ExportsIterator`, without making any further calls to
+the API.
+
+The spool directory is laid out as ``{path}/{type}/{uuid}/{chunk_id}.json.gz``
+with a ``complete`` marker file written once the export has been fully
+downloaded.
+
+.. autoclass:: ExportSpool
+    :members:
+
+.. autoclass:: SpoolIterator
+    :members:
+'''
+import gzip
+import json
+import os
+from typing import Dict, List, Iterable, Iterator
+from box import Box
+from tenable.errors import TioExportsError
+from .iterator import ExportsIterator
+
+
+class ExportSpool:
+    '''
+    Local on-disk chunk spool.
+
+    Args:
+        path (str):
+            The base directory to store the spooled chunks within.
+        compresslevel (int, optional):
+            The gzip compression level to use.  The default is ``6``.
+
+    Examples:
+
+        Spool an export while processing it:
+
+        >>> spool = ExportSpool('/var/spool/tenable')
+        >>> export = tio.exports.vulns(spool=spool)
+        >>> export.run_threaded(write_to_siem, num_threads=4)
+
+        Replay the same export for another consumer:
+
+        >>> for vuln in spool.replay('vulns', export.uuid):
+        ...     print(vuln)
+    '''
+
+    def __init__(self, path: str, compresslevel: int = 6):
+        self.path = path
+        self.compresslevel = compresslevel
+
+    def _export_path(self, export_type: str, export_uuid: str) -> str:
+        return os.path.join(self.path, export_type, str(export_uuid))
+
+    def _chunk_path(self,
+                    export_type: str,
+                    export_uuid: str,
+                    chunk_id: int
+                    ) -> str:
+        return os.path.join(self._export_path(export_type, export_uuid),
+                            f'{int(chunk_id)}.json.gz'
+                            )
+
+    def write(self,
+              export_type: str,
+              export_uuid: str,
+              chunk_id: int,
+              data: List[Dict]
+              ):
+        '''
+        Writes the chunk to the spool.  The chunk is written to a temporary
+        file and then moved into place so that partially written chunks are
+        never visible to readers.
+
+        Args:
+            export_type (str): The datatype of the export job.
+            export_uuid (str): The export job UUID.
+            chunk_id (int): The chunk id.
+            data (list[dict]): The chunk data.
+        '''
+        path = self._chunk_path(export_type, export_uuid, chunk_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with gzip.open(tmp, 'wt',
+                       encoding='utf-8',
+                       compresslevel=self.compresslevel
+                       ) as fobj:
+            json.dump(data, fobj)
+        os.replace(tmp, path)
+
+    def write_raw(self,
+                  export_type: str,
+                  export_uuid: str,
+                  chunk_id: int,
+                  raw: bytes
+                  ):
+        '''
+        Writes the raw JSON body of the chunk to the spool without decoding
+        it.
+
+        Args:
+            export_type (str): The datatype of the export job.
+            export_uuid (str): The export job UUID.
+            chunk_id (int): The chunk id.
+            raw (bytes): The raw chunk body.
+        '''
+        path = self._chunk_path(export_type, export_uuid, chunk_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with gzip.open(tmp, 'wb', compresslevel=self.compresslevel) as fobj:
+            fobj.write(raw)
+        os.replace(tmp, path)
+
+    def write_iter(self,
+                   export_type: str,
+                   export_uuid: str,
+                   chunk_id: int,
+                   records: Iterable[Dict]
+                   ) -> Iterator[Dict]:
+        '''
+        Writes the records to the spool as they are consumed, passing each
+        record through to the caller.  The chunk is only moved into place once
+        every record has been consumed.
+
+        Args:
+            export_type (str): The datatype of the export job.
+            export_uuid (str): The export job UUID.
+            chunk_id (int): The chunk id.
+            records (Iterable[dict]): The chunk records.
+
+        Yields:
+            dict:
+                Each record as it has been written to the spool.
+        '''
+        path = self._chunk_path(export_type, export_uuid, chunk_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        completed = False
+        try:
+            with gzip.open(tmp, 'wt',
+                           encoding='utf-8',
+                           compresslevel=self.compresslevel
+                           ) as fobj:
+                fobj.write('[')
+                for idx, record in enumerate(records):
+                    if idx:
+                        fobj.write(',')
+                    json.dump(record, fobj)
+                    yield record
+                fobj.write(']')
+            os.replace(tmp, path)
+            completed = True
+        finally:
+            if not completed and os.path.exists(tmp):
+                os.remove(tmp)
+
+    def read(self,
+             export_type: str,
+             export_uuid: str,
+             chunk_id: int
+             ) -> List[Dict]:
+        '''
+        Reads the chunk from the spool.
+
+        Args:
+            export_type (str): The datatype of the export job.
+            export_uuid (str): The export job UUID.
+            chunk_id (int): The chunk id.
+
+        Returns:
+            list[dict]:
+                The chunk data.
+        '''
+        return json.loads(self.read_raw(export_type, export_uuid, chunk_id))
+
+    def read_raw(self,
+                 export_type: str,
+                 export_uuid: str,
+                 chunk_id: int
+                 ) -> bytes:
+        '''
+        Reads the raw JSON body of the chunk from the spool.
+
+        Args:
+            export_type (str): The datatype of the export job.
+            export_uuid (str): The export job UUID.
+            chunk_id (int): The chunk id.
+
+        Returns:
+            bytes:
+                The decompressed JSON body of the chunk.
+        '''
+        path = self._chunk_path(export_type, export_uuid, chunk_id)
+        with gzip.open(path, 'rb') as fobj:
+            return fobj.read()
+
+    def chunks(self, export_type: str, export_uuid: str) -> List[int]:
+        '''
+        Returns the sorted list of chunk ids stored for the export.
+
+        Args:
+            export_type (str): The datatype of the export job.
+            export_uuid (str): The export job UUID.
+
+        Returns:
+            list[int]:
+                The spooled chunk ids.
+        '''
+        path = self._export_path(export_type, export_uuid)
+        if not os.path.isdir(path):
+            return []
+        return sorted(int(f.split('.')[0]) for f in os.listdir(path)
+                      if f.endswith('.json.gz')
+                      )
+
+    def exports(self, export_type: str) -> List[str]:
+        '''
+        Returns the export UUIDs stored within the spool for the datatype.
+
+        Args:
+            export_type (str): The datatype of the export job.
+
+        Returns:
+            list[str]:
+                The spooled export UUIDs.
+        '''
+        path = os.path.join(self.path, export_type)
+        if not os.path.isdir(path):
+            return []
+        return sorted(os.listdir(path))
+
+    def mark_complete(self, export_type: str, export_uuid: str):
+        '''
+        Marks the spooled export as complete.
+
+        Args:
+            export_type (str): The datatype of the export job.
+            export_uuid (str): The export job UUID.
+        '''
+        path = self._export_path(export_type, export_uuid)
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, 'complete'), 'w') as fobj:
+            json.dump(self.chunks(export_type, export_uuid), fobj)
+
+    def completed_chunks(self,
+                         export_type: str,
+                         export_uuid: str
+                         ) -> List[int]:
+        '''
+        Returns the chunk ids recorded by the completion marker.
+
+        Args:
+            export_type (str): The datatype of the export job.
+            export_uuid (str): The export job UUID.
+
+        Returns:
+            list[int]:
+                The chunk ids of the completely spooled export.
+        '''
+        path = os.path.join(self._export_path(export_type, export_uuid),
+                            'complete'
+                            )
+        with open(path, 'r') as fobj:
+            return json.load(fobj)
+
+    def is_complete(self, export_type: str, export_uuid: str) -> bool:
+        '''
+        Returns if the export has been completely spooled.
+
+        Args:
+            export_type (str): The datatype of the export job.
+            export_uuid (str): The export job UUID.
+
+        Returns:
+            bool:
+                ``True`` if every chunk of the export has been spooled.
+        '''
+        return os.path.exists(
+            os.path.join(self._export_path(export_type, export_uuid),
+                         'complete'
+                         ))
+
+    def replay(self,
+               export_type: str,
+               export_uuid: str,
+               **kwargs
+               ) -> 'SpoolIterator':
+        '''
+        Returns an iterator replaying the spooled export.
+
+        Args:
+            export_type (str): The datatype of the export job.
+            export_uuid (str): The export job UUID.
+            **kwargs (dict): Any additional attributes to set on the iterator.
+
+        Returns:
+            SpoolIterator:
+                The replay iterator.
+
+        Example:
+
+            >>> replay = spool.replay('vulns', '{UUID}')
+            >>> replay.run_threaded(load_into_db, num_threads=8)
+        '''
+        return SpoolIterator(self,
+                             type=export_type,
+                             uuid=str(export_uuid),
+                             **kwargs
+                             )
+
+
+class SpoolIterator(ExportsIterator):
+    '''
+    Replays a spooled export from local disk.  The replay iterator supports
+    both serial iteration and :py:meth:`ExportsIterator.run_threaded`, exactly
+    as the exports iterator does.
+
+    A spool that was never marked as complete (for example, because the
+    run spooling it crashed part way through) is refused, as replaying it would
+    silently present a partial export as a complete one.
+
+    Attributes:
+        source (ExportSpool):
+            The spool that the export is being replayed from.
+        partial (bool):
+            Should an incomplete spool be replayed anyway?  Only the chunks
+            that made it into the spool are replayed.  The default is
+            ``False``.
+    '''
+    source: ExportSpool
+    partial: bool = False
+
+    def __init__(self, source: ExportSpool, **kwargs):
+        self.source = source
+        super().__init__(None, **kwargs)
+
+    def _get_status(self) -> Dict:
+        '''
+        Builds the export status from the chunks recorded as complete within
+        the spool.
+        '''
+        if self.source.is_complete(self.type, self.uuid):
+            chunks = self.source.completed_chunks(self.type, self.uuid)
+        elif self.partial:
+            chunks = self.source.chunks(self.type, self.uuid)
+        else:
+            raise TioExportsError(export=self.type,
+                                  uuid=self.uuid,
+                                  msg=(f'The spooled {self.type} export '
+                                       f'{self.uuid} is incomplete.  Use '
+                                       'partial=True to replay it anyway.')
+                                  )
+        return self._parse_status(Box({
+            'status': 'FINISHED',
+            'chunks_available': chunks
+        }))
+
+    def _download_chunk(self, chunk_id: int) -> List[Dict]:
+        '''
+        Reads the chunk from the spool.
+        '''
+        raw = self.source.read_raw(self.type, self.uuid, chunk_id)
+        self._record_size(chunk_id, len(raw))
+        return self._transform(json.loads(raw))
+
+    def cancel(self):
+        '''
+        Replays cannot be cancelled.
+        '''
@@ -0,0 +1,603 @@
+'''
+The SQLite export sink bulk-loads vulnerability and asset export data into an
+indexed SQLite database, allowing questions such as "all of the critical
+findings on assets tagged X" to be answered locally without running further
+exports or workbench queries.
+
+The sink is a callable that can be handed directly to
+:py:meth:`ExportsIterator.run_threaded`.  The processing threads push each
+chunk onto a bounded queue and a single writer thread drains the queue,
+performing batched inserts within transactions.  Each call to the sink blocks
+until the chunk has been committed, so a chunk is only reported as completed
+(and checkpointed) once its records have been stored, and any error raised
+while writing the chunk is raised by that same call.  Once the sink is closed,
+the query indexes are built and the database can be queried using the
+:obj:`ExportDatabase` helpers.
+
+The following tables are maintained:
+
+* ``vulns``: One row per finding, keyed by asset, plugin, port, and protocol.
+* ``assets``: One row per asset, keyed by the asset UUID.
+* ``asset_tags``: The tag category and value pairs for each asset.
+* ``plugins``: One row per plugin seen within the vulnerability data.
+* ``ports``: The distinct ports and protocols seen on each asset.
+
+Records are upserted using the keys above, so loading an incremental export
+on top of an existing database updates it in place.  Deleted and terminated
+assets are removed along with all of their findings.  Records missing the
+fields that they are keyed by (such as a finding without a plugin id) can't be
+stored and are skipped, with the number skipped reported by the sink.
+
+.. autoclass:: ExportDatabase
+    :members:
+
+.. autoclass:: SQLiteSink
+    :members:
+'''
+import json
+import logging
+import queue
+import sqlite3
+from concurrent.futures import Future
+from threading import Thread
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from .records import json_default
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS vulns (
+        asset_uuid TEXT NOT NULL,
+        plugin_id INTEGER NOT NULL,
+        port INTEGER NOT NULL DEFAULT 0,
+        protocol TEXT NOT NULL DEFAULT '',
+        severity TEXT,
+        state TEXT,
+        first_found TEXT,
+        last_found TEXT,
+        last_fixed TEXT,
+        record TEXT NOT NULL,
+        PRIMARY KEY (asset_uuid, plugin_id, port, protocol)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS assets (
+        uuid TEXT PRIMARY KEY,
+        hostname TEXT,
+        fqdn TEXT,
+        ipv4 TEXT,
+        operating_system TEXT,
+        network_id TEXT,
+        updated_at TEXT,
+        record TEXT NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS asset_tags (
+        asset_uuid TEXT NOT NULL,
+        category TEXT NOT NULL,
+        value TEXT NOT NULL,
+        PRIMARY KEY (asset_uuid, category, value)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS plugins (
+        id INTEGER PRIMARY KEY,
+        name TEXT,
+        family TEXT,
+        cvss3_base_score REAL,
+        vpr_score REAL,
+        record TEXT NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS ports (
+        asset_uuid TEXT NOT NULL,
+        port INTEGER NOT NULL,
+        protocol TEXT NOT NULL,
+        service TEXT,
+        PRIMARY KEY (asset_uuid, port, protocol)
+    )''',
+]
+
+INDEXES = [
+    'CREATE INDEX IF NOT EXISTS vulns_plugin_idx ON vulns (plugin_id)',
+    'CREATE INDEX IF NOT EXISTS vulns_severity_idx ON vulns (severity)',
+    'CREATE INDEX IF NOT EXISTS vulns_state_idx ON vulns (state)',
+    ('CREATE INDEX IF NOT EXISTS asset_tags_tag_idx '
+     'ON asset_tags (category, value)'),
+    'CREATE INDEX IF NOT EXISTS ports_port_idx ON ports (port, protocol)',
+]
+
+VULN_SQL = ('INSERT OR REPLACE INTO vulns VALUES '
+            '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+            )
+PARTIAL_ASSET_SQL = ('INSERT OR IGNORE INTO assets VALUES '
+                     '(?, ?, ?, ?, ?, ?, ?, ?)'
+                     )
+ASSET_SQL = 'INSERT OR REPLACE INTO assets VALUES (?, ?, ?, ?, ?, ?, ?, ?)'
+TAG_SQL = 'INSERT OR IGNORE INTO asset_tags VALUES (?, ?, ?)'
+PLUGIN_SQL = 'INSERT OR REPLACE INTO plugins VALUES (?, ?, ?, ?, ?, ?)'
+PORT_SQL = 'INSERT OR REPLACE INTO ports VALUES (?, ?, ?, ?)'
+
+
+def _dumps(value: Any) -> str:
+    '''
+    Serializes the record (or sub-record) as JSON, converting any compact
+    records back into dictionaries.
+    '''
+    return json.dumps(value, default=json_default)
+
+
+def _first(value: Any) -> Any:
+    '''
+    Returns the first item if the value is a list.
+    '''
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+
+def vuln_rows(record: Dict) -> Optional[Dict[str, List[Tuple]]]:
+    '''
+    Converts a vulnerability export record into the rows for each table.
+    Returns ``None`` if the record is missing the asset UUID or plugin id.
+    '''
+    asset = record.get('asset') or {}
+    plugin = record.get('plugin') or {}
+    port = record.get('port') or {}
+    asset_uuid = asset.get('uuid')
+    if asset_uuid is None or plugin.get('id') is None:
+        return None
+    port_num = port.get('port') or 0
+    protocol = port.get('protocol') or ''
+    rows = {
+        'vulns': [(asset_uuid,
+                   plugin.get('id'),
+                   port_num,
+                   protocol,
+                   record.get('severity'),
+                   record.get('state'),
+                   record.get('first_found'),
+                   record.get('last_found'),
+                   record.get('last_fixed'),
+                   _dumps(record)
+                   )],
+        'partial_assets': [(asset_uuid,
+                            asset.get('hostname'),
+                            asset.get('fqdn'),
+                            asset.get('ipv4'),
+                            _first(asset.get('operating_system')),
+                            asset.get('network_id'),
+                            None,
+                            _dumps(asset)
+                            )],
+        'plugins': [(plugin.get('id'),
+                     plugin.get('name'),
+                     plugin.get('family'),
+                     plugin.get('cvss3_base_score'),
+                     (plugin.get('vpr') or {}).get('score'),
+                     _dumps(plugin)
+                     )],
+        'ports': [],
+    }
+    if port_num:
+        rows['ports'].append((asset_uuid,
+                              port_num,
+                              protocol,
+                              port.get('service')
+                              ))
+    return rows
+
+
+def asset_rows(record: Dict) -> Optional[Dict[str, List[Tuple]]]:
+    '''
+    Converts an asset export record into the rows for each table.  Deleted and
+    terminated assets are removed from the database along with their findings.
+    Returns ``None`` if the record is missing the asset UUID.
+    '''
+    asset_uuid = record.get('id')
+    if asset_uuid is None:
+        return None
+    if record.get('deleted_at') or record.get('terminated_at'):
+        return {'deleted_assets': [(asset_uuid,)]}
+    return {
+        'assets': [(asset_uuid,
+                    _first(record.get('hostnames')),
+                    _first(record.get('fqdns')),
+                    _first(record.get('ipv4s')),
+                    _first(record.get('operating_systems')),
+                    record.get('network_id'),
+                    record.get('updated_at'),
+                    _dumps(record)
+                    )],
+        'tag_resets': [(asset_uuid,)],
+        'asset_tags': [(asset_uuid, t.get('key'), t.get('value'))
+                       for t in record.get('tags') or []
+                       if t.get('key') is not None
+                       and t.get('value') is not None
+                       ],
+    }
+
+
+CONVERTERS = {'vulns': vuln_rows, 'assets': asset_rows}
+
+# The statements executed for each kind of row, in the order that they are
+# applied within each batch.  Tag resets must run before the tags are inserted
+# and deletions are applied last so that they win over any upserts for the same
+# asset within the batch.
+STATEMENTS = {
+    'vulns': [VULN_SQL],
+    'partial_assets': [PARTIAL_ASSET_SQL],
+    'assets': [ASSET_SQL],
+    'tag_resets': ['DELETE FROM asset_tags WHERE asset_uuid = ?'],
+    'asset_tags': [TAG_SQL],
+    'plugins': [PLUGIN_SQL],
+    'ports': [PORT_SQL],
+    'deleted_assets': [
+        'DELETE FROM vulns WHERE asset_uuid = ?',
+        'DELETE FROM ports WHERE asset_uuid = ?',
+        'DELETE FROM asset_tags WHERE asset_uuid = ?',
+        'DELETE FROM assets WHERE uuid = ?',
+    ],
+}
+
+
+class ExportDatabase:
+    '''
+    Query helpers for a database built by the :obj:`SQLiteSink`.  Every query
+    method returns an iterator of dictionaries so that large result sets can be
+    walked without loading them all into memory.
+
+    Args:
+        path (str): The path to the SQLite database.
+
+    Examples:
+
+        >>> db = ExportDatabase('exports.db')
+        >>> for vuln in db.vulns(severity='critical', tag=('Region', 'HQ')):
+        ...     print(vuln['asset']['hostname'], vuln['plugin']['name'])
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _connect(self) -> sqlite3.Connection:
+        '''
+        Opens a new connection to the database.
+        '''
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create_schema(self, conn: Optional[sqlite3.Connection] = None):
+        '''
+        Creates the tables if they don't already exist.
+        '''
+        close = conn is None
+        conn = conn or self._connect()
+        with conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+        if close:
+            conn.close()
+
+    def create_indexes(self):
+        '''
+        Creates the query indexes if they don't already exist.
+        '''
+        conn = self._connect()
+        with conn:
+            for statement in INDEXES:
+                conn.execute(statement)
+        conn.close()
+
+    def query(self, sql: str, params: Iterable = ()) -> Iterator[Dict]:
+        '''
+        Runs the SQL query and returns an iterator of the rows as
+        dictionaries.
+
+        Args:
+            sql (str): The SQL query.
+            params (Iterable, optional): The query parameters.
+
+        Example:
+
+            >>> for row in db.query('SELECT severity, count(*) AS total '
+            ...                     'FROM vulns GROUP BY severity'):
+            ...     print(row)
+        '''
+        conn = self._connect()
+        try:
+            for row in conn.execute(sql, tuple(params)):
+                yield dict(row)
+        finally:
+            conn.close()
+
+    def _records(self, sql: str, params: Iterable) -> Iterator[Dict]:
+        '''
+        Returns the decoded JSON record column of the query results.
+        '''
+        for row in self.query(sql, params):
+            yield json.loads(row['record'])
+
+    def vulns(self,
+              severity: Optional[str] = None,
+              state: Optional[str] = None,
+              plugin_id: Optional[int] = None,
+              asset_uuid: Optional[str] = None,
+              tag: Optional[Tuple[str, str]] = None
+              ) -> Iterator[Dict]:
+        '''
+        Returns the vulnerability records matching all of the filters.
+
+        Args:
+            severity (str, optional): The finding severity.
+            state (str, optional): The finding state.
+            plugin_id (int, optional): The plugin id.
+            asset_uuid (str, optional): The asset UUID.
+            tag (tuple[str, str], optional):
+                The tag category and value the asset must be tagged with.
+
+        Returns:
+            Iterator[dict]:
+                The original vulnerability records.
+        '''
+        clauses = []
+        params = []
+        for column, value in (('v.severity', severity),
+                              ('v.state', state),
+                              ('v.plugin_id', plugin_id),
+                              ('v.asset_uuid', asset_uuid),
+                              ):
+            if value is not None:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        sql = 'SELECT v.record FROM vulns v'
+        if tag:
+            sql += (' JOIN asset_tags t ON t.asset_uuid = v.asset_uuid'
+                    ' AND t.category = ? AND t.value = ?'
+                    )
+            params = list(tag) + params
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        return self._records(sql, params)
+
+    def assets(self,
+               tag: Optional[Tuple[str, str]] = None
+               ) -> Iterator[Dict]:
+        '''
+        Returns the asset records.
+
+        Args:
+            tag (tuple[str, str], optional):
+                The tag category and value the asset must be tagged with.
+
+        Returns:
+            Iterator[dict]:
+                The asset records.  Assets only seen within vulnerability data
+                will return the asset sub-object of the finding.
+        '''
+        sql = 'SELECT a.record FROM assets a'
+        params = []
+        if tag:
+            sql += (' JOIN asset_tags t ON t.asset_uuid = a.uuid'
+                    ' AND t.category = ? AND t.value = ?'
+                    )
+            params = list(tag)
+        return self._records(sql, params)
+
+    def plugins(self, family: Optional[str] = None) -> Iterator[Dict]:
+        '''
+        Returns the plugin records seen within the vulnerability data.
+
+        Args:
+            family (str, optional): The plugin family.
+        '''
+        if family:
+            return self._records('SELECT record FROM plugins WHERE family = ?',
+                                 [family]
+                                 )
+        return self._records('SELECT record FROM plugins', [])
+
+    def ports(self,
+              asset_uuid: Optional[str] = None,
+              port: Optional[int] = None
+              ) -> Iterator[Dict]:
+        '''
+        Returns the ports seen on the assets.
+
+        Args:
+            asset_uuid (str, optional): The asset UUID.
+            port (int, optional): The port number.
+        '''
+        clauses = []
+        params = []
+        for column, value in (('asset_uuid', asset_uuid), ('port', port)):
+            if value is not None:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        sql = 'SELECT * FROM ports'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        return self.query(sql, params)
+
+
+class SQLiteSink(ExportDatabase):
+    '''
+    Bulk-loads export chunks into the SQLite database using a single writer
+    thread.
+
+    Args:
+        path (str):
+            The path to the SQLite database.
+        batch_size (int, optional):
+            The maximum number of records to insert within each transaction.
+            Every chunk is committed before the call writing it returns, so
+            larger chunks are split into several transactions.  The default
+            is ``5000``.
+        queue_size (int, optional):
+            The maximum number of chunks waiting to be written.  Callers will
+            block once the queue is full.  The default is ``16``.
+
+    Attributes:
+        records (int):
+            The number of records written.
+        skipped (int):
+            The number of records skipped as they were missing the fields
+            that they are keyed by.
+
+    Examples:
+
+        >>> with SQLiteSink('exports.db') as sink:
+        ...     tio.exports.assets().run_threaded(sink, num_threads=4)
+        ...     tio.exports.vulns().run_threaded(sink, num_threads=8)
+        >>> criticals = list(sink.vulns(severity='critical'))
+    '''
+
+    def __init__(self,
+                 path: str,
+                 batch_size: int = 5000,
+                 queue_size: int = 16
+                 ):
+        super().__init__(path)
+        self.batch_size = batch_size
+        self.records = 0
+        self.skipped = 0
+        self.error = None
+        self._log = logging.getLogger(
+            f'{self.__module__}.{self.__class__.__name__}'
+        )
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._writer = Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def __call__(self,
+                 data: Iterable[Dict],
+                 export_type: str = 'vulns',
+                 **kwargs
+                 ):
+        '''
+        Writes the chunk, blocking until it has been committed.  Matches the
+        function signature that :py:meth:`ExportsIterator.run_threaded`
+        expects.
+        '''
+        self.write(export_type, data)
+
+    def write(self, export_type: str, data: Iterable[Dict]):
+        '''
+        Hands the records to the writer thread and blocks until they have been
+        committed to the database.
+
+        Args:
+            export_type (str): Either ``vulns`` or ``assets``.
+            data (Iterable[dict]): The export records.
+
+        Raises:
+            Exception:
+                The error raised while writing the records, or the error that
+                previously stopped the writer.
+        '''
+        if export_type not in CONVERTERS:
+            raise ValueError(f'{export_type} exports are not supported')
+        if self.error:
+            raise self.error
+
+        # Streamed chunks must be fully consumed before the chunk is reported
+        # as completed, so we won't hand the generator off to the writer.
+        if not isinstance(data, list):
+            data = list(data)
+        written = Future()
+        self._queue.put((export_type, data, written))
+        written.result()
+
+    def _flush(self,
+               conn: sqlite3.Connection,
+               pending: Dict[str, List[Tuple]]
+               ):
+        '''
+        Writes the pending rows within a single transaction.
+        '''
+        with conn:
+            for table, rows in pending.items():
+                if rows:
+                    for statement in STATEMENTS[table]:
+                        conn.executemany(statement, rows)
+                    rows.clear()
+
+    def _write_chunk(self,
+                     conn: sqlite3.Connection,
+                     export_type: str,
+                     data: List[Dict]
+                     ):
+        '''
+        Converts the chunk's records into rows and commits them, flushing
+        them every time a full batch has accumulated.
+        '''
+        convert = CONVERTERS[export_type]
+        pending = {k: [] for k in STATEMENTS}
+        count = 0
+        skipped = 0
+        for record in data:
+            rows = convert(record)
+            if rows is None:
+                skipped += 1
+                continue
+            for table, table_rows in rows.items():
+                pending[table].extend(table_rows)
+            count += 1
+            self.records += 1
+            if count >= self.batch_size:
+                self._flush(conn, pending)
+                count = 0
+        self._flush(conn, pending)
+        if skipped:
+            self.skipped += skipped
+            self._log.warning('skipped %d %s records missing their key '
+                              'fields', skipped, export_type
+                              )
+
+    def _write_loop(self):
+        '''
+        The writer thread.  Drains the queue, committing each chunk and then
+        informing the caller waiting on it.  Once an error has been raised,
+        the remaining chunks are rejected with the same error without being
+        written.
+        '''
+        conn = sqlite3.connect(self.path)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        self.create_schema(conn)
+        item = True
+        while item is not None:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                continue
+            export_type, data, written = item
+            try:
+                if not self.error:
+                    self._write_chunk(conn, export_type, data)
+            except Exception as err:  # noqa: PLW0703
+                self.error = err
+            finally:
+                if self.error:
+                    written.set_exception(self.error)
+                else:
+                    written.set_result(None)
+                self._queue.task_done()
+        conn.close()
+
+    def flush(self):
+        '''
+        Blocks until every queued chunk has been handled by the writer.
+        '''
+        self._queue.join()
+
+    def close(self):
+        '''
+        Stops the writer thread and creates the query indexes.  The error that
+        stopped the writer (if any) is raised again.
+        '''
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+            self.create_indexes()
+        if self.error:
+            raise self.error
@@ -0,0 +1,258 @@
+'''
+The export sync engine keeps a local :obj:`SQLiteSink` database up to date
+using incremental exports.  A high-water mark is stored within the database for
+each tenant and export type, and every sync after the first only requests the
+records that have changed since the last successful sync:
+
+* Vulnerabilities are requested using the ``since`` filter across the open,
+  reopened, and fixed states, and upserted by asset, plugin, port, and
+  protocol.
+* Assets are requested using the ``updated_at`` filter and upserted by the
+  asset UUID.  The ``deleted_at`` and ``terminated_at`` filters are then used
+  to remove the deleted and terminated assets (and their findings).
+
+The watermark is only moved forward once every export within the sync has
+completed without any errors or failed chunks, so a failed sync will simply be
+re-requested the next time.  As the sync manages the change filters itself,
+passing them to the sync methods is rejected.
+
+.. autoclass:: ExportSync
+    :members:
+'''
+import sqlite3
+import time
+from typing import Dict, List, Optional
+from tenable.errors import TioExportsError, UnexpectedValueError
+from .sqlite import SQLiteSink
+
+STATE_SCHEMA = '''CREATE TABLE IF NOT EXISTS sync_state (
+    tenant TEXT NOT NULL,
+    export_type TEXT NOT NULL,
+    watermark INTEGER NOT NULL,
+    updated INTEGER NOT NULL,
+    PRIMARY KEY (tenant, export_type)
+)'''
+
+
+class ExportSync:
+    '''
+    Incremental vulnerability and asset export sync.
+
+    Args:
+        tio (TenableIO):
+            The TenableIO object to export the data from.
+        path (str):
+            The path to the SQLite database.
+        tenant (str, optional):
+            The name to track the watermarks under.  If left unspecified, the
+            URL of the TenableIO object will be used.  When syncing several
+            containers into the same database, a unique name should be provided
+            for each of them.
+        num_threads (int, optional):
+            The number of download threads to use for each export.  The
+            default is ``4``.
+        overlap (int, optional):
+            The number of seconds to subtract from the watermark when
+            requesting changes to account for clock skew and late indexing.
+            As records are upserted, the overlap only costs the re-download of
+            the overlapping records.  The default is ``0``.
+
+    Examples:
+
+        >>> sync = ExportSync(tio, 'tenable.db', tenant='acme')
+        >>> sync.sync()
+        {'assets': {'since': None, 'watermark': 1700000000, 'records': 8214},
+         'vulns': {'since': None, 'watermark': 1700000100, 'records': 913412}}
+
+        The next run only requests what has changed:
+
+        >>> sync.sync()
+        {'assets': {'since': 1700000000, 'watermark': 1700086400,
+                    'records': 121},
+         'vulns': {'since': 1700000100, 'watermark': 1700086500,
+                   'records': 4211}}
+    '''
+
+    def __init__(self,
+                 tio,
+                 path: str,
+                 tenant: Optional[str] = None,
+                 num_threads: int = 4,
+                 overlap: int = 0
+                 ):
+        self.tio = tio
+        self.path = path
+        self.tenant = tenant or tio._url
+        self.num_threads = num_threads
+        self.overlap = overlap
+        self._execute(STATE_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path)
+
+    def _execute(self, sql: str, params: tuple = ()):
+        '''
+        Executes the statement within its own transaction.
+        '''
+        conn = self._connect()
+        with conn:
+            conn.execute(sql, params)
+        conn.close()
+
+    def watermark(self, export_type: str) -> Optional[int]:
+        '''
+        Returns the high-water mark of the last successful sync.
+
+        Args:
+            export_type (str): Either ``vulns`` or ``assets``.
+
+        Returns:
+            int:
+                The timestamp that the last successful sync started at, or
+                ``None`` if the export type has never been synced.
+        '''
+        conn = self._connect()
+        row = conn.execute('SELECT watermark FROM sync_state '
+                           'WHERE tenant = ? AND export_type = ?',
+                           (self.tenant, export_type)
+                           ).fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    def _set_watermark(self, export_type: str, watermark: int):
+        self._execute('INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?)',
+                      (self.tenant, export_type, watermark, int(time.time()))
+                      )
+
+    def reset(self, export_type: Optional[str] = None):
+        '''
+        Removes the stored watermarks, forcing the next sync to perform a full
+        export.
+
+        Args:
+            export_type (str, optional):
+                The export type to reset.  If left unspecified, both the
+                vulnerability and asset watermarks are removed.
+        '''
+        if export_type:
+            self._execute('DELETE FROM sync_state '
+                          'WHERE tenant = ? AND export_type = ?',
+                          (self.tenant, export_type)
+                          )
+        else:
+            self._execute('DELETE FROM sync_state WHERE tenant = ?',
+                          (self.tenant,)
+                          )
+
+    def _since(self, export_type: str) -> Optional[int]:
+        '''
+        Returns the timestamp to request changes from.
+        '''
+        watermark = self.watermark(export_type)
+        if watermark is None:
+            return None
+        return max(watermark - self.overlap, 0)
+
+    @staticmethod
+    def _check_filters(kwargs: Dict, managed: List[str]):
+        '''
+        Rejects any of the change filters managed by the sync.
+        '''
+        passed = [key for key in managed if key in kwargs]
+        if passed:
+            raise UnexpectedValueError(
+                f'{", ".join(passed)} is managed by the sync.  Use reset() '
+                'to perform a full sync instead.'
+            )
+
+    def _run(self,
+             export_type: str,
+             exports: List[Dict],
+             since: Optional[int]
+             ) -> Dict:
+        '''
+        Runs each of the exports into the database and moves the watermark
+        forward once all of them have completed.  If any chunk could not be
+        downloaded, the watermark is left as-is and an error is raised.  Any
+        error raised while writing the records is relayed as-is.
+        '''
+        watermark = int(time.time())
+        method = getattr(self.tio.exports, export_type)
+        failed = []
+        with SQLiteSink(self.path) as sink:
+            for kwargs in exports:
+                export = method(**kwargs)
+                export.run_threaded(sink, num_threads=self.num_threads)
+                failed.extend(export.failed_chunks)
+        if failed:
+            raise TioExportsError(
+                export=export_type,
+                uuid=export.uuid,
+                msg=(f'{export_type} sync failed to download {len(failed)} '
+                     'chunks.  The watermark has not been moved.')
+            )
+        self._set_watermark(export_type, watermark)
+        return {'since': since, 'watermark': watermark,
+                'records': sink.records
+                }
+
+    def sync_vulns(self, **kwargs) -> Dict:
+        '''
+        Syncs the vulnerabilities that have changed since the last sync.
+
+        Args:
+            **kwargs (dict):
+                Any additional filters to pass to
+                :py:meth:`tio.exports.vulns() <ExportsAPI.vulns>`.  The
+                ``since`` filter is managed by the sync and can't be passed.
+
+        Returns:
+            dict:
+                The starting timestamp, the new watermark, and the number of
+                records synced.
+        '''
+        self._check_filters(kwargs, ['since'])
+        since = self._since('vulns')
+        if since is not None:
+            kwargs['since'] = since
+            kwargs.setdefault('state', ['open', 'reopened', 'fixed'])
+        return self._run('vulns', [kwargs], since)
+
+    def sync_assets(self, **kwargs) -> Dict:
+        '''
+        Syncs the assets that have been updated, deleted, or terminated since
+        the last sync.
+
+        Args:
+            **kwargs (dict):
+                Any additional filters to pass to
+                :py:meth:`tio.exports.assets() <ExportsAPI.assets>`.  The
+                ``updated_at``, ``deleted_at``, and ``terminated_at`` filters
+                are managed by the sync and can't be passed.
+
+        Returns:
+            dict:
+                The starting timestamp, the new watermark, and the number of
+                records synced.
+        '''
+        managed = ['updated_at', 'deleted_at', 'terminated_at']
+        self._check_filters(kwargs, managed)
+        since = self._since('assets')
+        if since is None:
+            exports = [kwargs]
+        else:
+            exports = [dict(kwargs, **{key: since}) for key in managed]
+        return self._run('assets', exports, since)
+
+    def sync(self) -> Dict[str, Dict]:
+        '''
+        Syncs the assets and then the vulnerabilities.
+
+        Returns:
+            dict:
+                The sync results keyed by the export type.
+        '''
+        return {
+            'assets': self.sync_assets(),
+            'vulns': self.sync_vulns(),
+        }
@@ -0,0 +1,381 @@
+'''
+The multi-tenant export runner pulls the same export from many Tenable.io
+containers at once, such as an MSSP pulling the vulnerabilities of each of its
+customers.  The export jobs are requested from every container concurrently,
+and the status polling and chunk downloads of all of the containers are then
+scheduled through the :obj:`ExportOrchestrator`, under a global concurrency
+limit and an optional global request rate budget.  Each container's records
+are handed to its own sink.
+
+Failures are isolated to the container they occurred in: a container whose
+export can't be requested, whose export errors, or that exceeds the per-tenant
+timeout is reported as failed, while the remaining containers carry on.  The
+status polls are made from their own pool, with each container polled by at
+most one thread at a time, so a container with slow status calls doesn't hold
+up the polling of the others.  The chunks are handed out round-robin across the
+containers, which keeps a large container from starving the smaller ones,
+however a container with slow chunk downloads will still tie up every worker it
+has been handed until those downloads complete.
+
+.. autoclass:: TenantExportRunner
+    :members:
+'''
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Union
+from tenable.base.ratelimit import TokenBucket
+from tenable.errors import TioExportsTimeout, UnexpectedValueError
+from .iterator import ExportsIterator
+from .orchestrator import ExportOrchestrator, OrchestratedExport
+
+
+@dataclass
+class Tenant:
+    '''
+    The state tracked by the runner for each tenant.
+    '''
+    name: str
+    tio: Any
+    sink: Any
+    export_kwargs: Dict
+    iterator: Optional[ExportsIterator] = None
+    job: Optional[OrchestratedExport] = None
+    error: Optional[Exception] = None
+    status: str = 'pending'
+    start_time: Optional[float] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+class RateBudget(TokenBucket):
+    '''
+    A token bucket limiting the number of API requests per second across all
+    of the tenants.
+
+    Args:
+        rate (float): The number of requests per second.
+        burst (int, optional):
+            The number of requests that may be made at once after a period of
+            inactivity.  The default is the rate (rounded up).
+    '''
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        super().__init__(rate=rate, burst=burst)
+
+
+class TenantOrchestrator(ExportOrchestrator):
+    '''
+    The export orchestrator used by the runner.  Failed exports are reported
+    against the tenant, exports exceeding the per-tenant timeout are cancelled,
+    and every status poll and chunk download takes a token from the rate
+    budget.
+    '''
+
+    def __init__(self,
+                 tenants: Dict[str, Tenant],
+                 budget: Optional[RateBudget] = None,
+                 tenant_timeout: Optional[float] = None,
+                 **kwargs
+                 ):
+        super().__init__(**kwargs)
+        self.tenants = tenants
+        self.budget = budget
+        self.tenant_timeout = tenant_timeout
+        self._log = logging.getLogger(
+            f'{self.__module__}.{self.__class__.__name__}'
+        )
+
+    def _fail(self,
+              job: OrchestratedExport,
+              err: Exception,
+              status: str = 'failed'
+              ):
+        '''
+        Marks the tenant as failed and stops scheduling its chunks.
+        '''
+        tenant = self.tenants[job.name]
+        tenant.error = err
+        tenant.status = status
+        super()._fail(job, err)
+
+    def _poll(self, job: OrchestratedExport):
+        if self.budget:
+            self.budget.acquire()
+        super()._poll(job)
+
+    def _work(self, job: OrchestratedExport, chunk_id: int):
+        if self.budget:
+            self.budget.acquire()
+        super()._work(job, chunk_id)
+
+    def _update(self):
+        if self.tenant_timeout:
+            now = time.time()
+            for job in self.exports:
+                expired = (job.started_at
+                           and now - job.started_at > self.tenant_timeout
+                           )
+                if not job.finished and expired:
+                    iterator = job.iterator
+                    self._fail(job,
+                               TioExportsTimeout(iterator.type, iterator.uuid),
+                               'timeout'
+                               )
+                    with self._condition:
+                        job.polling = True
+                    self._pollers.submit(self._cancel_job, job)
+        super()._update()
+
+    def _cancel_job(self, job: OrchestratedExport):
+        '''
+        Cancels the timed out export within the polling pool, so that a slow
+        cancellation request doesn't stall the scheduling of the other
+        tenants.
+        '''
+        try:
+            job.iterator.cancel()
+        except Exception as err:  # noqa: PLW0703
+            self._log.warning('tenant %s export could not be cancelled: %s',
+                              job.name, err
+                              )
+        finally:
+            with self._condition:
+                job.polling = False
+                self._condition.notify_all()
+
+
+class TenantExportRunner:
+    '''
+    Runs the same export across many Tenable.io containers concurrently.
+
+    Args:
+        export_type (str, optional):
+            The export to run for each tenant.  Either ``vulns``, ``assets``,
+            or ``compliance``.  The default is ``vulns``.
+        num_threads (int, optional):
+            The global number of concurrent chunk downloads across all of the
+            tenants.  The default is ``8``.
+        max_queued (int, optional):
+            The global maximum number of chunks that may be downloading or
+            waiting to be processed.  The default is twice the number of
+            threads.
+        poll_threads (int, optional):
+            The number of export status polls that may be made at the same
+            time across all of the tenants.  The default is ``8``.
+        start_threads (int, optional):
+            The number of export jobs to request concurrently.  The default is
+            ``8``.
+        max_rate (float, optional):
+            The global maximum number of export requests, status polls, and
+            chunk downloads per second across all of the tenants.  Retries
+            performed by the API sessions aren't counted.  If left
+            unspecified, the request rate is unbounded.
+        tenant_timeout (float, optional):
+            The number of seconds each tenant's export may run before it is
+            cancelled and reported as timed out.  If left unspecified, the
+            exports may run indefinitely.
+
+    Examples:
+
+        >>> runner = TenantExportRunner('vulns', num_threads=16, max_rate=20)
+        >>> for customer in customers:
+        ...     runner.add({'access_key': customer.access_key,
+        ...                 'secret_key': customer.secret_key},
+        ...                SQLiteSink(f'{customer.name}.db'),
+        ...                name=customer.name,
+        ...                since=customer.last_run,
+        ...                )
+        >>> report = runner.run()
+        >>> report['acme']
+        {'status': 'finished', 'export_uuid': '...', 'records': 41204,
+         'chunks': 18, 'empty': 0, 'failed_chunks': 0, 'errors': 0,
+         'start_time': 0.84, 'elapsed': 212.5, 'error': None}
+    '''
+
+    def __init__(self,
+                 export_type: str = 'vulns',
+                 num_threads: int = 8,
+                 max_queued: Optional[int] = None,
+                 start_threads: int = 8,
+                 poll_threads: int = 8,
+                 max_rate: Optional[float] = None,
+                 tenant_timeout: Optional[float] = None,
+                 ):
+        self.export_type = export_type
+        self.num_threads = num_threads
+        self.max_queued = max_queued
+        self.start_threads = start_threads
+        self.poll_threads = poll_threads
+        self.budget = RateBudget(max_rate) if max_rate else None
+        self.tenant_timeout = tenant_timeout
+        self.tenants: Dict[str, Tenant] = {}
+        self.orchestrator: Optional[TenantOrchestrator] = None
+        self._log = logging.getLogger(
+            f'{self.__module__}.{self.__class__.__name__}'
+        )
+
+    def add(self,
+            tenant: Union[Dict, Any],
+            sink: Any,
+            name: Optional[str] = None,
+            **export_kwargs
+            ) -> Tenant:
+        '''
+        Adds a tenant to the runner.
+
+        Args:
+            tenant (TenableIO | dict):
+                Either the TenableIO object for the container, or a dictionary
+                of the keyword arguments to construct one with (such as the
+                ``access_key`` and ``secret_key``).
+            sink:
+                The function (or callable sink) to pass each of the tenant's
+                chunks to.  It's called with the same signature as the
+                function passed to :py:meth:`ExportsIterator.run_threaded`.
+                If the sink exposes a ``close`` method, it's called once the
+                tenant's export has finished.
+            name (str, optional):
+                The name to report the tenant under.  If left unspecified, the
+                tenants are numbered in the order they were added.
+            **export_kwargs (dict):
+                The keyword arguments to pass to the export method, such as
+                the export filters.
+
+        Returns:
+            Tenant:
+                The tenant state tracked by the runner.
+
+        Raises:
+            UnexpectedValueError:
+                If a tenant with the same name has already been added.
+        '''
+        name = name or f'tenant-{len(self.tenants) + 1}'
+        if name in self.tenants:
+            raise UnexpectedValueError(f'tenant {name} has already been added')
+        self.tenants[name] = Tenant(name=name,
+                                    tio=tenant,
+                                    sink=sink,
+                                    export_kwargs=export_kwargs
+                                    )
+        return self.tenants[name]
+
+    def _start(self, tenant: Tenant):
+        '''
+        Requests the export job for the tenant.
+        '''
+        start = time.time()
+        tenant.started_at = start
+        try:
+            if isinstance(tenant.tio, dict):
+                from tenable.io import TenableIO  # noqa: PLC0415
+                tenant.tio = TenableIO(**tenant.tio)
+            if self.budget:
+                self.budget.acquire()
+            export = getattr(tenant.tio.exports, self.export_type)
+            tenant.iterator = export(**tenant.export_kwargs)
+            tenant.status = 'running'
+        except Exception as err:  # noqa: PLW0703
+            self._log.error('tenant %s export could not be requested: %s',
+                            tenant.name, err
+                            )
+            tenant.error = err
+            tenant.status = 'failed'
+            tenant.finished_at = time.time()
+        tenant.start_time = time.time() - start
+
+    def run(self) -> Dict[str, Dict]:
+        '''
+        Requests the exports for every tenant and runs them to completion.
+        Errors are isolated to each tenant and reported instead of being
+        raised.
+
+        Returns:
+            dict:
+                The per-tenant report.  See :py:meth:`report`.
+        '''
+        with ThreadPoolExecutor(max_workers=self.start_threads) as pool:
+            list(pool.map(self._start, self.tenants.values()))
+
+        self.orchestrator = TenantOrchestrator(
+            self.tenants,
+            budget=self.budget,
+            tenant_timeout=self.tenant_timeout,
+            num_threads=self.num_threads,
+            max_queued=self.max_queued,
+            poll_threads=self.poll_threads,
+        )
+        for tenant in self.tenants.values():
+            if tenant.iterator is not None:
+                tenant.job = self.orchestrator.add(tenant.iterator,
+                                                   tenant.sink,
+                                                   name=tenant.name
+                                                   )
+                tenant.job.started_at = tenant.started_at
+        try:
+            self.orchestrator.run()
+        except Exception as err:  # noqa: PLW0703
+            # The chunk errors have already been counted against each tenant.
+            self._log.error('tenant exports finished with errors: %s', err)
+
+        for tenant in self.tenants.values():
+            if tenant.job is None:
+                continue
+            if tenant.status == 'running':
+                tenant.status = 'finished'
+            tenant.finished_at = tenant.job.finished_at
+            closer = getattr(tenant.sink, 'close', None)
+            if callable(closer):
+                try:
+                    closer()
+                except Exception as err:  # noqa: PLW0703
+                    self._log.error('tenant %s sink failed to close: %s',
+                                    tenant.name, err
+                                    )
+                    tenant.job.errors += 1
+                    tenant.error = tenant.error or err
+        return self.report()
+
+    def report(self) -> Dict[str, Dict]:
+        '''
+        Returns the per-tenant report.
+
+        Returns:
+            dict:
+                A dictionary keyed by the tenant name with the tenant's status
+                (``pending``, ``running``, ``finished``, ``failed``, or
+                ``timeout``), export UUID, records processed, chunks
+                completed, empty and failed chunk counts, chunk errors, the
+                time taken to request the export, the elapsed time, and the
+                error that caused the tenant to fail (if any).
+        '''
+        resp = {}
+        for tenant in self.tenants.values():
+            job = tenant.job
+            counters = tenant.iterator.counters if tenant.iterator else {}
+            end = tenant.finished_at or time.time()
+            resp[tenant.name] = {
+                'status': tenant.status,
+                'export_uuid': (str(tenant.iterator.uuid)
+                                if tenant.iterator else None),
+                'records': job.records if job else 0,
+                'chunks': counters.get('done', 0),
+                'empty': counters.get('empty', 0),
+                'failed_chunks': counters.get('failed', 0),
+                'errors': job.errors if job else 0,
+                'start_time': tenant.start_time,
+                'elapsed': end - tenant.started_at if tenant.started_at else 0,
+                'error': (f'{type(tenant.error).__name__}: {tenant.error}'
+                          if tenant.error else None),
+            }
+        return resp
+
+    @property
+    def failed(self) -> List[str]:
+        '''
+        The names of the tenants that failed or timed out.
+        '''
+        return [t.name for t in self.tenants.values()
+                if t.status in ('failed', 'timeout')
+                ]
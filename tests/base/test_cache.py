@@ -0,0 +1,229 @@
+'''
+Response cache testing module.
+'''
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import responses
+from restfly.errors import NotFoundError
+from tenable.base.cache import (CacheEntry,
+                                DiskCacheBackend,
+                                MemoryCacheBackend,
+                                ResponseCache
+                                )
+from tenable.base.platform import APIPlatform
+
+
+def entry(body=b'{}'):
+    '''
+    Returns a cache entry that never expires.
+    '''
+    return CacheEntry(status=200,
+                      headers={'Content-Type': 'application/json'},
+                      body=body,
+                      etag=None,
+                      stored_at=0,
+                      expires_at=2 ** 40
+                      )
+
+
+def platform(cache, access_key='1'):
+    '''
+    Returns a platform object using the cache.
+    '''
+    return APIPlatform(url='https://localhost',
+                       access_key=access_key,
+                       secret_key='2',
+                       cache=cache
+                       )
+
+
+@responses.activate
+def test_cache_hits_and_misses():
+    '''
+    Test that cacheable responses are served from the cache.
+    '''
+    responses.add(responses.GET,
+                  'https://localhost/filters/workbenches/vulnerabilities',
+                  json={'filters': [1, 2]}
+                  )
+    responses.add(responses.GET, 'https://localhost/scans', json={'scans': []})
+    cache = ResponseCache()
+    api = platform(cache)
+    for _ in range(3):
+        resp = api.get('filters/workbenches/vulnerabilities')
+        assert resp.json() == {'filters': [1, 2]}
+    api.get('scans')
+    api.get('scans')
+    assert len(responses.calls) == 3
+    assert cache.stats == {'hits': 2,
+                           'misses': 1,
+                           'revalidated': 0,
+                           'stores': 1,
+                           'evictions': 0,
+                           'entries': 1,
+                           }
+
+
+@responses.activate
+def test_cache_drops_wire_headers():
+    '''
+    Test that the wire encoding headers are not stored regardless of case.
+    '''
+    responses.add(responses.GET,
+                  'https://localhost/filters/workbenches/vulnerabilities',
+                  body=b'{"filters": []}',
+                  headers={'content-encoding': 'identity',
+                           'CONTENT-LENGTH': '15',
+                           'X-Request-Uuid': 'abc'
+                           }
+                  )
+    cache = ResponseCache()
+    api = platform(cache)
+    api.get('filters/workbenches/vulnerabilities')
+    resp = api.get('filters/workbenches/vulnerabilities')
+    assert resp.json() == {'filters': []}
+    stored = list(cache.backend._entries.values())  # noqa: PLW0212
+    assert len(stored) == 1
+    headers = {k.lower() for k in stored[0].headers}
+    assert 'x-request-uuid' in headers
+    assert not headers & {'content-encoding', 'content-length'}
+
+
+@responses.activate
+def test_cache_keyed_by_credentials():
+    '''
+    Test that cached responses are never shared between API keys.
+    '''
+    responses.add(responses.GET, 'https://localhost/scanners', json=[])
+    cache = ResponseCache()
+    platform(cache, access_key='1').get('scanners')
+    platform(cache, access_key='1').get('scanners')
+    platform(cache, access_key='other').get('scanners')
+    assert len(responses.calls) == 2
+    assert cache.stats['entries'] == 2
+
+
+@responses.activate
+def test_cache_revalidation():
+    '''
+    Test that expired entries are revalidated using the ETag.
+    '''
+    def callback(request):
+        if request.headers.get('If-None-Match') == '"v1"':
+            return 304, {'ETag': '"v1"'}, ''
+        return 200, {'ETag': '"v1"'}, '{"families": []}'
+
+    responses.add_callback(responses.GET,
+                           'https://localhost/plugins/families',
+                           callback=callback,
+                           content_type='application/json'
+                           )
+    cache = ResponseCache(ttls={r'^/plugins/families$': 0})
+    api = platform(cache)
+    assert api.get('plugins/families').json() == {'families': []}
+    assert api.get('plugins/families').json() == {'families': []}
+    assert len(responses.calls) == 2
+    assert 'If-None-Match' not in responses.calls[0].request.headers
+    assert responses.calls[1].request.headers['If-None-Match'] == '"v1"'
+    assert cache.stats['revalidated'] == 1
+
+    # Without revalidation the expired entry is simply replaced.
+    cache = ResponseCache(ttls={r'^/plugins/families$': 0}, revalidate=False)
+    api = platform(cache)
+    api.get('plugins/families')
+    api.get('plugins/families')
+    assert 'If-None-Match' not in responses.calls[3].request.headers
+    assert cache.stats['stores'] == 2
+
+
+@responses.activate
+def test_cache_skips_uncacheable():
+    '''
+    Test that errors and no-store responses aren't cached.
+    '''
+    responses.add(responses.GET, 'https://localhost/scans/timezones',
+                  json=[], headers={'Cache-Control': 'no-store'}
+                  )
+    responses.add(responses.GET, 'https://localhost/scanners', status=404)
+    cache = ResponseCache()
+    api = platform(cache)
+    api.get('scans/timezones')
+    api.get('scans/timezones')
+    for _ in range(2):
+        with pytest.raises(NotFoundError):
+            api.get('scanners')
+    assert len(responses.calls) == 4
+    assert cache.stats['stores'] == 0
+
+
+def test_memory_backend_lru():
+    '''
+    Test that the memory backend evicts the least recently used entries.
+    '''
+    backend = MemoryCacheBackend(max_entries=2)
+    backend.set('a', entry())
+    backend.set('b', entry())
+    assert backend.get('a')
+    backend.set('c', entry())
+    assert backend.get('b') is None
+    assert backend.get('a') and backend.get('c')
+    assert len(backend) == 2
+    assert backend.evictions == 1
+    backend.delete('a')
+    assert backend.get('a') is None
+    backend.clear()
+    assert len(backend) == 0
+
+
+def test_disk_backend(tmp_path):
+    '''
+    Test that the disk backend persists entries and evicts the least
+    recently used entries.
+    '''
+    path = str(tmp_path / 'cache.db')
+    backend = DiskCacheBackend(path, max_entries=2)
+    backend.set('a', entry(b'[1]'))
+    backend.set('b', entry(b'[2]'))
+    assert backend.get('a').body == b'[1]'
+    backend.set('c', entry(b'[3]'))
+    assert backend.get('b') is None
+    assert backend.evictions == 1
+    backend.close()
+
+    backend = DiskCacheBackend(path, max_entries=2)
+    assert len(backend) == 2
+    assert backend.get('a') == entry(b'[1]')
+    backend.clear()
+    assert len(backend) == 0
+    backend.close()
+
+
+def test_disk_backend_home_path(tmp_path, monkeypatch):
+    '''
+    Test that the disk backend expands the home directory within the path.
+    '''
+    monkeypatch.setenv('HOME', str(tmp_path))
+    backend = DiskCacheBackend('~/.tenable-cache.db')
+    assert backend.path == str(tmp_path / '.tenable-cache.db')
+    backend.close()
+    assert (tmp_path / '.tenable-cache.db').exists()
+
+
+@responses.activate
+def test_cache_shared_between_threads(tmp_path):
+    '''
+    Test that a cache may be shared between threads.
+    '''
+    responses.add(responses.GET, 'https://localhost/rest/system',
+                  json={'response': {'version': '6.0.0'}}
+                  )
+    cache = ResponseCache(DiskCacheBackend(str(tmp_path / 'cache.db')))
+    api = platform(cache)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: api.get('rest/system').json(),
+                                range(64)
+                                ))
+    assert all(r == {'response': {'version': '6.0.0'}} for r in results)
+    stats = cache.stats
+    assert stats['hits'] + stats['misses'] == 64
+    assert stats['hits'] >= 56
@@ -0,0 +1,41 @@
+import json
+import pytest
+from tenable.base.utils.jsonstream import iter_json_array
+
+
+def blocks(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('size', [1, 3, 64, 100000])
+def test_iter_json_array(size):
+    data = [{'id': i, 'name': 'é' * i, 'vals': [1, 2.5, None, True]}
+            for i in range(100)] + [12345, 'string', []]
+    raw = json.dumps(data).encode('utf-8')
+    assert list(iter_json_array(blocks(raw, size), compact_at=10)) == data
+
+
+def test_iter_json_array_empty():
+    assert list(iter_json_array([b' [', b' ] '])) == []
+
+
+@pytest.mark.parametrize('raw', [
+    b'', b'{}', b'[1, 2', b'[1 2]', b'[1, 2] extra', b'[{"a": ', b'[1,]',
+    b'[,1]', b'["ab', '["é"]'.encode('utf-8')[:-3], b'["\xff"]'
+])
+def test_iter_json_array_errors(raw):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(blocks(raw, 2)))
+
+
+@pytest.mark.parametrize('size', [1, 2, 5])
+def test_iter_json_array_strings(size):
+    data = ['a\\"b', '\\', '"', '[{,}]', {'k': 'x\\\\"]'}, 'é☃']
+    raw = json.dumps(data, ensure_ascii=False).encode('utf-8')
+    assert list(iter_json_array(blocks(raw, size))) == data
+
+
+def test_iter_json_array_large_element():
+    data = [{'output': 'x' * 2 ** 20, 'list': list(range(10000))}, 1]
+    raw = json.dumps(data).encode('utf-8')
+    assert list(iter_json_array(blocks(raw, 16))) == data
@@ -77,3 +77,56 @@ def test_camel_squashing():
                        box=True
                        )
     assert api1.get('example').camelCase == api2.get('example').camel_case
+
+
+def test_connection_pool():
+    '''
+    Test the connection pool settings.
+    '''
+    api = APIPlatform(url='https://localhost', access_key='1', secret_key='2')
+    adapter = api._session.get_adapter('https://localhost/example')  # noqa: PLW0212,E501
+    assert adapter._pool_maxsize == 10  # noqa: PLW0212
+    assert api._session.headers['Connection'] == 'keep-alive'  # noqa: PLW0212
+
+    api = APIPlatform(url='https://localhost',
+                      access_key='1',
+                      secret_key='2',
+                      pool_maxsize=4,
+                      pool_connections=2,
+                      pool_block=True,
+                      keep_alive=False
+                      )
+    adapter = api._session.get_adapter('https://localhost/example')  # noqa: PLW0212,E501
+    assert adapter._pool_maxsize == 4  # noqa: PLW0212
+    assert adapter._pool_connections == 2  # noqa: PLW0212
+    assert adapter._pool_block is True  # noqa: PLW0212
+    assert api._session.headers['Connection'] == 'close'  # noqa: PLW0212
+
+    # The pool should only ever grow, and is resized in place.
+    manager = adapter.poolmanager
+    manager.connection_from_url('https://localhost')
+    assert api.ensure_pool_size(16) == 16
+    assert api.ensure_pool_size(8) == 16
+    assert api._session.get_adapter('https://localhost/example') is adapter  # noqa: PLW0212,E501
+    assert adapter.poolmanager is not manager
+    assert len(manager.pools) == 0
+    assert adapter._pool_maxsize == 16  # noqa: PLW0212
+    assert adapter._pool_block is True  # noqa: PLW0212
+
+
+def test_connection_pool_custom_session():
+    '''
+    Test that a custom session is left untouched.
+    '''
+    from requests import Session
+    from requests.adapters import HTTPAdapter
+    session = Session()
+    adapter = HTTPAdapter(pool_maxsize=3)
+    session.mount('https://', adapter)
+    api = APIPlatform(url='https://localhost',
+                      access_key='1',
+                      secret_key='2',
+                      session=session
+                      )
+    assert api.ensure_pool_size(32) == 10
+    assert api._session.get_adapter('https://localhost') is adapter  # noqa: PLW0212,E501
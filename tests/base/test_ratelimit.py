@@ -0,0 +1,148 @@
+'''
+Rate limiter testing module.
+'''
+import time
+from email.utils import formatdate
+from threading import Thread
+import responses
+from requests import Response
+from tenable.base.platform import APIPlatform
+from tenable.base.ratelimit import (RateLimiter,
+                                    TokenBucket,
+                                    build_limiter,
+                                    retry_after
+                                    )
+
+
+def test_token_bucket_pacing():
+    '''
+    Test that the token bucket paces the callers.
+    '''
+    bucket = TokenBucket(rate=50, burst=1)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.09
+    assert bucket.waits == 5
+    assert bucket.wait_time > 0.09
+    assert bucket.stats['requests'] == 6
+
+
+def test_token_bucket_throttle():
+    '''
+    Test that the token bucket adapts to being rate limited.
+    '''
+    bucket = TokenBucket()
+    for _ in range(20):
+        bucket.acquire()
+    assert bucket.rate is None
+    assert bucket.wait_time == 0
+
+    # The first 429 pauses the bucket and derives a rate from the observed
+    # rate, while further 429s within the same second are only counted.
+    bucket.throttle(0.2)
+    rate = bucket.rate
+    assert rate == 10
+    bucket.throttle(0.2)
+    assert bucket.rate == rate
+    assert bucket.throttled == 2
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.15
+
+    # Successful responses gradually raise the rate again.
+    for _ in range(50):
+        bucket.success()
+    assert bucket.rate > rate
+
+    # The rate is never raised above the configured rate, nor lowered beneath
+    # the minimum.
+    bucket = TokenBucket(rate=4, min_rate=3)
+    bucket.throttle()
+    assert bucket.rate == 3
+    for _ in range(50):
+        bucket.success()
+    assert bucket.rate == 4
+
+
+def test_retry_after():
+    '''
+    Test parsing the Retry-After header.
+    '''
+    resp = Response()
+    assert retry_after(resp) is None
+    resp.headers['Retry-After'] = '2.5'
+    assert retry_after(resp) == 2.5
+    resp.headers['Retry-After'] = formatdate(time.time() + 30, usegmt=True)
+    assert 25 < retry_after(resp) <= 30
+    resp.headers['Retry-After'] = 'soon'
+    assert retry_after(resp) is None
+
+
+def test_build_limiter():
+    '''
+    Test building the limiter from the platform parameter.
+    '''
+    limiter = RateLimiter()
+    assert build_limiter(None) is None
+    assert build_limiter(False) is None
+    assert build_limiter(limiter) is limiter
+    assert build_limiter(True).buckets['default'].rate is None
+    assert build_limiter(20).buckets['default'].rate == 20
+
+
+@responses.activate
+def test_limiter_groups():
+    '''
+    Test that requests are paced within their endpoint group.
+    '''
+    responses.add(responses.GET, 'https://localhost/scans', json={})
+    responses.add(responses.GET,
+                  'https://localhost/vulns/export/abc/status',
+                  json={}
+                  )
+    limiter = RateLimiter(groups={
+        'exports': {'pattern': r'^/(vulns|assets)/export', 'rate': 100},
+    })
+    api = APIPlatform(url='https://localhost',
+                      access_key='1',
+                      secret_key='2',
+                      rate_limit=limiter
+                      )
+    for _ in range(3):
+        api.get('vulns/export/abc/status')
+    api.get('scans')
+    stats = limiter.stats
+    assert stats['exports']['requests'] == 3
+    assert stats['exports']['rate'] == 100
+    assert stats['default']['requests'] == 1
+    assert limiter.wait_time == sum(s['wait_time'] for s in stats.values())
+
+
+@responses.activate
+def test_limiter_shared_retry_after():
+    '''
+    Test that a Retry-After response holds the requests of every thread.
+    '''
+    responses.add(responses.GET, 'https://localhost/scans',
+                  status=429, headers={'Retry-After': '0.3'}
+                  )
+    responses.add(responses.GET, 'https://localhost/scans', json={})
+    responses.add(responses.GET, 'https://localhost/scanners', json=[])
+    limiter = RateLimiter()
+    api = APIPlatform(url='https://localhost',
+                      access_key='1',
+                      secret_key='2',
+                      rate_limit=limiter
+                      )
+    thread = Thread(target=api.get, args=('scans',))
+    thread.start()
+    time.sleep(0.05)
+    start = time.monotonic()
+    api.get('scanners')
+    assert time.monotonic() - start >= 0.2
+    thread.join()
+    stats = limiter.stats['default']
+    assert stats['throttled'] == 1
+    assert stats['requests'] == 3
+    assert stats['wait_time'] >= 0.2
@@ -0,0 +1,101 @@
+'''
+Testing the asynchronous exports iterator
+'''
+import asyncio
+import re
+import time
+from email.utils import formatdate
+import pytest
+from tenable.errors import TioExportsError
+
+pytest.importorskip('aiohttp')
+aioresponses = pytest.importorskip('aioresponses').aioresponses
+
+from tenable.io.exports.aio import AsyncExportsIterator  # noqa: E402
+
+
+URL_BASE = 'https://cloud.tenable.com/assets/export'
+URL_ACTIONS = f'{URL_BASE}/([0-9a-fA-F\\-]+)'
+URL_EXPORT = re.compile(f'{URL_BASE}$')
+URL_STATUS = re.compile(f'{URL_ACTIONS}/status')
+URL_CHUNK = re.compile(f'{URL_ACTIONS}/chunks/[0-9]+')
+CHUNK = [{'name': f'item {i}'} for i in range(5)]
+
+
+@pytest.fixture
+def mock_export():
+    with aioresponses() as mocked:
+        mocked.post(URL_EXPORT, payload={
+            'export_uuid': '01234567-89ab-cdef-0123-4567890abcde'
+        })
+        mocked.get(URL_STATUS, payload={
+            'status': 'PROCESSING',
+            'chunks_available': [1, 2, 5]
+        })
+        mocked.get(URL_STATUS, payload={
+            'status': 'FINISHED',
+            'chunks_available': [1, 2, 3, 5]
+        }, repeat=True)
+        mocked.get(URL_CHUNK, payload=CHUNK, repeat=True)
+        yield mocked
+
+
+def test_async_iterator(mock_export, api):
+    async def consume():
+        export = api.exports.assets(iterator=AsyncExportsIterator)
+        assert export.uuid is None
+        async with export:
+            return [item async for item in export], export
+
+    items, export = asyncio.run(consume())
+    assert len(items) == 20
+    assert export.uuid == '01234567-89ab-cdef-0123-4567890abcde'
+    assert sorted(export.processed) == [1, 2, 3, 5]
+
+
+def test_async_run_async(mock_export, api):
+    chunks = []
+
+    async def handler(data, export_uuid, export_type, export_chunk_id):
+        assert export_type == 'assets'
+        assert len(data) == 5
+        chunks.append(export_chunk_id)
+
+    export = api.exports.assets(iterator=AsyncExportsIterator)
+    asyncio.run(export.run_async(handler, concurrency=4))
+    assert sorted(chunks) == [1, 2, 3, 5]
+
+
+def test_async_sync_methods_unsupported(api):
+    export = AsyncExportsIterator(api,
+                                  type='assets',
+                                  uuid='01234567-89ab-cdef-0123-4567890abcde'
+                                  )
+    with pytest.raises(TioExportsError):
+        export.next()
+    with pytest.raises(TioExportsError):
+        export.run_threaded(print)
+
+
+def test_async_retry_after_date(api):
+    with aioresponses() as mocked:
+        mocked.get(URL_STATUS, status=503, headers={
+            'Retry-After': formatdate(time.time(), usegmt=True)
+        })
+        mocked.get(URL_STATUS, status=299, payload={
+            'status': 'FINISHED',
+            'chunks_available': []
+        })
+        export = AsyncExportsIterator(
+            api,
+            type='assets',
+            uuid='01234567-89ab-cdef-0123-4567890abcde'
+        )
+
+        async def status():
+            try:
+                return await export._get_status_async()
+            finally:
+                await export.close()
+
+        assert asyncio.run(status()).status == 'FINISHED'
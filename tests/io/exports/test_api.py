@@ -5,8 +5,11 @@ import re
 from uuid import UUID
 import pytest
 import responses
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from tenable.errors import NotFoundError, TioExportChunkError
 from tenable.io.exports.schema import AssetExportSchema
 from tenable.io.exports.iterator import ExportsIterator
+from tenable.io.exports.retry import ChunkRetryPolicy
 
 RE_BASE = (r'https://cloud.tenable.com/(vulns|assets|compliance)/export/'
            r'([0-9a-fA-F\-]+)'
@@ -57,6 +60,73 @@ def test_download_chunk(api):
 
 
 
+@responses.activate
+def test_download_chunk_transient_errors(api):
+    url = re.compile(f'{RE_BASE}/chunks/[0-9]+')
+    responses.add(responses.GET, url, status=500, json={})
+    responses.add(responses.GET, url, body=RequestsConnectionError('reset'))
+    responses.add(responses.GET, url, body='[{"name": "item 1"}, {"na')
+    responses.add(responses.GET, url, json=[{'name': 'item 1'}])
+    resp = api.exports.download_chunk('vulns',
+                                      '01234567-89ab-cdef-0123-4567890abcde',
+                                      1,
+                                      policy=ChunkRetryPolicy(backoff=0)
+                                      )
+    assert resp == [{'name': 'item 1'}]
+    assert len(responses.calls) == 4
+
+
+@responses.activate
+def test_download_chunk_dead(api):
+    url = re.compile(f'{RE_BASE}/chunks/[0-9]+')
+    responses.add(responses.GET, url, body='[{"name": "item 1"}, {"na')
+    with pytest.raises(TioExportChunkError) as err:
+        api.exports.download_chunk('vulns',
+                                   '01234567-89ab-cdef-0123-4567890abcde',
+                                   1,
+                                   policy=ChunkRetryPolicy(retries=1,
+                                                           backoff=0
+                                                           )
+                                   )
+    assert err.value.attempts == 2
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_download_chunk_not_retryable(api):
+    url = re.compile(f'{RE_BASE}/chunks/[0-9]+')
+    responses.add(responses.GET, url, status=404, json={})
+    with pytest.raises(NotFoundError):
+        api.exports.download_chunk('vulns',
+                                   '01234567-89ab-cdef-0123-4567890abcde',
+                                   1,
+                                   policy=ChunkRetryPolicy(backoff=0)
+                                   )
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_download_chunk_raw_truncated(api):
+    url = re.compile(f'{RE_BASE}/chunks/[0-9]+')
+    responses.add(responses.GET, url, body=b'[{"name": "item 1"}, {"na')
+    responses.add(responses.GET, url, body=b'[{"name": "item 1"}]\n')
+    uuid = '01234567-89ab-cdef-0123-4567890abcde'
+    raw = api.exports.download_chunk_raw('vulns',
+                                         uuid,
+                                         1,
+                                         policy=ChunkRetryPolicy(backoff=0)
+                                         )
+    assert raw == b'[{"name": "item 1"}]\n'
+    assert len(responses.calls) == 2
+
+
+def test_chunk_retry_policy_delay():
+    policy = ChunkRetryPolicy(backoff=1, max_backoff=5, jitter=False)
+    assert [policy.delay(a) for a in range(5)] == [1, 2, 4, 5, 5]
+    policy = ChunkRetryPolicy(backoff=1, max_backoff=5)
+    assert all(0 <= policy.delay(a) <= 5 for a in range(10))
+
+
 @responses.activate
 def test_jobs(api):
     responses.add(responses.GET,
@@ -108,3 +178,54 @@ def test_vuln_export(export_request, api):
 def test_compliance_export(export_request, api):
     export = api.exports.compliance()
     assert isinstance(export, ExportsIterator)
+
+
+@responses.activate
+def test_stream_chunk(api):
+    url = re.compile(f'{RE_BASE}/chunks/[0-9]+')
+    # A truncated chunk that should be retried, skipping the first record.
+    responses.add(responses.GET, url, body='[{"name": "item1"}, {"na')
+    responses.add(responses.GET, url, json=[{'name': 'item1'},
+                                            {'name': 'item2'}
+                                            ]
+                  )
+    records = api.exports.stream_chunk('vulns',
+                                       '01234567-89ab-cdef-0123-4567890abcde',
+                                       1
+                                       )
+    assert list(records) == [{'name': 'item1'}, {'name': 'item2'}]
+
+
+@responses.activate
+def test_stream_chunk_truncated_utf8(api):
+    url = re.compile(f'{RE_BASE}/chunks/[0-9]+')
+    # The chunk is cut off part way through a multi-byte character.
+    responses.add(responses.GET, url,
+                  body='[{"name": "é"}]'.encode('utf-8')[:12]
+                  )
+    responses.add(responses.GET, url, json=[{'name': 'é'}])
+    records = api.exports.stream_chunk('vulns',
+                                       '01234567-89ab-cdef-0123-4567890abcde',
+                                       1,
+                                       policy=ChunkRetryPolicy(backoff=0)
+                                       )
+    assert list(records) == [{'name': 'é'}]
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_stream_chunk_dead(api):
+    url = re.compile(f'{RE_BASE}/chunks/[0-9]+')
+    responses.add(responses.GET, url, body='not json')
+    records = api.exports.stream_chunk('vulns',
+                                       '01234567-89ab-cdef-0123-4567890abcde',
+                                       1,
+                                       policy=ChunkRetryPolicy(retries=2,
+                                                               backoff=0
+                                                               )
+                                       )
+    with pytest.raises(TioExportChunkError) as err:
+        list(records)
+    assert err.value.chunk_id == 1
+    assert err.value.attempts == 3
+    assert len(responses.calls) == 3
@@ -0,0 +1,100 @@
+'''
+Testing the Arrow export sink
+'''
+import json
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+
+from tenable.io.exports.arrow import (JSON,  # noqa: E402
+                                      ArrowSink,
+                                      chunk_to_batch,
+                                      export_schema
+                                      )
+from tenable.io.exports.records import compact_records  # noqa: E402
+
+VULNS = [
+    {
+        'asset': {'uuid': 'a1', 'hostname': 'host1',
+                  'operating_system': ['Linux']},
+        'plugin': {'id': 19506, 'name': 'Scan Info', 'cve': ['CVE-1'],
+                   'cvss3_base_score': 9.8, 'vpr': {'score': 5.5},
+                   'unknown_field': 'dropped'},
+        'port': {'port': 443, 'protocol': 'TCP'},
+        'severity': 'critical',
+        'first_found': '2021-05-04T12:01:02.123Z',
+    },
+    {
+        'asset': {'uuid': 'a2'},
+        'plugin': {'id': 10180},
+        'severity': 'info',
+        'first_found': None,
+    },
+]
+
+
+def test_chunk_to_batch():
+    batch = chunk_to_batch(VULNS, 'vulns')
+    assert batch.schema == export_schema('vulns')
+    assert batch.num_rows == 2
+    rows = batch.to_pylist()
+    assert rows[0]['plugin.id'] == 19506
+    assert rows[0]['plugin.vpr.score'] == 5.5
+    assert rows[0]['asset.operating_system'] == ['Linux']
+    assert rows[0]['first_found'].year == 2021
+    assert rows[1]['port.port'] is None
+    assert 'plugin.unknown_field' not in batch.schema.names
+
+
+def test_chunk_to_batch_compact():
+    records = compact_records(VULNS, 'vulns')
+    assert (chunk_to_batch(records, 'vulns').to_pylist()
+            == chunk_to_batch(VULNS, 'vulns').to_pylist()
+            )
+    batch = chunk_to_batch(records, 'vulns', columns=[('asset', JSON)])
+    assert json.loads(batch.to_pylist()[1]['asset']) == {'uuid': 'a2'}
+
+
+def test_chunk_to_batch_numeric_strings():
+    vulns = [
+        {'plugin': {'id': '19506', 'cvss3_base_score': '9.8'},
+         'port': {'port': '443.0'}},
+        {'plugin': {'id': 'n/a', 'cvss3_base_score': 7},
+         'port': {'port': True}},
+    ]
+    rows = chunk_to_batch(vulns, 'vulns').to_pylist()
+    assert rows[0]['plugin.id'] == 19506
+    assert rows[0]['plugin.cvss3_base_score'] == 9.8
+    assert rows[0]['port.port'] == 443
+    assert rows[1]['plugin.id'] is None
+    assert rows[1]['plugin.cvss3_base_score'] == 7.0
+
+
+def test_chunk_to_batch_custom_columns():
+    columns = [('asset.uuid', pa.string()), ('plugin', 'json')]
+    rows = chunk_to_batch(VULNS, 'vulns', columns).to_pylist()
+    assert rows[1] == {'asset.uuid': 'a2', 'plugin': '{"id": 10180}'}
+
+
+@pytest.mark.parametrize('file_format', ['parquet', 'ipc'])
+def test_arrow_sink(tmp_path, file_format):
+    path = str(tmp_path / f'vulns.{file_format}')
+    with ArrowSink(path, 'vulns', file_format=file_format) as sink:
+        sink(data=VULNS, export_chunk_id=1)
+        sink(data=iter(VULNS), export_chunk_id=2)
+        sink(data=[], export_chunk_id=3)
+    assert sink.rows == 4
+    assert sink.batches == 2
+
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+        table = pq.read_table(path)
+    else:
+        table = pa.ipc.open_file(path).read_all()
+    assert table.num_rows == 4
+    assert table.schema.equals(export_schema('vulns'))
+
+
+def test_arrow_sink_invalid_format(tmp_path):
+    with pytest.raises(ValueError):
+        ArrowSink(str(tmp_path / 'vulns.csv'), 'vulns', file_format='csv')
@@ -0,0 +1,36 @@
+'''
+Testing the export chunk buffer
+'''
+from threading import Thread
+from tenable.io.exports.buffer import ChunkBuffer
+
+
+def test_buffer_bytes():
+    buffer = ChunkBuffer(max_bytes=20)
+    buffer.acquire()
+    first = buffer.reserve(20)
+    assert first == 20
+    buffer.acquire()
+
+    # The second chunk doesn't fit until the first has been released.
+    sizes = []
+    thread = Thread(target=lambda: sizes.append(buffer.reserve(6)))
+    thread.start()
+    thread.join(0.1)
+    assert thread.is_alive()
+    buffer.release(first)
+    thread.join(1)
+    assert sizes == [6]
+    buffer.release(sizes[0])
+    assert buffer.occupancy == {'chunks': 0, 'bytes': 0, 'max_chunks': None,
+                                'max_bytes': 20, 'peak_chunks': 2,
+                                'peak_bytes': 20, 'waits': 1,
+                                'wait_time': buffer.wait_time
+                                }
+
+
+def test_buffer_oversized_chunk():
+    buffer = ChunkBuffer(max_bytes=1)
+    buffer.acquire()
+    assert buffer.reserve(104) == 104
+    assert buffer.reserve(0) == 0
@@ -0,0 +1,84 @@
+'''
+Testing the export checkpoint stores
+'''
+import re
+import pytest
+import responses
+from tenable.io.exports.checkpoint import (ExportCheckpoint,
+                                           FileCheckpoint,
+                                           SQLiteCheckpoint
+                                           )
+from tenable.io.exports.iterator import ExportsIterator
+
+EXPORT_UUID = '01234567-89ab-cdef-0123-4567890abcde'
+URL_BASE = f'https://cloud.tenable.com/assets/export/{EXPORT_UUID}'
+URL_STATUS = f'{URL_BASE}/status'
+URL_CHUNK = re.compile(f'{URL_BASE}/chunks/[0-9]+')
+
+
+@pytest.fixture(params=['file', 'sqlite'])
+def checkpoint(request, tmp_path):
+    if request.param == 'file':
+        return FileCheckpoint(str(tmp_path / 'exports.checkpoint'))
+    return SQLiteCheckpoint(str(tmp_path / 'exports.db'))
+
+
+def test_checkpoint_abstract():
+    with pytest.raises(TypeError):
+        ExportCheckpoint()
+
+
+def test_checkpoint_store(checkpoint):
+    assert checkpoint.latest('vulns') is None
+    checkpoint.register('vulns', EXPORT_UUID)
+    checkpoint.mark_completed('vulns', EXPORT_UUID, 1)
+    checkpoint.mark_completed('vulns', EXPORT_UUID, 3)
+    checkpoint.mark_completed('assets', EXPORT_UUID, 2)
+    assert checkpoint.completed('vulns', EXPORT_UUID) == {1, 3}
+    assert checkpoint.latest('vulns') == EXPORT_UUID
+    checkpoint.clear('vulns', EXPORT_UUID)
+    assert checkpoint.completed('vulns', EXPORT_UUID) == set()
+    assert checkpoint.completed('assets', EXPORT_UUID) == {2}
+
+
+@responses.activate
+def test_iterator_resume(checkpoint, api):
+    responses.add(responses.GET, URL_STATUS, json={
+        'status': 'FINISHED',
+        'chunks_available': [1, 2, 3]
+    })
+    responses.add(responses.GET, URL_CHUNK, json=[{'id': 1}, {'id': 2}])
+    checkpoint.mark_completed('assets', EXPORT_UUID, 1)
+
+    export = ExportsIterator(api,
+                             type='assets',
+                             uuid=EXPORT_UUID,
+                             checkpoint=checkpoint
+                             )
+    assert len(list(export)) == 4
+    assert checkpoint.completed('assets', EXPORT_UUID) == {1, 2, 3}
+    downloads = [c.request.url for c in responses.calls if 'chunks' in
+                 c.request.url]
+    assert len(downloads) == 2
+
+
+@responses.activate
+def test_threaded_resume(checkpoint, api):
+    responses.add(responses.GET, URL_STATUS, json={
+        'status': 'FINISHED',
+        'chunks_available': [1, 2, 3]
+    })
+    responses.add(responses.GET, URL_CHUNK, json=[{'id': 1}])
+    checkpoint.mark_completed('assets', EXPORT_UUID, 2)
+    handled = []
+
+    def handler(data, export_chunk_id, **kwargs):
+        if export_chunk_id == 3:
+            raise ValueError('failed to process the chunk')
+        handled.append(export_chunk_id)
+
+    export = api.exports.assets(uuid=EXPORT_UUID, checkpoint=checkpoint)
+    with pytest.raises(ValueError):
+        export.run_threaded(handler)
+    assert handled == [1]
+    assert checkpoint.completed('assets', EXPORT_UUID) == {1, 2}
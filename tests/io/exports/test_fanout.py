@@ -0,0 +1,73 @@
+'''
+Testing the export fan-out
+'''
+import re
+import time
+import pytest
+import responses
+from tenable.io.exports.fanout import ExportFanout
+from tenable.io.exports.iterator import ExportsIterator
+
+EXPORT_UUID = '01234567-89ab-cdef-0123-4567890abcde'
+URL_BASE = f'https://cloud.tenable.com/vulns/export/{EXPORT_UUID}'
+
+
+@pytest.fixture
+def export(api):
+    with responses.RequestsMock() as rsps:
+        rsps.add(responses.GET, f'{URL_BASE}/status', json={
+            'status': 'FINISHED',
+            'chunks_available': [1, 2, 3, 4]
+        })
+        rsps.add(responses.GET,
+                 re.compile(f'{URL_BASE}/chunks/[0-9]+'),
+                 json=[{'id': 1}, {'id': 2}]
+                 )
+        yield ExportsIterator(api, type='vulns', uuid=EXPORT_UUID)
+
+
+def test_fanout(export):
+    seen = {'fast': [], 'slow': [], 'broken': []}
+    closed = []
+
+    class Sink:
+        def __call__(self, data, export_chunk_id, **kwargs):
+            seen['fast'].append(export_chunk_id)
+
+        def close(self):
+            closed.append(True)
+
+    def slow(data, export_chunk_id, **kwargs):
+        time.sleep(0.05)
+        seen['slow'].append(export_chunk_id)
+
+    def broken(data, export_chunk_id, **kwargs):
+        seen['broken'].append(export_chunk_id)
+        if export_chunk_id == 2:
+            raise ValueError('boom')
+
+    fanout = ExportFanout()
+    fanout.add(Sink(), name='fast')
+    fanout.add(slow, concurrency=2, max_pending=1)
+    fanout.add(broken)
+    stats = fanout.run(export, num_threads=2)
+    assert {k: sorted(v) for k, v in seen.items()} == {
+        'fast': [1, 2, 3, 4], 'slow': [1, 2, 3, 4], 'broken': [1, 2, 3, 4]
+    }
+    assert closed == [True]
+    assert stats['fast']['records'] == 8
+    assert stats['slow']['chunks'] == 4
+    assert stats['slow']['pending'] == 0
+    assert stats['broken']['errors'] == 1
+    assert stats['broken']['chunks'] == 3
+    assert [name for name, _ in fanout.errors] == ['broken']
+
+
+def test_fanout_stream(api):
+    fanout = ExportFanout()
+    first, second = [], []
+    fanout.add(lambda data, **kw: first.extend(data), name='first')
+    fanout.add(lambda data, **kw: second.extend(data), name='second')
+    fanout(data=iter([{'id': 1}]), export_chunk_id=1)
+    fanout.close()
+    assert first == second == [{'id': 1}]
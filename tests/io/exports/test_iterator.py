@@ -7,6 +7,7 @@ import responses
 from box import Box
 from tenable.errors import TioExportsError, TioExportsTimeout
 from tenable.io.exports.iterator import ExportsIterator
+from tenable.io.exports.retry import ChunkRetryPolicy
 
 
 URL_BASE = 'https://cloud.tenable.com/assets/export'
@@ -141,3 +142,290 @@ def test_iterator_threaded(export_request, api):
     export = api.exports.assets()
     export.run_threaded(test_func)
     assert len(export.processed) == 4
+
+
+def test_iterator_threaded_downloads(export_request, api, monkeypatch):
+    from threading import current_thread, main_thread, Lock
+    from tenable.io.exports.api import ExportsAPI
+
+    download = ExportsAPI.download_chunk
+    threads = set()
+    lock = Lock()
+
+    def threaded_download(self, *args, **kwargs):
+        with lock:
+            threads.add(current_thread())
+        return download(self, *args, **kwargs)
+
+    monkeypatch.setattr(ExportsAPI, 'download_chunk', threaded_download)
+
+    def test_func(data, **kwargs):
+        assert len(data) == 5
+
+    export = api.exports.assets()
+    export.run_threaded(test_func, num_threads=1, download_threads=4)
+    assert len(export.processed) == 4
+    assert main_thread() not in threads
+
+
+def test_iterator_threaded_func_errors(export_request, api):
+    def test_func(data, **kwargs):
+        raise ZeroDivisionError('processing failed')
+
+    export = api.exports.assets()
+    with pytest.raises(ZeroDivisionError):
+        export.run_threaded(test_func, download_threads=4)
+    assert export.counters['in_flight'] == 0
+    assert export.counters['done'] == 0
+
+
+def test_iterator_stream(export_request, api):
+    export = api.exports.assets(stream=True)
+    items = list(export)
+    assert len(items) == 20
+    assert items[0] == {'name': 'item 1'}
+
+
+def test_iterator_threaded_stream(export_request, api):
+    def test_func(data, **kwargs):
+        assert not isinstance(data, list)
+        assert len(list(data)) == 5
+
+    export = api.exports.assets(stream=True)
+    export.run_threaded(test_func)
+    assert len(export.processed) == 4
+
+
+@responses.activate
+def test_iterator_counters(api):
+    responses.add(responses.GET, URL_STATUS, json={
+        'status': 'FINISHED',
+        'chunks_available': [1, 2, 3]
+    })
+    responses.add(responses.GET, URL_CHUNK, json=[])
+    responses.add(responses.GET, URL_CHUNK, json=[{'name': 'item 1'}])
+    export = ExportsIterator(api,
+                             type='assets',
+                             uuid='01234567-89ab-cdef-0123-4567890abcde',
+                             )
+    assert export.next() == {'name': 'item 1'}
+    assert export.counters == {'available': 3,
+                               'queued': 1,
+                               'in_flight': 1,
+                               'done': 1,
+                               'empty': 1,
+                               'failed': 0
+                               }
+    for _ in export:
+        pass
+    assert export.counters['done'] == 3
+    assert export.counters['in_flight'] == 0
+    assert export.processed == {1, 2, 3}
+
+
+def test_iterator_polling_policy(export_request, api):
+    from tenable.io.exports.polling import AdaptivePollingPolicy
+    policy = AdaptivePollingPolicy(min_delay=0.01)
+    export = api.exports.assets(polling=policy)
+    assert export.polling is policy
+    for _ in export:
+        pass
+    assert export.count == 20
+    assert export.chunk_rate is not None
+
+
+def test_iterator_threaded_backpressure(export_request, api):
+    import time
+
+    def test_func(data, **kwargs):
+        time.sleep(0.05)
+
+    export = api.exports.assets()
+    export.run_threaded(test_func,
+                        num_threads=1,
+                        download_threads=4,
+                        max_chunks=2
+                        )
+    assert len(export.processed) == 4
+    occupancy = export.buffer.occupancy
+    assert occupancy['peak_chunks'] == 2
+    assert occupancy['chunks'] == 0
+    assert occupancy['waits'] > 0
+
+
+def test_iterator_threaded_max_bytes(export_request, api):
+    export = api.exports.assets()
+    export.run_threaded(lambda data, **kwargs: None,
+                        num_threads=1,
+                        max_bytes=10
+                        )
+    assert len(export.processed) == 4
+
+    # The oversized chunks are admitted one at a time, each reserving the size
+    # of the raw chunk body.
+    body = [c.response.content for c in export_request.calls
+            if '/chunks/' in c.request.url
+            ][0]
+    occupancy = export.buffer.occupancy
+    assert occupancy['bytes'] == 0
+    assert occupancy['peak_bytes'] == len(body)
+    assert export._chunk_bytes == {}
+
+
+def test_iterator_projection(export_request, api):
+    export = api.exports.assets(projection=['name'])
+    assert export.projection == ['name']
+    assert list(export)[0] == {'name': 'item 1'}
+
+
+def test_iterator_threaded_stream_projection(export_request, api):
+    records = []
+
+    def test_func(data, **kwargs):
+        records.extend(data)
+
+    export = api.exports.assets(stream=True, projection=['missing'])
+    export.run_threaded(test_func)
+    assert records == [{}] * 20
+
+
+def test_iterator_compact(export_request, api):
+    from tenable.io.exports.records import AssetRecord
+    items = list(api.exports.assets(compact=True))
+    assert len(items) == 20
+    assert isinstance(items[0], AssetRecord)
+    assert items[0]['name'] == 'item 1'
+
+
+def count_records(data, export_chunk_id, offset=0, **kwargs):
+    import os
+    return export_chunk_id, len(data) + offset, os.getpid(), data[0]
+
+
+def test_iterator_processes(export_request, api):
+    import os
+    export = api.exports.assets(projection=['missing'])
+    results = export.run_processes(count_records,
+                                   kwargs={'offset': 1},
+                                   num_processes=2
+                                   )
+    assert sorted(r[:2] for r in results) == [(1, 6), (2, 6), (3, 6), (5, 6)]
+    assert all(r[2] != os.getpid() for r in results)
+    assert all(r[3] == {} for r in results)
+    assert export.counters['done'] == 4
+    assert export.counters['in_flight'] == 0
+
+
+def test_iterator_processes_callback_errors(export_request, api):
+    seen = []
+
+    def callback(result):
+        seen.append(result)
+        raise ValueError('boom')
+
+    export = api.exports.assets()
+    with pytest.raises(ValueError):
+        export.run_processes(count_records, num_processes=1, callback=callback)
+    assert len(seen) == 4
+
+
+def test_iterator_threaded_ordered(export_request, api, monkeypatch):
+    import time
+    from tenable.io.exports.api import ExportsAPI
+    download = ExportsAPI.download_chunk
+
+    def slow_download(self, export_type, export_uuid, chunk_id, **kwargs):
+        if chunk_id == 1:
+            time.sleep(0.2)
+        return download(self, export_type, export_uuid, chunk_id, **kwargs)
+
+    monkeypatch.setattr(ExportsAPI, 'download_chunk', slow_download)
+    delivered = []
+
+    def test_func(data, export_chunk_id, **kwargs):
+        delivered.append(export_chunk_id)
+
+    export = api.exports.assets()
+    export.run_threaded(test_func, download_threads=4, ordered=True)
+    assert delivered == [1, 2, 5, 3]
+    assert export.reorder.occupancy['stalls'] >= 1
+    assert export.reorder.occupancy['delivered'] == 4
+    assert export.counters['done'] == 4
+
+
+def test_iterator_threaded_ordered_errors(export_request, api):
+    delivered = []
+
+    def test_func(data, export_chunk_id, **kwargs):
+        delivered.append(export_chunk_id)
+        raise ValueError('boom')
+
+    export = api.exports.assets()
+    with pytest.raises(ValueError):
+        export.run_threaded(test_func, ordered=True, max_chunks=1)
+    assert delivered == [1]
+    assert export.buffer.occupancy['chunks'] == 0
+
+
+def test_iterator_threaded_ordered_max_bytes(api):
+    from tenable.errors import UnexpectedValueError
+    export = ExportsIterator(api, type='assets', uuid='abcd')
+    with pytest.raises(UnexpectedValueError):
+        export.run_threaded(print, ordered=True, max_bytes=10)
+
+
+def failing_chunk_export(api, **kwargs):
+    chunk_1 = re.compile(f'{URL_ACTIONS}/chunks/1$')
+    chunk_2 = re.compile(f'{URL_ACTIONS}/chunks/2$')
+    responses.add(responses.GET, URL_STATUS, json={
+        'status': 'FINISHED',
+        'chunks_available': [1, 2]
+    })
+    responses.add(responses.GET, chunk_1, body='[{"name": "item 1"}, {"na')
+    responses.add(responses.GET, chunk_1, body='[{"name": "item 1"}, {"na')
+    responses.add(responses.GET, chunk_1, json=[{'name': 'item 1'}])
+    responses.add(responses.GET, chunk_2, json=[{'name': 'item 2'}])
+    return ExportsIterator(api,
+                           type='assets',
+                           uuid='01234567-89ab-cdef-0123-4567890abcde',
+                           retry=ChunkRetryPolicy(retries=1, backoff=0),
+                           **kwargs
+                           )
+
+
+@responses.activate
+def test_iterator_failed_chunk_ledger(api):
+    export = failing_chunk_export(api)
+    assert [i['name'] for i in export] == ['item 2']
+    assert list(export.failed_chunks) == [1]
+    assert export.failed_chunks[1].attempts == 2
+    assert export.counters['failed'] == 1
+    assert export.counters['in_flight'] == 0
+
+    recovered = []
+    failed = export.retry_failed(lambda data, **kw: recovered.extend(data))
+    assert failed == {}
+    assert recovered == [{'name': 'item 1'}]
+    assert export.counters['failed'] == 0
+    assert export.counters['done'] == 2
+
+
+@responses.activate
+def test_iterator_threaded_failed_chunk_ledger(api, tmp_path):
+    from tenable.io.exports.checkpoint import SQLiteCheckpoint
+    checkpoint = SQLiteCheckpoint(str(tmp_path / 'checkpoint.db'))
+    export = failing_chunk_export(api, checkpoint=checkpoint)
+    seen = []
+    export.run_threaded(lambda data, export_chunk_id, **kw:
+                        seen.append(export_chunk_id),
+                        download_threads=2
+                        )
+    assert seen == [2]
+    assert list(export.failed_chunks) == [1]
+    assert checkpoint.completed('assets', export.uuid) == {2}
+
+    export.retry_failed(lambda data, export_chunk_id, **kw:
+                        seen.append(export_chunk_id)
+                        )
+    assert seen == [2, 1]
+    assert checkpoint.completed('assets', export.uuid) == {1, 2}
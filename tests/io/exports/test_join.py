@@ -0,0 +1,82 @@
+'''
+Testing the asset join index
+'''
+import pytest
+from tenable.io.exports.join import AssetIndex
+from tenable.io.exports.records import compact_records
+
+ASSETS = [
+    {'id': 'a1', 'acr_score': 7, 'sources': [{'name': 'NESSUS_SCAN'}],
+     'tags': [{'key': 'Location', 'value': 'HQ'}], 'ipv4s': ['10.0.0.1']},
+    {'id': 'a2', 'acr_score': 3, 'network_name': 'Default'},
+]
+VULNS = [
+    {'asset': {'uuid': 'a1', 'hostname': 'host1'}, 'plugin': {'id': 1}},
+    {'asset': {'uuid': 'a2', 'acr_score': 9}, 'plugin': {'id': 2}},
+    {'asset': {'uuid': 'a3'}, 'plugin': {'id': 3}},
+]
+
+
+@pytest.fixture(params=['memory', 'disk'])
+def index(request, tmp_path):
+    path = str(tmp_path / 'assets.idx') if request.param == 'disk' else None
+    index = AssetIndex(fields=['acr_score', 'tags', 'network_name'],
+                       path=path
+                       )
+    index(data=ASSETS[:1], export_type='assets')
+    index.add(iter(ASSETS[1:]))
+    yield index
+    index.close()
+
+
+def test_asset_index_get(index):
+    assert len(index) == 2
+    assert index.get('a1') == {'acr_score': 7,
+                               'tags': [{'key': 'Location', 'value': 'HQ'}]
+                               }
+    assert index.get('a3') is None
+
+
+def test_asset_index_enrich_merge(index):
+    vulns = list(index.enrich([dict(v) for v in VULNS]))
+    assert vulns[0]['asset'] == {'uuid': 'a1', 'hostname': 'host1',
+                                 'acr_score': 7,
+                                 'tags': [{'key': 'Location', 'value': 'HQ'}]
+                                 }
+    assert vulns[1]['asset'] == {'uuid': 'a2', 'acr_score': 9,
+                                 'network_name': 'Default'
+                                 }
+    assert vulns[2]['asset'] == {'uuid': 'a3'}
+
+
+def test_asset_index_enrich_key(index):
+    vulns = list(index.enrich(iter([dict(v) for v in VULNS]),
+                              key='asset_info'
+                              ))
+    assert vulns[1]['asset_info'] == {'acr_score': 3,
+                                      'network_name': 'Default'
+                                      }
+    assert vulns[2]['asset_info'] is None
+
+
+def test_asset_index_enrich_compact(index):
+    records = compact_records(VULNS, 'vulns')
+    vulns = list(index.enrich(records))
+    assert vulns[0]['asset']['acr_score'] == 7
+    assert vulns[0]['plugin'] is records[0]['plugin']
+    assert 'acr_score' not in records[0]['asset']
+
+
+def test_asset_index_add_compact():
+    index = AssetIndex(fields=['tags', 'acr_score'])
+    index.add(compact_records(ASSETS, 'assets'))
+    assert index.get('a1') == {'acr_score': 7,
+                               'tags': [{'key': 'Location', 'value': 'HQ'}]
+                               }
+
+
+def test_asset_index_replace(index):
+    assert index.get('a2')['acr_score'] == 3
+    index.add([{'id': 'a2', 'acr_score': 5}])
+    assert index.get('a2') == {'acr_score': 5}
+    assert len(index) == 2
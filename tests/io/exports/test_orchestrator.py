@@ -0,0 +1,203 @@
+'''
+Testing the export orchestrator
+'''
+import json
+import re
+import time
+import pytest
+import responses
+from tenable.errors import TioExportsError
+from tenable.io.exports.iterator import ExportsIterator
+from tenable.io.exports.orchestrator import ExportOrchestrator
+from tenable.io.exports.retry import ChunkRetryPolicy
+
+EXPORT_UUID = '01234567-89ab-cdef-0123-4567890abcde'
+RE_BASE = (r'https://cloud.tenable.com/(vulns|assets|compliance)/export/'
+           r'([0-9a-fA-F\-]+)'
+           )
+
+
+@pytest.fixture
+def exports():
+    with responses.RequestsMock() as rsps:
+        for export_type, chunks in [('vulns', [1, 2, 3]),
+                                    ('assets', [1]),
+                                    ('compliance', [1, 2])
+                                    ]:
+            base = f'https://cloud.tenable.com/{export_type}/export'
+            rsps.add(responses.GET, f'{base}/{EXPORT_UUID}/status', json={
+                'status': 'FINISHED',
+                'chunks_available': chunks
+            })
+        rsps.add(responses.GET,
+                 re.compile(f'{RE_BASE}/chunks/[0-9]+'),
+                 json=[{'id': 1}, {'id': 2}]
+                 )
+        yield rsps
+
+
+def test_orchestrator(exports, api):
+    handled = []
+
+    def handler(data, export_type, export_chunk_id, **kwargs):
+        handled.append((export_type, export_chunk_id))
+
+    orchestrator = ExportOrchestrator(num_threads=2)
+    for export_type in ['vulns', 'assets', 'compliance']:
+        orchestrator.add(ExportsIterator(api,
+                                         type=export_type,
+                                         uuid=EXPORT_UUID
+                                         ), handler, name=export_type)
+    orchestrator.run()
+    assert sorted(handled) == [('assets', 1),
+                               ('compliance', 1), ('compliance', 2),
+                               ('vulns', 1), ('vulns', 2), ('vulns', 3)
+                               ]
+    progress = orchestrator.progress()
+    assert progress['vulns']['done'] == 3
+    assert progress['vulns']['records'] == 6
+    assert progress['total']['finished'] == 3
+    assert progress['total']['records'] == 12
+    assert progress['total']['done'] == 6
+
+
+def test_orchestrator_error_isolation(exports, api):
+    handled = []
+
+    def handler(data, export_type, export_chunk_id, **kwargs):
+        if export_type == 'assets':
+            raise ValueError('boom')
+        handled.append(export_type)
+
+    orchestrator = ExportOrchestrator(num_threads=2)
+    for export_type in ['vulns', 'assets', 'compliance']:
+        orchestrator.add(ExportsIterator(api,
+                                         type=export_type,
+                                         uuid=EXPORT_UUID
+                                         ), handler, name=export_type)
+    with pytest.raises(ValueError):
+        orchestrator.run()
+    assert len(handled) == 5
+    assert orchestrator.progress()['assets']['errors'] == 1
+
+
+@responses.activate
+def test_orchestrator_failed_chunks(api):
+    base = 'https://cloud.tenable.com/vulns/export'
+    responses.add(responses.GET,
+                  f'{base}/{EXPORT_UUID}/status',
+                  json={'status': 'FINISHED', 'chunks_available': [1, 2]}
+                  )
+    responses.add(responses.GET,
+                  re.compile(f'{RE_BASE}/chunks/1'),
+                  json=[{'id': 1}]
+                  )
+    responses.add(responses.GET,
+                  re.compile(f'{RE_BASE}/chunks/2'),
+                  body='[{"id": 1}, {"id"'
+                  )
+    handled = []
+
+    orchestrator = ExportOrchestrator(num_threads=2)
+    export = ExportsIterator(api,
+                             type='vulns',
+                             uuid=EXPORT_UUID,
+                             retry=ChunkRetryPolicy(retries=0)
+                             )
+    orchestrator.add(export,
+                     lambda export_chunk_id, **kw: handled.append(
+                         export_chunk_id
+                     ),
+                     name='vulns'
+                     )
+    orchestrator.run()
+    assert handled == [1]
+    assert list(export.failed_chunks) == [2]
+    assert export.chunks_in_flight == 0
+    progress = orchestrator.progress()['vulns']
+    assert progress['done'] == 1
+    assert progress['failed'] == 1
+    assert progress['errors'] == 0
+
+
+@responses.activate
+def test_orchestrator_poll_error_isolation(api):
+    for export_type, status in [('vulns', 'FINISHED'), ('assets', 'ERROR')]:
+        base = f'https://cloud.tenable.com/{export_type}/export'
+        responses.add(responses.GET, f'{base}/{EXPORT_UUID}/status', json={
+            'status': status,
+            'chunks_available': [1, 2]
+        })
+    responses.add(responses.GET,
+                  re.compile(f'{RE_BASE}/chunks/[0-9]+'),
+                  json=[{'id': 1}]
+                  )
+    handled = []
+
+    orchestrator = ExportOrchestrator(num_threads=2)
+    for export_type in ['vulns', 'assets']:
+        orchestrator.add(ExportsIterator(api,
+                                         type=export_type,
+                                         uuid=EXPORT_UUID
+                                         ),
+                         lambda export_type, **kw: handled.append(export_type),
+                         name=export_type
+                         )
+    with pytest.raises(TioExportsError):
+        orchestrator.run()
+    progress = orchestrator.progress()
+    assert handled == ['vulns', 'vulns']
+    assert progress['vulns']['done'] == 2
+    assert progress['assets']['finished']
+    assert isinstance(progress['assets']['error'], TioExportsError)
+
+
+@responses.activate
+def test_orchestrator_concurrent_polls(api):
+    events = []
+
+    def slow_status(request):
+        time.sleep(0.5)
+        events.append('slow status')
+        return (200, {}, json.dumps({'status': 'FINISHED',
+                                     'chunks_available': [1]
+                                     }))
+
+    responses.add_callback(responses.GET,
+                           f'https://cloud.tenable.com/vulns/export/'
+                           f'{EXPORT_UUID}/status',
+                           callback=slow_status,
+                           content_type='application/json'
+                           )
+    responses.add(responses.GET,
+                  f'https://cloud.tenable.com/assets/export/'
+                  f'{EXPORT_UUID}/status',
+                  json={'status': 'FINISHED', 'chunks_available': [1, 2]}
+                  )
+    responses.add(responses.GET,
+                  re.compile(f'{RE_BASE}/chunks/[0-9]+'),
+                  json=[{'id': 1}]
+                  )
+
+    orchestrator = ExportOrchestrator(num_threads=2, poll_threads=2)
+    for export_type in ['vulns', 'assets']:
+        orchestrator.add(ExportsIterator(api,
+                                         type=export_type,
+                                         uuid=EXPORT_UUID
+                                         ),
+                         lambda export_type, **kw: events.append(export_type),
+                         name=export_type
+                         )
+    orchestrator.run()
+
+    # The assets export is polled and processed while the vulns status poll
+    # is still outstanding.
+    assert events == ['assets', 'assets', 'slow status', 'vulns']
+    assert orchestrator.progress()['total']['finished'] == 2
+
+
+def test_orchestrator_iterable_conflict(api):
+    export = ExportsIterator(api, type='vulns', uuid=EXPORT_UUID)
+    export._is_iterator = True
+    with pytest.raises(TioExportsError):
+        ExportOrchestrator().add(export, print)
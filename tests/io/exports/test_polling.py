@@ -0,0 +1,55 @@
+'''
+Testing the export polling policies
+'''
+import pytest
+from tenable.io.exports.polling import (AdaptivePollingPolicy,
+                                        LinearBackoffPolicy,
+                                        PollingPolicy
+                                        )
+
+
+def test_polling_policy_abstract():
+    with pytest.raises(TypeError):
+        PollingPolicy()
+
+
+def test_linear_backoff():
+    policy = LinearBackoffPolicy()
+    assert [policy.delay({}, a) for a in [0, 1, 27, 28, 100]] == [
+        2, 3, 29, 30, 30
+    ]
+
+
+def test_rate_observation():
+    policy = AdaptivePollingPolicy(smoothing=0.5)
+    policy.observe({'chunks_available': []}, now=0)
+    assert policy.rate is None
+    policy.observe({'chunks_available': [1, 2]}, now=10)
+    assert policy.rate == pytest.approx(0.2)
+    policy.observe({'chunks_available': [1, 2]}, now=15)
+    policy.observe({'chunks_available': [1, 2, 3, 4, 5]}, now=20)
+    assert policy.rate == pytest.approx(0.25)
+    policy.observe({'finished_chunks': 11}, now=30)
+    assert policy.rate == pytest.approx(0.425)
+
+
+def test_adaptive_delay_bounds():
+    policy = AdaptivePollingPolicy(min_delay=1, max_delay=10, jitter=0)
+    assert policy.delay({}, 0) == 1
+    assert policy.delay({}, 2) == 4
+    assert policy.delay({}, 20) == 10
+    assert policy.delay({}, 5000) == 10
+
+    # One chunk every 5 seconds should wait roughly 5 seconds.
+    policy.rate = 0.2
+    assert 4 < policy.delay({'chunks_available': [1]}, 0) <= 5
+
+    # When every chunk has been produced, we check back quickly.
+    assert policy.delay({'total_chunks': 2, 'finished_chunks': 2}, 0) == 1
+
+
+def test_adaptive_jitter():
+    policy = AdaptivePollingPolicy(min_delay=1, max_delay=100, jitter=0.5)
+    delays = {policy.delay({}, 4) for _ in range(50)}
+    assert len(delays) > 1
+    assert all(8 <= d <= 24 for d in delays)
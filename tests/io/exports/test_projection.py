@@ -0,0 +1,33 @@
+'''
+Testing the export field projection
+'''
+from tenable.io.exports.projection import compile_projection
+
+VULN = {
+    'asset': {'uuid': 'a1', 'hostname': 'host1', 'ipv4': '192.168.0.1'},
+    'plugin': {'id': 19506, 'name': 'Scan Info',
+               'xrefs': [{'type': 'IAVA', 'id': '1'},
+                         {'type': 'CWE', 'id': '2'}]},
+    'severity': 'info',
+    'output': 'a' * 1024,
+}
+
+
+def test_projection_nested():
+    project = compile_projection(['asset.uuid', 'plugin.id', 'severity',
+                                  'plugin.xrefs.type', 'port.port'
+                                  ])
+    assert project(VULN) == {
+        'severity': 'info',
+        'asset': {'uuid': 'a1'},
+        'plugin': {'id': 19506, 'xrefs': [{'type': 'IAVA'}, {'type': 'CWE'}]},
+    }
+
+
+def test_projection_parent_wins():
+    project = compile_projection(['asset.uuid', 'asset', 'plugin',
+                                  'plugin.id'
+                                  ])
+    assert project(VULN) == {'asset': VULN['asset'],
+                             'plugin': VULN['plugin']
+                             }
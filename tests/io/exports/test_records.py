@@ -0,0 +1,93 @@
+'''
+Testing the compact export records
+'''
+import pickle
+import pytest
+from tenable.io.exports.records import (RecordCache,
+                                        VulnRecord,
+                                        compact_records
+                                        )
+
+VULN = {
+    'asset': {'uuid': 'a1', 'hostname': 'host1', 'custom': 'value'},
+    'plugin': {'id': 19506, 'name': 'Scan Info', 'vpr': {'score': 5.5}},
+    'port': {'port': 443, 'protocol': 'TCP'},
+    'severity': 'critical',
+    'state': 'OPEN',
+    'output': None,
+    'recast_reason': 'extra',
+}
+
+
+def test_compact_record_access():
+    record = VulnRecord.from_dict(VULN)
+    assert record.asset.hostname == 'host1'
+    assert record['plugin']['vpr'] == {'score': 5.5}
+    assert record['asset']['custom'] == 'value'
+    assert record.get('recast_reason') == 'extra'
+    assert record.output is None
+    assert 'output' in record
+    assert record.last_fixed is None
+    assert 'last_fixed' not in record
+    with pytest.raises(KeyError):
+        record['last_fixed']
+    with pytest.raises(AttributeError):
+        record.not_a_field  # noqa: B018
+    assert not hasattr(record, '__dict__')
+
+
+def test_compact_record_roundtrip():
+    record = VulnRecord.from_dict(VULN)
+    assert record.to_dict() == VULN
+    assert record == VULN
+    assert len(record) == len(VULN)
+    assert pickle.loads(pickle.dumps(record)) == VULN
+    assert VulnRecord(**VULN) == record
+
+
+def test_compact_record_interning():
+    first, second = compact_records([dict(VULN, severity=''.join('high')),
+                                     dict(VULN, severity=''.join('high'))
+                                     ], 'vulns')
+    assert first.severity is second.severity
+    assert first.port.protocol is second.port.protocol
+
+
+def test_compact_records_lazy():
+    records = compact_records(iter([VULN]), 'vulns')
+    assert not isinstance(records, list)
+    assert list(records) == [VULN]
+
+
+def test_compact_records_shared_subrecords():
+    cache = {}
+    first = compact_records([VULN], 'vulns', cache)[0]
+    second = compact_records([dict(VULN, port={'port': 80})], 'vulns',
+                             cache)[0]
+    assert first.plugin is second.plugin
+    assert first.port is not second.port
+    # Sub-records with fields outside of the record type are never shared.
+    assert first.asset is not second.asset
+    assert second.to_dict() == dict(VULN, port={'port': 80})
+
+
+def test_compact_records_shared_plugin_lossless():
+    plugin = {'id': 1, 'version': '1.1', 'vpr': {'score': 5}}
+    changed = dict(plugin, vpr={'score': 9}, cve=['CVE-2023-0001'])
+    first, second = compact_records([dict(VULN, plugin=plugin),
+                                     dict(VULN, plugin=changed)
+                                     ], 'vulns')
+    assert first.plugin is not second.plugin
+    assert second.to_dict()['plugin'] == changed
+
+
+def test_record_cache_bounded():
+    cache = RecordCache(max_size=2)
+    records = compact_records([dict(VULN, port={'port': p})
+                               for p in range(10)
+                               ], 'vulns', cache)
+    assert len(cache) == 2
+    # The recently used plugin sub-record is kept, while the older ports have
+    # been evicted.
+    assert records[0].plugin is records[-1].plugin
+    assert records[-1].to_dict() == dict(VULN, port={'port': 9})
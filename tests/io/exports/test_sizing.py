@@ -0,0 +1,105 @@
+'''
+Testing the export chunk sizer
+'''
+import json
+import re
+import pytest
+import responses
+from tenable.io.exports.sizing import ChunkSizer, count_units
+
+URL_BASE = 'https://cloud.tenable.com/vulns/export'
+URL_ACTIONS = f'{URL_BASE}/([0-9a-fA-F\\-]+)'
+
+
+def test_sizer_default():
+    sizer = ChunkSizer()
+    assert sizer.stats('vulns') == {}
+    assert sizer.recommend('vulns') == 500
+    assert sizer.recommend('assets') == 1000
+    assert sizer.recommend('compliance') == 5000
+
+
+def test_sizer_target_bytes():
+    sizer = ChunkSizer(target_bytes=5_000_000)
+    sizer.record('vulns', records=2000, units=100, nbytes=1_000_000,
+                 seconds=1.0
+                 )
+    assert sizer.stats('vulns')['bytes_per_unit'] == 10_000
+    assert sizer.stats('vulns')['records_per_unit'] == 20
+    assert sizer.recommend('vulns') == 500
+
+    sizer.target_bytes = 10
+    assert sizer.recommend('vulns') == 50
+    sizer.target_bytes = 10 ** 12
+    assert sizer.recommend('vulns') == 5000
+
+
+def test_sizer_target_seconds():
+    sizer = ChunkSizer(target_bytes=None, target_seconds=5.5)
+    sizer.record('assets', records=100, units=100, nbytes=1, seconds=1.5)
+    sizer.record('assets', records=200, units=200, nbytes=1, seconds=2.5)
+    stats = sizer.stats('assets')
+    assert stats['overhead'] == pytest.approx(0.5)
+    assert stats['seconds_per_unit'] == pytest.approx(0.01)
+    assert sizer.recommend('assets') == 500
+
+
+def test_sizer_smallest_target_wins():
+    sizer = ChunkSizer(target_bytes=1_000_000, target_seconds=10)
+    sizer.record('compliance', records=1000, units=1000, nbytes=1_000_000,
+                 seconds=1
+                 )
+    assert sizer.recommend('compliance') == 1000
+
+
+def test_sizer_persisted(tmp_path):
+    path = str(tmp_path / 'sizing.db')
+    sizer = ChunkSizer(path, target_bytes=5_000_000)
+    sizer.record('vulns', records=2000, units=100, nbytes=1_000_000,
+                 seconds=1.0
+                 )
+    sizer.record('vulns', records=0, units=0, nbytes=2, seconds=0.1)
+    sizer.close()
+    sizer = ChunkSizer(path, target_bytes=5_000_000)
+    assert sizer.stats('vulns')['chunks'] == 1
+    assert sizer.recommend('vulns') == 500
+    sizer.clear('vulns')
+    assert sizer.stats('vulns') == {}
+
+
+def test_count_units():
+    vulns = [{'asset': {'uuid': 'a'}}, {'asset': {'uuid': 'a'}},
+             {'asset': {'uuid': 'b'}}
+             ]
+    assert count_units('vulns', vulns) == 2
+    assert count_units('assets', vulns) == 3
+
+
+@responses.activate
+def test_export_sizer(api):
+    responses.add(responses.POST, re.compile(URL_BASE), json={
+        'export_uuid': '01234567-89ab-cdef-0123-4567890abcde'
+    })
+    responses.add(responses.GET, re.compile(f'{URL_ACTIONS}/status'), json={
+        'status': 'FINISHED',
+        'chunks_available': [1, 2]
+    })
+    responses.add(responses.GET, re.compile(f'{URL_ACTIONS}/chunks/[0-9]+'),
+                  json=[{'asset': {'uuid': f'asset-{i // 2}'}, 'id': i}
+                        for i in range(10)
+                        ])
+    sizer = ChunkSizer(target_bytes=1000)
+    export = api.exports.vulns(sizer=sizer)
+    assert json.loads(responses.calls[0].request.body)['num_assets'] == 500
+    assert len(list(export)) == 20
+    stats = sizer.stats('vulns')
+    assert stats['chunks'] == 2
+    assert stats['units'] == 10
+    assert stats['records'] == 20
+
+    api.exports.vulns(sizer=sizer)
+    body = json.loads(responses.calls[-1].request.body)
+    assert body['num_assets'] == sizer.recommend('vulns')
+
+    api.exports.vulns(sizer=sizer, num_assets=1000)
+    assert json.loads(responses.calls[-1].request.body)['num_assets'] == 1000
@@ -0,0 +1,72 @@
+'''
+Testing the export spool and replay iterator
+'''
+import pytest
+import responses
+from tenable.errors import TioExportsError
+from tenable.io.exports.spool import ExportSpool, SpoolIterator
+
+EXPORT_UUID = '01234567-89ab-cdef-0123-4567890abcde'
+URL_BASE = f'https://cloud.tenable.com/vulns/export/{EXPORT_UUID}'
+
+
+@pytest.fixture
+def spool(tmp_path):
+    return ExportSpool(str(tmp_path))
+
+
+def test_spool_read_write(spool):
+    data = [{'asset': {'uuid': 'abc'}, 'severity': 'high'}]
+    spool.write('vulns', EXPORT_UUID, 2, data)
+    spool.write('vulns', EXPORT_UUID, 10, [])
+    assert spool.read('vulns', EXPORT_UUID, 2) == data
+    assert spool.chunks('vulns', EXPORT_UUID) == [2, 10]
+    assert spool.chunks('assets', EXPORT_UUID) == []
+    assert spool.exports('vulns') == [EXPORT_UUID]
+    assert not spool.is_complete('vulns', EXPORT_UUID)
+    spool.mark_complete('vulns', EXPORT_UUID)
+    assert spool.is_complete('vulns', EXPORT_UUID)
+
+
+@responses.activate
+def test_spool_export_and_replay(spool, api):
+    responses.add(responses.GET, f'{URL_BASE}/status', json={
+        'status': 'FINISHED',
+        'chunks_available': [1, 2, 3]
+    })
+    for chunk_id in [1, 2, 3]:
+        responses.add(responses.GET,
+                      f'{URL_BASE}/chunks/{chunk_id}',
+                      json=[{'chunk': chunk_id, 'id': i} for i in range(3)]
+                      )
+
+    export = api.exports.vulns(uuid=EXPORT_UUID, spool=spool)
+    original = list(export)
+    assert len(original) == 9
+    assert spool.is_complete('vulns', EXPORT_UUID)
+    calls = len(responses.calls)
+
+    replay = spool.replay('vulns', EXPORT_UUID)
+    assert isinstance(replay, SpoolIterator)
+    assert list(replay) == original
+
+    chunks = []
+    spool.replay('vulns', EXPORT_UUID).run_threaded(
+        lambda data, export_chunk_id, **kw: chunks.append(export_chunk_id)
+    )
+    assert sorted(chunks) == [1, 2, 3]
+    assert len(responses.calls) == calls
+
+
+def test_spool_write_raw(spool):
+    spool.write_raw('vulns', 'abcd', 4, b'[{"id": 1}]')
+    assert spool.read('vulns', 'abcd', 4) == [{'id': 1}]
+
+
+def test_spool_replay_incomplete(spool):
+    spool.write('vulns', EXPORT_UUID, 1, [{'id': 1}])
+    with pytest.raises(TioExportsError):
+        list(spool.replay('vulns', EXPORT_UUID))
+    assert list(spool.replay('vulns', EXPORT_UUID, partial=True)) == [
+        {'id': 1}
+    ]
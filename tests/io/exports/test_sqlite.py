@@ -0,0 +1,137 @@
+'''
+Testing the SQLite export sink
+'''
+import pytest
+from tenable.io.exports.records import compact_records
+from tenable.io.exports.sqlite import ExportDatabase, SQLiteSink
+
+VULNS = [
+    {
+        'asset': {'uuid': 'a1', 'hostname': 'host1'},
+        'plugin': {'id': 19506, 'name': 'Scan Info', 'family': 'Settings'},
+        'port': {'port': 443, 'protocol': 'TCP', 'service': 'www'},
+        'severity': 'critical',
+        'state': 'OPEN',
+    },
+    {
+        'asset': {'uuid': 'a2', 'hostname': 'host2'},
+        'plugin': {'id': 19506, 'name': 'Scan Info', 'family': 'Settings'},
+        'port': {'port': 0, 'protocol': 'TCP'},
+        'severity': 'critical',
+        'state': 'FIXED',
+    },
+    {
+        'asset': {'uuid': 'a1', 'hostname': 'host1'},
+        'plugin': {'id': 10180, 'name': 'Ping', 'family': 'General'},
+        'severity': 'info',
+        'state': 'OPEN',
+    },
+]
+
+ASSETS = [
+    {'id': 'a1', 'hostnames': ['host1'], 'ipv4s': ['192.168.0.1'],
+     'tags': [{'key': 'Location', 'value': 'HQ'}]},
+    {'id': 'a2', 'hostnames': ['host2'],
+     'tags': [{'key': 'Location', 'value': 'Remote'}]},
+]
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / 'exports.db')
+    with SQLiteSink(path, batch_size=2) as sink:
+        sink(data=VULNS, export_type='vulns')
+        sink(data=iter(ASSETS), export_type='assets')
+        sink(data=VULNS, export_type='vulns')
+    assert sink.records == 8
+    return ExportDatabase(path)
+
+
+def test_sqlite_sink_vulns(database):
+    assert len(list(database.vulns())) == 3
+    assert len(list(database.vulns(severity='critical'))) == 2
+    assert len(list(database.vulns(plugin_id=10180))) == 1
+    vulns = list(database.vulns(severity='critical', state='OPEN'))
+    assert vulns == [VULNS[0]]
+
+
+def test_sqlite_sink_tags(database):
+    vulns = list(database.vulns(severity='critical',
+                                tag=('Location', 'Remote')
+                                ))
+    assert vulns == [VULNS[1]]
+    assert list(database.assets(tag=('Location', 'HQ'))) == [ASSETS[0]]
+
+
+def test_sqlite_sink_plugins_ports(database):
+    assert len(list(database.plugins())) == 2
+    assert [p['id'] for p in database.plugins(family='General')] == [10180]
+    assert list(database.ports()) == [
+        {'asset_uuid': 'a1', 'port': 443, 'protocol': 'TCP', 'service': 'www'}
+    ]
+
+
+def test_sqlite_sink_query(database):
+    rows = list(database.query('SELECT severity, count(*) AS total '
+                               'FROM vulns GROUP BY severity ORDER BY severity'
+                               ))
+    assert rows == [{'severity': 'critical', 'total': 2},
+                    {'severity': 'info', 'total': 1}]
+    indexes = [r['name'] for r in database.query(
+        "SELECT name FROM sqlite_master WHERE type = 'index'"
+    )]
+    assert 'vulns_severity_idx' in indexes
+
+
+def test_sqlite_sink_compact(tmp_path):
+    path = str(tmp_path / 'exports.db')
+    with SQLiteSink(path) as sink:
+        sink(data=compact_records(VULNS, 'vulns'), export_type='vulns')
+    db = ExportDatabase(path)
+    assert list(db.vulns(severity='critical', state='OPEN')) == [VULNS[0]]
+    assert len(list(db.plugins())) == 2
+
+
+def test_sqlite_sink_unsupported(tmp_path):
+    with SQLiteSink(str(tmp_path / 'exports.db')) as sink:
+        with pytest.raises(ValueError):
+            sink(data=[], export_type='compliance')
+
+
+def test_sqlite_sink_writer_error(tmp_path):
+    sink = SQLiteSink(str(tmp_path / 'exports.db'))
+    # The error is raised by the call writing the chunk, and then by every
+    # later call.
+    with pytest.raises(TypeError):
+        sink(data=[{'plugin': {'id': 1}, 'asset': {'uuid': 'a1'}, 'x': {1}}],
+             export_type='vulns'
+             )
+    with pytest.raises(TypeError):
+        sink(data=VULNS, export_type='vulns')
+    with pytest.raises(TypeError):
+        sink.close()
+
+
+def test_sqlite_sink_committed(tmp_path):
+    path = str(tmp_path / 'exports.db')
+    with SQLiteSink(path) as sink:
+        sink(data=VULNS, export_type='vulns')
+        assert len(list(ExportDatabase(path).vulns())) == 3
+
+
+def test_sqlite_sink_skipped(tmp_path):
+    path = str(tmp_path / 'exports.db')
+    with SQLiteSink(path) as sink:
+        sink(data=[{'asset': {'uuid': 'a1'}, 'plugin': {}},
+                   {'asset': None, 'plugin': {'id': 1}},
+                   VULNS[0]
+                   ], export_type='vulns')
+        sink(data=[{'hostnames': ['host1']},
+                   {'id': 'a1', 'tags': [{'key': 'Location'}]}
+                   ], export_type='assets')
+    assert sink.records == 2
+    assert sink.skipped == 3
+    assert sink.error is None
+    db = ExportDatabase(path)
+    assert [p['id'] for p in db.plugins()] == [19506]
+    assert len(list(db.assets())) == 1
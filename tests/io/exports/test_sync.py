@@ -0,0 +1,132 @@
+'''
+Testing the incremental export sync
+'''
+import json
+import pytest
+import responses
+from tenable.errors import TioExportsError, UnexpectedValueError
+from tenable.io.exports.retry import ChunkRetryPolicy
+from tenable.io.exports.sqlite import ExportDatabase
+from tenable.io.exports.sync import ExportSync
+
+EXPORT_UUID = '01234567-89ab-cdef-0123-4567890abcde'
+BASE = 'https://cloud.tenable.com'
+
+
+def add_export(rsps, export_type, chunks):
+    '''
+    Mocks an export returning the chunks in order, one export per chunk.
+    '''
+    rsps.add(responses.POST, f'{BASE}/{export_type}/export',
+             json={'export_uuid': EXPORT_UUID}
+             )
+    rsps.add(responses.GET,
+             f'{BASE}/{export_type}/export/{EXPORT_UUID}/status',
+             json={'status': 'FINISHED', 'chunks_available': [1]}
+             )
+    for chunk in chunks:
+        rsps.add(responses.GET,
+                 f'{BASE}/{export_type}/export/{EXPORT_UUID}/chunks/1',
+                 json=chunk
+                 )
+
+
+def bodies(rsps, export_type):
+    return [json.loads(c.request.body) for c in rsps.calls
+            if c.request.method == 'POST'
+            and c.request.url.endswith(f'{export_type}/export')
+            ]
+
+
+@responses.activate
+def test_sync_full_then_incremental(api, tmp_path):
+    path = str(tmp_path / 'sync.db')
+    sync = ExportSync(api, path, tenant='acme', num_threads=1)
+    assert sync.watermark('vulns') is None
+
+    add_export(responses, 'assets', [[
+        {'id': 'a1', 'tags': [{'key': 'Location', 'value': 'HQ'}]},
+        {'id': 'a2', 'tags': []},
+    ]])
+    add_export(responses, 'vulns', [[
+        {'asset': {'uuid': 'a1'}, 'plugin': {'id': 1}, 'state': 'OPEN'},
+        {'asset': {'uuid': 'a2'}, 'plugin': {'id': 1}, 'state': 'OPEN'},
+    ]])
+    resp = sync.sync()
+    assert resp['assets']['since'] is None
+    assert resp['vulns']['records'] == 2
+    assert 'since' not in bodies(responses, 'vulns')[0]
+    watermark = sync.watermark('vulns')
+    assert watermark == resp['vulns']['watermark']
+
+    responses.reset()
+    add_export(responses, 'assets', [
+        [{'id': 'a1', 'tags': [{'key': 'Location', 'value': 'Remote'}]}],
+        [{'id': 'a2', 'deleted_at': '2023-01-01T00:00:00Z'}],
+        [],
+    ])
+    add_export(responses, 'vulns', [[
+        {'asset': {'uuid': 'a1'}, 'plugin': {'id': 1}, 'state': 'FIXED'},
+    ]])
+    resp = sync.sync()
+    assert resp['vulns']['since'] == watermark
+    assets = bodies(responses, 'assets')
+    assert [list(b['filters'].keys()) for b in assets] == [
+        ['updated_at'], ['deleted_at'], ['terminated_at']
+    ]
+    vulns = bodies(responses, 'vulns')[0]['filters']
+    assert vulns['since'] == watermark
+    assert vulns['state'] == ['open', 'reopened', 'fixed']
+
+    db = ExportDatabase(path)
+    assert [v['state'] for v in db.vulns()] == ['FIXED']
+    assert [a['id'] for a in db.assets(tag=('Location', 'Remote'))] == ['a1']
+    assert list(db.assets(tag=('Location', 'HQ'))) == []
+    assert len(list(db.assets())) == 1
+
+
+def test_sync_reset(api, tmp_path):
+    sync = ExportSync(api, str(tmp_path / 'sync.db'), tenant='acme')
+    sync._set_watermark('vulns', 100)
+    sync._set_watermark('assets', 100)
+    other = ExportSync(api, str(tmp_path / 'sync.db'), tenant='other')
+    assert other.watermark('vulns') is None
+    sync.overlap = 10
+    assert sync._since('vulns') == 90
+    sync.reset('vulns')
+    assert sync.watermark('vulns') is None
+    assert sync.watermark('assets') == 100
+    sync.reset()
+    assert sync.watermark('assets') is None
+
+
+@responses.activate
+def test_sync_failed_chunks(api, tmp_path):
+    sync = ExportSync(api, str(tmp_path / 'sync.db'), tenant='acme')
+    sync._set_watermark('vulns', 100)
+    responses.add(responses.POST, f'{BASE}/vulns/export',
+                  json={'export_uuid': EXPORT_UUID}
+                  )
+    responses.add(responses.GET,
+                  f'{BASE}/vulns/export/{EXPORT_UUID}/status',
+                  json={'status': 'FINISHED', 'chunks_available': [1, 2]}
+                  )
+    responses.add(responses.GET,
+                  f'{BASE}/vulns/export/{EXPORT_UUID}/chunks/1',
+                  json=[{'asset': {'uuid': 'a1'}, 'plugin': {'id': 1}}]
+                  )
+    responses.add(responses.GET,
+                  f'{BASE}/vulns/export/{EXPORT_UUID}/chunks/2',
+                  body='[{"asset": '
+                  )
+    with pytest.raises(TioExportsError):
+        sync.sync_vulns(retry=ChunkRetryPolicy(retries=0))
+    assert sync.watermark('vulns') == 100
+
+
+def test_sync_managed_filters(api, tmp_path):
+    sync = ExportSync(api, str(tmp_path / 'sync.db'), tenant='acme')
+    with pytest.raises(UnexpectedValueError):
+        sync.sync_vulns(since=100)
+    with pytest.raises(UnexpectedValueError):
+        sync.sync_assets(updated_at=100)
@@ -0,0 +1,129 @@
+'''
+Testing the multi-tenant export runner
+'''
+import re
+import threading
+import time
+import pytest
+import responses
+from tenable.errors import UnexpectedValueError
+from tenable.io import TenableIO
+from tenable.io.exports.iterator import ExportsIterator
+from tenable.io.exports.tenants import RateBudget, TenantExportRunner
+
+EXPORT_UUID = '01234567-89ab-cdef-0123-4567890abcde'
+
+
+def tenant_url(name):
+    return f'https://{name}.example.com'
+
+
+def add_export(rsps, name, status='FINISHED', chunks=(1, 2), export=200):
+    base = f'{tenant_url(name)}/vulns/export'
+    rsps.add(responses.POST, base, status=export,
+             json={'export_uuid': EXPORT_UUID}
+             )
+    rsps.add(responses.GET, f'{base}/{EXPORT_UUID}/status', json={
+        'status': status,
+        'chunks_available': list(chunks)
+    })
+    rsps.add(responses.GET, re.compile(f'{base}/{EXPORT_UUID}/chunks/[0-9]+'),
+             json=[{'name': name, 'id': 1}, {'name': name, 'id': 2}]
+             )
+    rsps.add(responses.POST, f'{base}/{EXPORT_UUID}/cancel',
+             json={'status': 'CANCELLED'}
+             )
+
+
+def make_tio(name):
+    return TenableIO('a' * 32, 'b' * 32, url=tenant_url(name), retries=0)
+
+
+class ListSink(list):
+    closed = False
+
+    def __call__(self, data, **kwargs):
+        self.extend(data)
+
+    def close(self):
+        self.closed = True
+
+
+def test_tenant_runner():
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+        add_export(rsps, 'alpha')
+        add_export(rsps, 'beta', chunks=[1, 2, 3])
+        add_export(rsps, 'gamma', export=403)
+        add_export(rsps, 'delta', status='ERROR', chunks=[])
+        sinks = {name: ListSink()
+                 for name in ['alpha', 'beta', 'gamma', 'delta']
+                 }
+        runner = TenantExportRunner(num_threads=4, max_rate=1000)
+        for name, sink in sinks.items():
+            runner.add(make_tio(name), sink, name=name, num_assets=50)
+        report = runner.run()
+
+    assert report['alpha']['status'] == 'finished'
+    assert report['alpha']['records'] == 4
+    assert report['alpha']['chunks'] == 2
+    assert report['beta']['records'] == 6
+    assert {r['name'] for r in sinks['beta']} == {'beta'}
+    assert sinks['alpha'].closed and sinks['beta'].closed
+    assert report['gamma']['status'] == 'failed'
+    assert 'ForbiddenError' in report['gamma']['error']
+    assert report['delta']['status'] == 'failed'
+    assert report['delta']['export_uuid'] == EXPORT_UUID
+    assert sorted(runner.failed) == ['delta', 'gamma']
+
+
+def test_tenant_runner_timeout():
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+        add_export(rsps, 'alpha')
+        add_export(rsps, 'slow', status='PROCESSING', chunks=[])
+        runner = TenantExportRunner(tenant_timeout=0.5)
+        runner.add(make_tio('alpha'), ListSink(), name='alpha')
+        runner.add(make_tio('slow'), ListSink(), name='slow')
+        report = runner.run()
+        cancels = [c for c in rsps.calls if c.request.url.endswith('cancel')]
+    assert report['alpha']['status'] == 'finished'
+    assert report['slow']['status'] == 'timeout'
+    assert 'TioExportsTimeout' in report['slow']['error']
+    assert len(cancels) == 1
+
+
+def test_tenant_runner_timeout_cancel_pooled(monkeypatch):
+    threads = []
+    cancel = ExportsIterator.cancel
+
+    def pooled_cancel(self):
+        threads.append(threading.current_thread())
+        return cancel(self)
+
+    monkeypatch.setattr(ExportsIterator, 'cancel', pooled_cancel)
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+        add_export(rsps, 'slow', status='PROCESSING', chunks=[])
+        runner = TenantExportRunner(tenant_timeout=0.5)
+        runner.add(make_tio('slow'), ListSink(), name='slow')
+        report = runner.run()
+    assert report['slow']['status'] == 'timeout'
+    assert len(threads) == 1
+    assert threads[0] is not threading.current_thread()
+
+
+def test_tenant_runner_duplicate_name():
+    runner = TenantExportRunner()
+    runner.add(make_tio('alpha'), ListSink(), name='alpha')
+    with pytest.raises(UnexpectedValueError):
+        runner.add(make_tio('alpha'), ListSink(), name='alpha')
+    runner.add(make_tio('beta'), ListSink())
+    with pytest.raises(UnexpectedValueError):
+        runner.add(make_tio('beta'), ListSink(), name='tenant-2')
+
+
+def test_rate_budget():
+    budget = RateBudget(rate=20, burst=1)
+    start = time.monotonic()
+    for _ in range(5):
+        budget.acquire()
+    assert time.monotonic() - start >= 0.19
+    assert budget.wait_time > 0